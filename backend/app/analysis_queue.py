@@ -0,0 +1,443 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from .telemetry import QUEUE_DEPTH, QUEUE_LAG, merge_operations, operations_since, snapshot_operations
+
+logger = logging.getLogger(__name__)
+
+# Queue backend: "memory", "mongo", or "sqlite:///path/to/queue.db".
+# Persistent backends keep jobs across restarts. Defaults to the SQLite
+# storage file when STORAGE_URL is SQLite, otherwise to memory.
+ANALYSIS_QUEUE = os.getenv("ANALYSIS_QUEUE")
+# Number of async analysis workers; each owns one shard of scrapers
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "4"))
+# Ingest is rejected with 503 once this many jobs are waiting
+ANALYSIS_QUEUE_MAX = int(os.getenv("ANALYSIS_QUEUE_MAX", "10000"))
+ANALYSIS_MAX_ATTEMPTS = int(os.getenv("ANALYSIS_MAX_ATTEMPTS", "3"))
+# Seconds a claimed job stays invisible to other processes before it is re-delivered
+ANALYSIS_JOB_LEASE = float(os.getenv("ANALYSIS_JOB_LEASE", "300"))
+# Processes for CPU-bound DOM/repair work; 0 runs it in a thread instead
+REPAIR_PROCESSES = int(os.getenv("REPAIR_PROCESSES", "2"))
+# Idle persistent-queue workers poll at this interval for jobs enqueued by other processes
+POLL_INTERVAL = 1.0
+# Seconds a worker waits before retrying a failed queue operation
+QUEUE_RETRY_DELAY = 1.0
+
+class QueueFull(Exception):
+    pass
+
+def shard_key(scraper_id: str) -> int:
+    """Stable across processes and restarts, unlike hash()."""
+    return zlib.crc32(scraper_id.encode("utf-8"))
+
+class Job:
+    """Analysis of one or more runs of a single scraper, in ingest order."""
+    __slots__ = ("id", "scraper_id", "run_ids", "seq", "enqueued_at")
+
+    def __init__(
+        self,
+        scraper_id: str,
+        run_ids: List[str],
+        id: Optional[str] = None,
+        seq: int = 0,
+        enqueued_at: Optional[float] = None
+    ):
+        self.id = id or str(uuid.uuid4())
+        self.scraper_id = scraper_id
+        self.run_ids = run_ids
+        self.seq = seq
+        self.enqueued_at = enqueued_at or time.time()
+
+    def __repr__(self) -> str:
+        return f"Job({self.scraper_id!r}, {len(self.run_ids)} runs)"
+
+class JobQueue(ABC):
+    """
+    Jobs are partitioned into shards by scraper; each shard is consumed by one
+    worker, strictly in order, so a scraper's runs are analyzed in the order
+    they were ingested. A job is removed only once it is acked.
+    """
+
+    def __init__(self, shards: int):
+        self.shards = shards
+        # Approximate number of waiting jobs, used for backpressure
+        self.pending = 0
+        self.events = [asyncio.Event() for _ in range(shards)]
+
+    def shard(self, scraper_id: str) -> int:
+        return shard_key(scraper_id) % self.shards
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def put(self, jobs: List[Job]):
+        await self._put(jobs)
+        self.pending += len(jobs)
+        for job in jobs:
+            self.events[self.shard(job.scraper_id)].set()
+
+    async def get(self, shard: int) -> Job:
+        """Waits for the next job of a shard."""
+        event = self.events[shard]
+        while True:
+            job = await self._claim(shard)
+            if job is not None:
+                return job
+            event.clear()
+            try:
+                await asyncio.wait_for(event.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def ack(self, job: Job):
+        await self._delete(job)
+        self.pending = max(0, self.pending - 1)
+
+    async def fail(self, job: Job):
+        """Gives up on a job after ANALYSIS_MAX_ATTEMPTS."""
+        logger.error(f"Dropping analysis job {job.id} for scraper {job.scraper_id} (runs {job.run_ids})")
+        await self._delete(job)
+        self.pending = max(0, self.pending - 1)
+
+    @abstractmethod
+    async def _put(self, jobs: List[Job]):
+        ...
+
+    @abstractmethod
+    async def _claim(self, shard: int) -> Optional[Job]:
+        ...
+
+    @abstractmethod
+    async def _delete(self, job: Job):
+        ...
+
+class MemoryJobQueue(JobQueue):
+    """In-process queue. Jobs still waiting at shutdown are lost."""
+
+    def __init__(self, shards: int):
+        super().__init__(shards)
+        self.queues: List[Deque[Job]] = [deque() for _ in range(shards)]
+
+    async def close(self):
+        if self.pending:
+            logger.warning(f"Discarding {self.pending} queued analysis jobs")
+
+    async def _put(self, jobs: List[Job]):
+        for job in jobs:
+            self.queues[self.shard(job.scraper_id)].append(job)
+
+    async def _claim(self, shard: int) -> Optional[Job]:
+        queue = self.queues[shard]
+        return queue.popleft() if queue else None
+
+    async def _delete(self, job: Job):
+        pass
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Jobs in a local SQLite file (WAL mode), shared by every process on the host.
+    A job is claimed by leasing it; a lease that expires (e.g. the process died)
+    makes the job claimable again. A scraper with a leased job is skipped, which
+    keeps per-scraper ordering across processes.
+    """
+
+    def __init__(self, path: str, shards: int):
+        super().__init__(shards)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn: Optional[sqlite3.Connection] = None
+
+    async def open(self):
+        def connect():
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_jobs ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT UNIQUE, scraper_id TEXT, "
+                "shard_key INTEGER, run_ids TEXT, leased_until REAL, enqueued_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS analysis_jobs_scraper ON analysis_jobs (scraper_id, leased_until)")
+            return conn
+        self.conn = await asyncio.to_thread(connect)
+        self.pending = await self._execute(lambda c: c.execute("SELECT COUNT(*) FROM analysis_jobs").fetchone()[0])
+
+    async def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    async def _execute(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        def run():
+            with self.lock:
+                return fn(self.conn)
+        return await asyncio.to_thread(run)
+
+    async def _put(self, jobs: List[Job]):
+        rows = [
+            (job.id, job.scraper_id, shard_key(job.scraper_id), json.dumps(job.run_ids), job.enqueued_at)
+            for job in jobs
+        ]
+        def insert(c: sqlite3.Connection):
+            # No cursor escapes the lock: finalizing one on another thread races the next statement
+            c.executemany(
+                "INSERT INTO analysis_jobs (id, scraper_id, shard_key, run_ids, leased_until, enqueued_at) "
+                "VALUES (?, ?, ?, ?, 0, ?)",
+                rows
+            )
+        await self._execute(insert)
+
+    async def _claim(self, shard: int) -> Optional[Job]:
+        def claim(c: sqlite3.Connection) -> Optional[Job]:
+            now = time.time()
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                row = c.execute(
+                    "SELECT seq, id, scraper_id, run_ids, enqueued_at FROM analysis_jobs "
+                    "WHERE shard_key % ? = ? AND leased_until < ? AND scraper_id NOT IN "
+                    "(SELECT scraper_id FROM analysis_jobs WHERE leased_until >= ?) "
+                    "ORDER BY seq LIMIT 1",
+                    (self.shards, shard, now, now)
+                ).fetchone()
+                if row is None:
+                    c.execute("COMMIT")
+                    return None
+                c.execute("UPDATE analysis_jobs SET leased_until = ? WHERE seq = ?", (now + ANALYSIS_JOB_LEASE, row[0]))
+                c.execute("COMMIT")
+            except Exception:
+                c.execute("ROLLBACK")
+                raise
+            return Job(row[2], json.loads(row[3]), id=row[1], seq=row[0], enqueued_at=row[4])
+        return await self._execute(claim)
+
+    async def _delete(self, job: Job):
+        def delete(c: sqlite3.Connection):
+            c.execute("DELETE FROM analysis_jobs WHERE id = ?", (job.id,))
+        await self._execute(delete)
+
+class MongoJobQueue(JobQueue):
+    """
+    Jobs in a Mongo collection, leased the same way as SQLiteJobQueue.
+    The per-scraper exclusion check and the claim are not one atomic step here,
+    so ordering across several API processes is best-effort.
+    """
+
+    def __init__(self, database, shards: int, collection: str = "analysis_jobs"):
+        super().__init__(shards)
+        self.collection = database[collection]
+        self.last_seq = 0
+
+    async def open(self):
+        await self.collection.create_index("id", unique=True)
+        await self.collection.create_index([("leased_until", 1), ("seq", 1)])
+        await self.collection.create_index([("scraper_id", 1), ("leased_until", 1)])
+        self.pending = await self.collection.count_documents({})
+
+    def next_seq(self) -> int:
+        # Wall-clock based so jobs from different processes interleave sensibly
+        self.last_seq = max(self.last_seq + 1, time.time_ns())
+        return self.last_seq
+
+    async def _put(self, jobs: List[Job]):
+        await self.collection.insert_many([
+            {
+                "id": job.id,
+                "scraper_id": job.scraper_id,
+                "shard_key": shard_key(job.scraper_id),
+                "run_ids": job.run_ids,
+                "seq": self.next_seq(),
+                "leased_until": 0,
+                "enqueued_at": job.enqueued_at
+            }
+            for job in jobs
+        ])
+
+    async def _claim(self, shard: int) -> Optional[Job]:
+        now = time.time()
+        busy = await self.collection.distinct("scraper_id", {"leased_until": {"$gte": now}})
+        doc = await self.collection.find_one_and_update(
+            {
+                "shard_key": {"$mod": [self.shards, shard]},
+                "leased_until": {"$lt": now},
+                "scraper_id": {"$nin": busy}
+            },
+            {"$set": {"leased_until": now + ANALYSIS_JOB_LEASE}},
+            sort=[("seq", 1)]
+        )
+        if doc is None:
+            return None
+        return Job(doc["scraper_id"], doc["run_ids"], id=doc["id"], seq=doc["seq"], enqueued_at=doc.get("enqueued_at"))
+
+    async def _delete(self, job: Job):
+        await self.collection.delete_one({"id": job.id})
+
+def create_job_queue(spec: Optional[str] = ANALYSIS_QUEUE, shards: int = ANALYSIS_WORKERS) -> JobQueue:
+    from . import database
+    from .storage import MongoBackend
+    if spec is None:
+        # Processes sharing a SQLite database share its queue too, which keeps
+        # each scraper's runs analyzed in order across processes
+        spec = database.STORAGE_URL if database.STORAGE_URL.startswith("sqlite:///") else "memory"
+    if spec.startswith("sqlite:///"):
+        return SQLiteJobQueue(spec[len("sqlite:///"):], shards)
+    if spec == "mongo":
+        if isinstance(database.storage, MongoBackend) and database.storage.db is not None:
+            return MongoJobQueue(database.storage.db, shards)
+        logger.warning("ANALYSIS_QUEUE=mongo needs a MongoDB connection; using the in-memory queue")
+    elif spec != "memory":
+        logger.warning(f"Unknown ANALYSIS_QUEUE {spec!r}; using the in-memory queue")
+    return MemoryJobQueue(shards)
+
+class AnalysisWorkers:
+    """Runs `handler` for queued jobs, one bounded async worker per shard."""
+
+    def __init__(self, handler: Callable[[Job], Awaitable[None]], queue: Optional[JobQueue] = None):
+        self.handler = handler
+        self.queue = queue
+        self.tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        if self.queue is None:
+            self.queue = create_job_queue()
+        await self.queue.open()
+        QUEUE_DEPTH.callback = lambda: self.queue.pending if self.queue is not None else 0
+        self.tasks = [asyncio.create_task(self.work(shard)) for shard in range(self.queue.shards)]
+        logger.info(f"Started {len(self.tasks)} analysis workers ({type(self.queue).__name__})")
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        if self.queue is not None:
+            await self.queue.close()
+
+    def check_capacity(self, jobs: int = 1):
+        """Raises QueueFull when accepting `jobs` more would exceed ANALYSIS_QUEUE_MAX."""
+        if self.queue is not None and self.queue.pending + jobs > ANALYSIS_QUEUE_MAX:
+            raise QueueFull(f"{self.queue.pending} analysis jobs waiting")
+
+    async def submit(self, runs_by_scraper: Dict[str, List[str]]):
+        """Enqueues one job per scraper, keeping each list of run ids in order."""
+        jobs = [Job(scraper_id, run_ids) for scraper_id, run_ids in runs_by_scraper.items()]
+        if self.queue is None:
+            # Workers not started (e.g. no lifespan events); run inline instead of losing the work
+            for job in jobs:
+                await self.handler(job)
+            return
+        await self.queue.put(jobs)
+
+    async def work(self, shard: int):
+        while True:
+            try:
+                job = await self.queue.get(shard)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # e.g. "database is locked" or a dropped Mongo connection; the worker must outlive it
+                logger.exception(f"Analysis worker {shard} could not claim a job")
+                await asyncio.sleep(QUEUE_RETRY_DELAY)
+                continue
+            QUEUE_LAG.observe(max(0.0, time.time() - job.enqueued_at))
+            if await self.process(job):
+                await self.settle(self.queue.ack, job)
+            else:
+                await self.settle(self.queue.fail, job)
+
+    async def process(self, job: Job) -> bool:
+        """Runs the handler, retrying up to ANALYSIS_MAX_ATTEMPTS times. Returns whether it succeeded."""
+        for attempt in range(1, ANALYSIS_MAX_ATTEMPTS + 1):
+            try:
+                await self.handler(job)
+                return True
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Analysis job {job.id} failed (attempt {attempt}/{ANALYSIS_MAX_ATTEMPTS})")
+                if attempt < ANALYSIS_MAX_ATTEMPTS:
+                    # Retrying in place, rather than re-enqueueing, keeps the shard in order
+                    await asyncio.sleep(min(30.0, 2 ** attempt))
+        return False
+
+    async def settle(self, action: Callable[[Job], Awaitable[None]], job: Job):
+        """
+        Acks or fails a handled job. Only this step is retried: running the
+        handler again would store its alerts and stats twice. If it keeps
+        failing, a persistent queue re-delivers the job once its lease expires.
+        """
+        for attempt in range(1, ANALYSIS_MAX_ATTEMPTS + 1):
+            try:
+                await action(job)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Could not remove analysis job {job.id} from the queue (attempt {attempt}/{ANALYSIS_MAX_ATTEMPTS})")
+                if attempt < ANALYSIS_MAX_ATTEMPTS:
+                    await asyncio.sleep(QUEUE_RETRY_DELAY)
+
+# --- CPU-bound work ---
+
+_repair_pool: Optional[ProcessPoolExecutor] = None
+
+def repair_pool() -> Optional[ProcessPoolExecutor]:
+    global _repair_pool
+    if REPAIR_PROCESSES <= 0:
+        return None
+    if _repair_pool is None:
+        # spawn: forking a process that runs an event loop and threads is unsafe
+        _repair_pool = ProcessPoolExecutor(REPAIR_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+    return _repair_pool
+
+def _call_in_pool(call: Callable[[], Any]):
+    """Runs in a pool process: the result or exception, and the operations timed meanwhile."""
+    before = snapshot_operations()
+    try:
+        return call(), None, operations_since(before)
+    except Exception as e:
+        return None, e, operations_since(before)
+
+async def run_cpu_bound(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Runs parsing/repair work off the event loop, in the repair process pool.
+    `fn` and its arguments must be picklable. Each pool process keeps its own
+    parsed-DOM caches, which stay warm across jobs.
+    """
+    global _repair_pool
+    pool = repair_pool()
+    call = partial(fn, *args, **kwargs)
+    if pool is None:
+        return await asyncio.to_thread(call)
+    try:
+        result, error, timings = await asyncio.get_running_loop().run_in_executor(pool, partial(_call_in_pool, call))
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM on a huge page); start a fresh pool for the next job
+        _repair_pool = None
+        raise
+    merge_operations(timings)
+    if error is not None:
+        raise error
+    return result
+
+def shutdown_repair_pool():
+    global _repair_pool
+    if _repair_pool is not None:
+        _repair_pool.shutdown(wait=False, cancel_futures=True)
+        _repair_pool = None
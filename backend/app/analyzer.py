@@ -1,8 +1,91 @@
-from typing import List, Dict, Any, Optional
-from .models import ScraperRun, DriftType, Alert
+from typing import List, Dict, Any, Optional, Tuple
+from .models import ScraperRun, DriftType, Alert, SchemaFingerprint
+from .layout import LAYOUT_CHANGE_BITS, SIMHASH_BITS, layout_distance
+from .telemetry import timed
+import hashlib
 import uuid
 from datetime import datetime
 
+# A key whose presence frequency drops by at least this much is considered partially broken
+PARTIAL_BREAKAGE_DROP = 0.5
+
+def value_type(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, str):
+        return "str"
+    if isinstance(value, list):
+        return "list"
+    if isinstance(value, dict):
+        return "dict"
+    return type(value).__name__
+
+def presence_class(frequency: float) -> str:
+    if frequency >= 1.0:
+        return "all"
+    if frequency >= 0.5:
+        return "most"
+    return "some"
+
+def compute_schema_fingerprint(sample: Optional[List[Dict[str, Any]]]) -> Optional[SchemaFingerprint]:
+    """
+    Summarizes key presence and value types across every item of the sample.
+    The hash only covers keys, presence classes and types, so it stays stable
+    across runs unless the shape of the data really changes.
+    """
+    if not sample:
+        return None
+
+    present: Dict[str, int] = {}
+    types: Dict[str, set] = {}
+    for item in sample:
+        for key, value in item.items():
+            t = value_type(value)
+            if t is None:
+                types.setdefault(key, set())
+                continue
+            present[key] = present.get(key, 0) + 1
+            types.setdefault(key, set()).add(t)
+
+    size = len(sample)
+    key_frequencies = {key: present.get(key, 0) / size for key in types}
+    key_types = {key: "|".join(sorted(ts)) for key, ts in types.items()}
+
+    canonical = ";".join(
+        f"{key}:{presence_class(key_frequencies[key])}:{key_types[key]}"
+        for key in sorted(types)
+    )
+    return SchemaFingerprint(
+        hash=hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16],
+        sample_size=size,
+        key_frequencies=key_frequencies,
+        key_types=key_types
+    )
+
+def diff_schema(last: SchemaFingerprint, current: SchemaFingerprint) -> Tuple[set, set, set, Dict[str, Tuple[str, str]]]:
+    """Returns (missing, added, partially broken, type changes) between two fingerprints."""
+    last_keys = {k for k, f in last.key_frequencies.items() if f > 0}
+    curr_keys = {k for k, f in current.key_frequencies.items() if f > 0}
+    missing = last_keys - curr_keys
+    added = curr_keys - last_keys
+    partial = {
+        k for k in last_keys & curr_keys
+        if last.key_frequencies[k] - current.key_frequencies[k] >= PARTIAL_BREAKAGE_DROP
+    }
+    type_changes = {
+        k: (last.key_types[k], current.key_types[k])
+        for k in last_keys & curr_keys
+        if last.key_types[k] != current.key_types[k]
+    }
+    return missing, added, partial, type_changes
+
+@timed("detect_drift")
 def detect_drift(current_run: ScraperRun, last_run: Optional[ScraperRun]) -> List[Alert]:
     alerts = []
 
@@ -23,18 +106,43 @@ def detect_drift(current_run: ScraperRun, last_run: Optional[ScraperRun]) -> Lis
         ))
         return alerts
 
+    # 2. Check the page structure, whatever was extracted: a redesign can keep
+    # matching the selectors for a while before the values go wrong
+    if current_run.layout_fingerprint and last_run.layout_fingerprint:
+        distance = layout_distance(current_run.layout_fingerprint, last_run.layout_fingerprint)
+        if distance > LAYOUT_CHANGE_BITS:
+            alerts.append(Alert(
+                id=str(uuid.uuid4()),
+                scraper_id=current_run.scraper_id,
+                run_id=current_run.id,
+                type=DriftType.LAYOUT_CHANGE,
+                message=f"Page layout changed: {distance} of {SIMHASH_BITS} structure fingerprint bits differ",
+                severity="MEDIUM",
+                timestamp=datetime.now()
+            ))
+
     if not current_run.extracted_data_sample or not last_run.extracted_data_sample:
         return alerts
 
-    # 2. Check for Schema Change (Keys mismatch)
-    # We compare the keys of the first item in the sample
-    curr_keys = set(current_run.extracted_data_sample[0].keys())
-    last_keys = set(last_run.extracted_data_sample[0].keys())
+    # 3. Check for Schema Change using the fingerprints computed at ingest.
+    # Runs stored before fingerprinting existed get one computed here.
+    curr_fp = current_run.schema_fingerprint or compute_schema_fingerprint(current_run.extracted_data_sample)
+    last_fp = last_run.schema_fingerprint or compute_schema_fingerprint(last_run.extracted_data_sample)
 
-    if curr_keys != last_keys:
-        missing = last_keys - curr_keys
-        added = curr_keys - last_keys
-        message = f"Schema changed. Missing keys: {missing}, Added keys: {added}"
+    if curr_fp.hash == last_fp.hash:
+        return alerts
+
+    missing, added, partial, type_changes = diff_schema(last_fp, curr_fp)
+    if missing or added or partial or type_changes:
+        message = f"Schema changed. Missing keys: {missing or set()}, Added keys: {added or set()}"
+        if partial:
+            message += ", Partially missing keys: " + ", ".join(
+                f"{k} ({last_fp.key_frequencies[k]:.0%} -> {curr_fp.key_frequencies[k]:.0%})" for k in sorted(partial)
+            )
+        if type_changes:
+            message += ", Type changes: " + ", ".join(
+                f"{k} ({old} -> {new})" for k, (old, new) in sorted(type_changes.items())
+            )
         alerts.append(Alert(
             id=str(uuid.uuid4()),
             scraper_id=current_run.scraper_id,
@@ -42,7 +150,8 @@ def detect_drift(current_run: ScraperRun, last_run: Optional[ScraperRun]) -> Lis
             type=DriftType.SCHEMA_CHANGE,
             message=message,
             severity="HIGH",
-            timestamp=datetime.now()
+            timestamp=datetime.now(),
+            missing_keys=sorted(missing | partial)
         ))
 
     return alerts
@@ -1,135 +1,323 @@
 import os
-import asyncio
-from typing import Optional, List, Dict, Any
-from datetime import datetime
-import json
-from .models import Scraper, ScraperRun, Alert, ScraperConfig
+from typing import Optional, List, Dict, Any, Tuple
+from .models import Scraper, ScraperRun, RunSummary, Alert, RepairSuggestion, HealthSummary, Incident, MetricsBucket
+from .pagination import SortKey
+from .stats import RollingStats
+from .health import ScraperHealth
+from .events import event_bus
+from .telemetry import timed_db
+from .rollups import RollupKey, accumulate, to_bucket
+from .snapshots import SnapshotStore, MemorySnapshotStore, LocalSnapshotStore
+from .storage import StorageBackend, RUN_SUMMARY_FIELDS, HEALTH_SUMMARY_FIELDS, create_storage, project
 
 # Get MongoDB URL from env.
 # Use "mock://" to run in-memory for testing/demo without Mongo.
 MONGODB_URL = os.getenv("MONGODB_URL", "mock://")
+# Storage engine: "mock://", "sqlite:///path/to/data.db" or a MongoDB URL (defaults to MONGODB_URL).
+# SQLite is shared by every process on the host, so it suits `uvicorn --workers N`.
+STORAGE_URL = os.getenv("STORAGE_URL", MONGODB_URL)
 DB_NAME = "scraper_sre"
+# Optional directory for the compressed local snapshot store.
+# When unset, snapshots go to the storage engine's default store
+# (GridFS for Mongo, a directory next to the SQLite file, memory in mock mode).
+SNAPSHOT_STORE_PATH = os.getenv("SNAPSHOT_STORE_PATH")
 
-client = None
-db = None
+storage: StorageBackend = create_storage(STORAGE_URL, DB_NAME)
 
-# In-memory storage for mock mode
-mock_storage = {
-    "scrapers": [],
-    "runs": [],
-    "alerts": []
-}
-
-async def connect_to_mongo():
-    global client, db
-    if MONGODB_URL.startswith("mock://"):
-        print("Using In-Memory Mock Database")
-        return
+# Content-addressed HTML snapshot storage
+snapshot_store: SnapshotStore = (
+    LocalSnapshotStore(SNAPSHOT_STORE_PATH) if SNAPSHOT_STORE_PATH else MemorySnapshotStore()
+)
 
+async def connect_to_storage():
+    global snapshot_store
     try:
-        from motor.motor_asyncio import AsyncIOMotorClient
-        client = AsyncIOMotorClient(MONGODB_URL)
-        db = client[DB_NAME]
-        print(f"Connected to MongoDB at {MONGODB_URL}")
+        await storage.open()
+        if not SNAPSHOT_STORE_PATH:
+            snapshot_store = storage.snapshot_store()
+        print(f"Using {type(storage).__name__} storage")
     except Exception as e:
-        print(f"Failed to connect to MongoDB: {e}")
+        print(f"Failed to open storage: {e}")
 
-async def close_mongo_connection():
-    global client
-    if client:
-        client.close()
+async def close_storage():
+    await storage.close()
 
 # --- Scraper Operations ---
 
+@timed_db
 async def create_scraper(scraper: Scraper):
-    if MONGODB_URL.startswith("mock://"):
-        mock_storage["scrapers"].append(scraper.model_dump(mode='json'))
-        return
-    await db.scrapers.insert_one(scraper.model_dump(mode='json'))
+    await storage.add_scraper(scraper.model_dump(mode='json'))
 
+@timed_db
 async def get_scraper(scraper_id: str) -> Optional[Scraper]:
-    if MONGODB_URL.startswith("mock://"):
-        for doc in mock_storage["scrapers"]:
-            if doc["id"] == scraper_id:
-                return Scraper(**doc)
-        return None
-    doc = await db.scrapers.find_one({"id": scraper_id})
+    doc = await storage.get_scraper(scraper_id)
     if doc:
         return Scraper(**doc)
     return None
 
+@timed_db
 async def get_all_scrapers() -> List[Scraper]:
-    if MONGODB_URL.startswith("mock://"):
-        return [Scraper(**doc) for doc in mock_storage["scrapers"]]
-    cursor = db.scrapers.find({})
-    scrapers = []
-    async for doc in cursor:
-        scrapers.append(Scraper(**doc))
-    return scrapers
+    return [Scraper(**doc) for doc in await storage.all_scrapers()]
+
+@timed_db
+async def get_scraper_docs() -> List[Dict[str, Any]]:
+    """Stored scraper documents as they are, for responses that skip model validation."""
+    return await storage.all_scrapers()
+
+@timed_db
+async def count_scrapers() -> int:
+    return await storage.count_scrapers()
+
+# --- Snapshot Operations ---
+
+@timed_db
+async def save_snapshot(html: str) -> str:
+    """Stores the snapshot (once per distinct content) and returns its hash."""
+    return await snapshot_store.put(html)
+
+@timed_db
+async def get_snapshot(snapshot_hash: str) -> Optional[str]:
+    return await snapshot_store.get(snapshot_hash)
+
+@timed_db
+async def snapshot_exists(snapshot_hash: str) -> bool:
+    return await snapshot_store.exists(snapshot_hash)
 
 # --- Run Operations ---
 
+def run_to_doc(run: ScraperRun) -> Dict[str, Any]:
+    # Snapshots live in the snapshot store; runs only keep the hash.
+    return run.model_dump(mode='json', exclude={"html_snapshot"})
+
+def publish_run(doc: Dict[str, Any]):
+    # Live listeners get the same summary fields as run listings
+    event_bus.publish("run", doc["scraper_id"], project(doc, RUN_SUMMARY_FIELDS))
+
+@timed_db
 async def save_run(run: ScraperRun):
-    if MONGODB_URL.startswith("mock://"):
-        mock_storage["runs"].append(run.model_dump(mode='json'))
+    doc = run_to_doc(run)
+    await storage.add_runs([doc])
+    await save_rollups(accumulate([doc]))
+    publish_run(doc)
+
+@timed_db
+async def save_runs(runs: List[ScraperRun]):
+    """Bulk insert used by batch ingest."""
+    if not runs:
         return
-    await db.runs.insert_one(run.model_dump(mode='json'))
-
-async def get_last_successful_run(scraper_id: str, exclude_run_id: Optional[str] = None) -> Optional[ScraperRun]:
-    if MONGODB_URL.startswith("mock://"):
-        # Filter and sort in memory
-        candidates = [r for r in mock_storage["runs"]
-                      if r["scraper_id"] == scraper_id and r["status"] == "SUCCESS"]
-        if exclude_run_id:
-            candidates = [r for r in candidates if r["id"] != exclude_run_id]
-
-        # Sort by timestamp desc
-        candidates.sort(key=lambda x: x["timestamp"], reverse=True)
-
-        if candidates:
-            return ScraperRun(**candidates[0])
-        return None
-
-    query = {"scraper_id": scraper_id, "status": "SUCCESS"}
-    if exclude_run_id:
-        query["id"] = {"$ne": exclude_run_id}
-
-    doc = await db.runs.find_one(
-        query,
-        sort=[("timestamp", -1)]
-    )
+    docs = [run_to_doc(run) for run in runs]
+    await storage.add_runs(docs)
+    await save_rollups(accumulate(docs))
+    for doc in docs:
+        publish_run(doc)
+
+@timed_db
+async def get_last_successful_run(
+    scraper_id: str,
+    before: Optional[SortKey] = None
+) -> Optional[ScraperRun]:
+    """
+    Newest successful run, optionally only among runs ordered before `before`,
+    so a run analyzed late is still compared with the run that preceded it.
+    """
+    doc = await storage.last_successful_run(scraper_id, before=before)
     if doc:
         return ScraperRun(**doc)
     return None
 
+@timed_db
 async def get_runs(scraper_id: str, limit: int = 20) -> List[ScraperRun]:
-    if MONGODB_URL.startswith("mock://"):
-        candidates = [r for r in mock_storage["runs"] if r["scraper_id"] == scraper_id]
-        candidates.sort(key=lambda x: x["timestamp"], reverse=True)
-        return [ScraperRun(**doc) for doc in candidates[:limit]]
+    return [ScraperRun(**doc) for doc in await storage.latest_runs(scraper_id, limit)]
+
+@timed_db
+async def get_run_summaries(
+    scraper_id: str,
+    limit: int = 20,
+    before: Optional[SortKey] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    status: Optional[str] = None
+) -> List[RunSummary]:
+    docs = await storage.page_runs(scraper_id, limit, before=before, since=since, until=until, status=status)
+    return [RunSummary(**project(doc, RUN_SUMMARY_FIELDS)) for doc in docs]
+
+@timed_db
+async def get_run_summary_docs(
+    scraper_id: str,
+    limit: int = 20,
+    before: Optional[SortKey] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    status: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Same as get_run_summaries, as plain JSON-ready documents."""
+    docs = await storage.page_runs(scraper_id, limit, before=before, since=since, until=until, status=status)
+    return [project(doc, RUN_SUMMARY_FIELDS) for doc in docs]
+
+@timed_db
+async def get_latest_run_key(scraper_id: str) -> Optional[SortKey]:
+    """(timestamp, id) of the scraper's newest run; changes whenever a run is stored."""
+    docs = await storage.page_runs(scraper_id, 1)
+    return (docs[0]["timestamp"], docs[0]["id"]) if docs else None
+
+@timed_db
+async def get_run(run_id: str) -> Optional[ScraperRun]:
+    doc = await storage.get_run(run_id)
+    if doc:
+        return ScraperRun(**doc)
+    return None
+
+@timed_db
+async def get_runs_by_ids(run_ids: List[str]) -> List[ScraperRun]:
+    """Runs in the order of `run_ids`; unknown ids are skipped."""
+    return [ScraperRun(**doc) for doc in await storage.get_runs(run_ids)]
 
-    cursor = db.runs.find({"scraper_id": scraper_id}).sort("timestamp", -1).limit(limit)
-    runs = []
-    async for doc in cursor:
-        runs.append(ScraperRun(**doc))
-    return runs
+@timed_db
+async def expire_runs(before: str) -> Tuple[int, int]:
+    """
+    Deletes runs older than `before`, keeping each scraper's latest successful
+    run as its drift baseline, then the snapshots no remaining run references.
+    Returns (runs deleted, snapshots deleted).
+    """
+    deleted, released = await storage.expire_runs(before)
+    for h in released:
+        await snapshot_store.delete(h)
+    return deleted, len(released)
+
+@timed_db
+async def get_runs_expired_before() -> Optional[str]:
+    """Changes whenever retention deletes runs, in any process sharing the storage."""
+    return await storage.runs_expired_before()
 
 # --- Alert Operations ---
 
+@timed_db
 async def save_alert(alert: Alert):
-    if MONGODB_URL.startswith("mock://"):
-        mock_storage["alerts"].append(alert.model_dump(mode='json'))
+    doc = alert.model_dump(mode='json')
+    await storage.add_alert(doc)
+    event_bus.publish("alert", alert.scraper_id, doc)
+
+@timed_db
+async def get_alert_docs(
+    scraper_id: str,
+    limit: int = 20,
+    before: Optional[SortKey] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    severity: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Newest-first page of a scraper's alerts, as plain JSON-ready documents."""
+    return await storage.page_alerts(scraper_id, limit, before=before, since=since, until=until, severity=severity)
+
+@timed_db
+async def get_latest_alert_key(scraper_id: str) -> Optional[SortKey]:
+    docs = await storage.page_alerts(scraper_id, 1)
+    return (docs[0]["timestamp"], docs[0]["id"]) if docs else None
+
+# --- Incident Operations ---
+
+@timed_db
+async def get_incidents(scraper_id: str, limit: int = 20, status: Optional[str] = None) -> List[Incident]:
+    """Most recently active first."""
+    return [Incident(**doc) for doc in await storage.scraper_incidents(scraper_id, status, limit)]
+
+@timed_db
+async def get_open_incidents(scraper_id: str) -> List[Incident]:
+    return [Incident(**doc) for doc in await storage.scraper_incidents(scraper_id, "OPEN")]
+
+@timed_db
+async def save_incidents(incidents: List[Incident]):
+    if not incidents:
+        return
+    docs = [incident.model_dump(mode='json') for incident in incidents]
+    await storage.save_incidents(docs)
+    for doc in docs:
+        event_bus.publish("incident", doc["scraper_id"], doc)
+
+# --- Repair Suggestion Operations ---
+
+@timed_db
+async def save_repair_suggestions(suggestions: List[RepairSuggestion]):
+    if not suggestions:
+        return
+    await storage.add_repairs([s.model_dump(mode='json') for s in suggestions])
+
+@timed_db
+async def find_repair_suggestions(
+    old_selector: str,
+    old_snapshot_hash: str,
+    new_snapshot_hash: str
+) -> List[RepairSuggestion]:
+    """Suggestions already computed for this selector and pair of snapshots, best first."""
+    docs = await storage.find_repairs((old_selector, old_snapshot_hash, new_snapshot_hash))
+    suggestions = [RepairSuggestion(**doc) for doc in docs]
+    suggestions.sort(key=lambda s: s.confidence_score, reverse=True)
+    return suggestions
+
+@timed_db
+async def get_repair_suggestion_docs(
+    scraper_id: str,
+    limit: int = 20,
+    before: Optional[SortKey] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Newest-first page of a scraper's repair suggestions, as plain JSON-ready documents."""
+    return await storage.page_repairs(scraper_id, limit, before=before, since=since, until=until)
+
+@timed_db
+async def get_latest_repair_key(scraper_id: str) -> Optional[SortKey]:
+    docs = await storage.page_repairs(scraper_id, 1)
+    return (docs[0]["timestamp"], docs[0]["id"]) if docs else None
+
+# --- Rollup Operations ---
+
+@timed_db
+async def save_rollups(increments: Dict[RollupKey, Dict[str, Any]]):
+    if not increments:
         return
-    await db.alerts.insert_one(alert.model_dump(mode='json'))
-
-async def get_alerts(scraper_id: str, limit: int = 20) -> List[Alert]:
-    if MONGODB_URL.startswith("mock://"):
-        candidates = [r for r in mock_storage["alerts"] if r["scraper_id"] == scraper_id]
-        candidates.sort(key=lambda x: x["timestamp"], reverse=True)
-        return [Alert(**doc) for doc in candidates[:limit]]
-
-    cursor = db.alerts.find({"scraper_id": scraper_id}).sort("timestamp", -1).limit(limit)
-    alerts = []
-    async for doc in cursor:
-        alerts.append(Alert(**doc))
-    return alerts
+    await storage.add_rollups(increments)
+
+@timed_db
+async def get_rollups(
+    scraper_id: str,
+    resolution: str,
+    limit: int = 100,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+) -> List[MetricsBucket]:
+    """The newest `limit` buckets in range, oldest first (chart order)."""
+    docs = await storage.page_rollups(scraper_id, resolution, limit, since=since, until=until)
+    return [to_bucket(doc) for doc in docs]
+
+@timed_db
+async def expire_rollups(resolution: str, before: str) -> int:
+    return await storage.expire_rollups(resolution, before)
+
+# --- Health Summary Operations ---
+
+@timed_db
+async def get_health(scraper_id: str) -> Optional[ScraperHealth]:
+    doc = await storage.get_health(scraper_id)
+    if doc:
+        return ScraperHealth(doc)
+    return None
+
+@timed_db
+async def save_health(health: ScraperHealth):
+    await storage.save_health(health.to_doc())
+
+@timed_db
+async def get_fleet() -> List[HealthSummary]:
+    """Health summaries of every scraper, in a single read."""
+    return [HealthSummary(**project(doc, HEALTH_SUMMARY_FIELDS)) for doc in await storage.all_health()]
+
+# --- Rolling Statistics Operations ---
+
+@timed_db
+async def get_rolling_stats(scraper_id: str) -> RollingStats:
+    return RollingStats(scraper_id, await storage.get_stats(scraper_id))
+
+@timed_db
+async def save_rolling_stats(stats: RollingStats):
+    await storage.save_stats(stats.to_doc())
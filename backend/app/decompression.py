@@ -0,0 +1,172 @@
+import io
+import os
+import zlib
+from typing import Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+# Largest ingest request body accepted, measured after decompression
+MAX_INGEST_BODY_BYTES = int(os.getenv("MAX_INGEST_BODY_BYTES", str(100 * 1024 * 1024)))
+# Output is produced in pieces of at most this size, so a tiny "zip bomb"
+# never expands further than the limit before it is rejected
+DECODE_CHUNK_BYTES = 256 * 1024
+
+ZLIB_WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+class BodyTooLarge(Exception):
+    pass
+
+class UnsupportedEncoding(Exception):
+    pass
+
+class Decoder:
+    """Incremental decoder for one request body."""
+
+    def decode(self, data: bytes, limit: int) -> bytes:
+        """Decodes the next chunk; raises BodyTooLarge once more than `limit` bytes would come out."""
+        raise NotImplementedError
+
+    def flush(self, limit: int) -> bytes:
+        return b""
+
+class IdentityDecoder(Decoder):
+    def decode(self, data: bytes, limit: int) -> bytes:
+        if len(data) > limit:
+            raise BodyTooLarge()
+        return data
+
+class ZlibDecoder(Decoder):
+    """gzip and deflate, decoded as the body arrives."""
+
+    def __init__(self, wbits: int):
+        self.decompressor = zlib.decompressobj(wbits)
+
+    def decode(self, data: bytes, limit: int) -> bytes:
+        # With max_length = limit + 1, leftover input means the limit was passed
+        out = self.decompressor.decompress(data, limit + 1)
+        if len(out) > limit or self.decompressor.unconsumed_tail:
+            raise BodyTooLarge()
+        return out
+
+    def flush(self, limit: int) -> bytes:
+        if not self.decompressor.eof:
+            raise zlib.error("truncated stream")
+        return b""
+
+class ZstdDecoder(Decoder):
+    """
+    zstd (needs the optional `zstandard` package). Its streaming API can't cap
+    the output of a single call, so the compressed body is collected first and
+    read back through a bounded stream reader.
+    """
+
+    def __init__(self):
+        try:
+            import zstandard
+        except ImportError:
+            raise UnsupportedEncoding("zstd")
+        self.zstandard = zstandard
+        self.compressed = io.BytesIO()
+
+    def decode(self, data: bytes, limit: int) -> bytes:
+        # zstd never makes data larger by much, so the limit also bounds the input
+        if self.compressed.tell() + len(data) > limit:
+            raise BodyTooLarge()
+        self.compressed.write(data)
+        return b""
+
+    def flush(self, limit: int) -> bytes:
+        self.compressed.seek(0)
+        reader = self.zstandard.ZstdDecompressor().stream_reader(self.compressed, read_across_frames=True)
+        parts = []
+        size = 0
+        while True:
+            chunk = reader.read(DECODE_CHUNK_BYTES)
+            if not chunk:
+                return b"".join(parts)
+            size += len(chunk)
+            if size > limit:
+                raise BodyTooLarge()
+            parts.append(chunk)
+
+def create_decoder(content_encoding: Optional[str]) -> Decoder:
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding == "identity":
+        return IdentityDecoder()
+    if encoding in ZLIB_WBITS:
+        return ZlibDecoder(ZLIB_WBITS[encoding])
+    if encoding == "zstd":
+        return ZstdDecoder()
+    raise UnsupportedEncoding(encoding)
+
+class DecompressionMiddleware:
+    """
+    ASGI middleware for request bodies on the ingest endpoints: decodes
+    gzip/deflate/zstd bodies (Content-Encoding) as they arrive and answers 413
+    once the decoded body would exceed `max_body_bytes`, 415 for an unknown
+    encoding and 400 for a corrupt one. The app sees a plain JSON body.
+    """
+
+    def __init__(self, app, paths: Tuple[str, ...] = ("/api/v1/ingest",), max_body_bytes: int = MAX_INGEST_BODY_BYTES):
+        self.app = app
+        self.paths = paths
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        limit = self.max_body_bytes
+        try:
+            declared = int(headers.get(b"content-length", b"0"))
+        except ValueError:
+            declared = 0
+        try:
+            decoder = create_decoder(headers.get(b"content-encoding", b"").decode("latin-1") or None)
+            if declared > limit:
+                raise BodyTooLarge()
+            parts = []
+            size = 0
+            more = True
+            while more:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                more = message.get("more_body", False)
+                chunk = decoder.decode(message.get("body", b""), limit - size)
+                if not more:
+                    chunk += decoder.flush(limit - size - len(chunk))
+                size += len(chunk)
+                parts.append(chunk)
+        except BodyTooLarge:
+            await JSONResponse(
+                {"detail": f"Request body too large (max {limit} bytes decoded)"}, status_code=413
+            )(scope, receive, send)
+            return
+        except UnsupportedEncoding as e:
+            await JSONResponse({"detail": f"Unsupported Content-Encoding: {e}"}, status_code=415)(scope, receive, send)
+            return
+        except Exception as e:
+            # zlib.error / zstandard.ZstdError: a corrupt or truncated body
+            await JSONResponse({"detail": f"Could not decode request body: {e}"}, status_code=400)(scope, receive, send)
+            return
+
+        body = b"".join(parts)
+        # In place, not on a copy: the router sets scope["route"] on the scope it
+        # is given, and HTTPMetricsMiddleware (outside this one) labels by it
+        scope["headers"] = [
+            (name, value) for name, value in scope["headers"]
+            if name not in (b"content-encoding", b"content-length")
+        ] + [(b"content-length", str(len(body)).encode("latin-1"))]
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        await self.app(scope, replay, send)
@@ -0,0 +1,148 @@
+import hashlib
+import os
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from .cache import LRUCache
+
+# Parsed trees are cached per snapshot, so one snapshot is parsed once no
+# matter how many selectors are repaired against it. Indexes over a tree are
+# cached with it (see ParsedPage). Nothing else may hold on to a tree: other
+# caches keep derived data (strings, counts), so evicting a tree here really
+# frees it and DOM_CACHE_SIZE bounds the memory used.
+DOM_CACHE_SIZE = int(os.getenv("DOM_CACHE_SIZE", "64"))
+# Size of the new-DOM excerpt included in repair prompts
+MAX_CONTEXT_CHARS = 2000
+
+_dom_cache = LRUCache(DOM_CACHE_SIZE)
+
+T = TypeVar("T")
+
+class ParsedPage:
+    """A snapshot's parsed tree, and the indexes built over it on first use."""
+    __slots__ = ("soup", "indexes")
+
+    def __init__(self, soup: BeautifulSoup):
+        self.soup = soup
+        self.indexes: Dict[Any, Any] = {}
+
+    def index(self, kind: Callable[[BeautifulSoup], T]) -> T:
+        """The `kind(soup)` index of this page, built once per cached tree."""
+        index = self.indexes.get(kind)
+        if index is None:
+            index = self.indexes[kind] = kind(self.soup)
+        return index
+
+def html_key(html: str, snapshot_hash: Optional[str] = None) -> str:
+    return snapshot_hash or hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+def parse_page(html: str, snapshot_hash: Optional[str] = None) -> ParsedPage:
+    return _dom_cache.get_or_create(html_key(html, snapshot_hash), lambda: ParsedPage(BeautifulSoup(html, 'lxml')))
+
+def parse_html(html: str, snapshot_hash: Optional[str] = None) -> BeautifulSoup:
+    """
+    Returns the (shared, cached) parsed tree for a snapshot.
+    Callers must treat it as read-only.
+    """
+    return parse_page(html, snapshot_hash).soup
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+def subtree_text(element: Tag) -> str:
+    return normalize_text(" ".join(element.stripped_strings))
+
+class TextIndex:
+    """Elements of a page by their text, to find where an old element went."""
+
+    def __init__(self, soup: BeautifulSoup):
+        # Full subtree text -> elements with exactly that text (document order)
+        self.by_text: Dict[str, List[Tag]] = {}
+        # Individual text node -> the element directly containing it
+        self.by_string: Dict[str, List[Tag]] = {}
+
+        for element in soup.find_all(True):
+            text = subtree_text(element)
+            if text:
+                self.by_text.setdefault(text, []).append(element)
+            for child in element.children:
+                if isinstance(child, NavigableString) and not isinstance(child, Comment):
+                    s = normalize_text(child)
+                    if s:
+                        self.by_string.setdefault(s, []).append(element)
+
+class DomDiff:
+    """
+    Structural comparison of two cached pages. The new page's text index is
+    built once per cached tree and shared by every repair against it, so it
+    answers "where did this old element go?" without re-walking the new tree.
+    """
+
+    def __init__(self, old_page: ParsedPage, new_page: ParsedPage, old_key: str = "", new_key: str = ""):
+        self.old_page = old_page
+        self.new_page = new_page
+        self.old_soup = old_page.soup
+        self.new_soup = new_page.soup
+        self.old_key = old_key
+        self.new_key = new_key
+        index = new_page.index(TextIndex)
+        self.by_text = index.by_text
+        self.by_string = index.by_string
+
+    def locate(self, old_element: Tag) -> Optional[Tag]:
+        """Finds the element in the new page corresponding to `old_element`."""
+        # 1. The same content moved or had its attributes changed.
+        text = subtree_text(old_element)
+        candidates = self.by_text.get(text, []) if text else []
+        if candidates:
+            same_tag = [c for c in candidates if c.name == old_element.name]
+            # Nested wrappers share the same text; the innermost one comes last.
+            return (same_tag or candidates)[-1]
+
+        # 2. The content itself changed: anchor on the texts around it. Each anchor
+        #    votes for the new element standing where the old parent stood.
+        parent = old_element.parent
+        if parent is None:
+            return None
+        votes: Dict[int, Tuple[int, Tag]] = {}
+        for string in parent.find_all(string=True):
+            anchor = normalize_text(string)
+            if not anchor or anchor in text or isinstance(string, Comment):
+                continue
+            # How many levels the anchor's container sits below the old parent
+            levels = 0
+            node = string.parent
+            while node is not None and node is not parent:
+                node = node.parent
+                levels += 1
+            for container in self.by_string.get(anchor, []):
+                candidate = container
+                for _ in range(levels):
+                    candidate = candidate.parent if candidate is not None else None
+                if candidate is None:
+                    continue
+                count, _ = votes.get(id(candidate), (0, candidate))
+                votes[id(candidate)] = (count + 1, candidate)
+        if not votes:
+            return None
+        _, best = max(votes.values(), key=lambda v: v[0])
+        # `best` is the counterpart of the old parent; prefer a child with the old element's tag.
+        return best.find(old_element.name, recursive=False) or best
+
+    def region(self, old_element: Optional[Tag], max_chars: int = MAX_CONTEXT_CHARS) -> Optional[str]:
+        """HTML of the new page around where `old_element` moved, or None if not found."""
+        if old_element is None:
+            return None
+        located = self.locate(old_element)
+        if located is None:
+            return None
+        # Include the surrounding container unless that would be the whole page
+        context = located
+        if located.parent is not None and located.parent.name not in ("body", "html", "[document]"):
+            context = located.parent
+        return str(context)[:max_chars]
+
+def get_dom_diff(old_html: str, new_html: str, old_hash: Optional[str] = None, new_hash: Optional[str] = None) -> DomDiff:
+    old_key = html_key(old_html, old_hash)
+    new_key = html_key(new_html, new_hash)
+    return DomDiff(parse_page(old_html, old_key), parse_page(new_html, new_key), old_key, new_key)
@@ -0,0 +1,106 @@
+import asyncio
+import itertools
+import json
+import uuid
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, Optional, Set, Tuple
+
+# In-process pub/sub feeding the server-sent events stream.
+# Events are only seen by clients connected to the process that published them.
+# Event ids are "<epoch>-<seq>": the epoch is drawn when the process starts, so
+# an id from before a restart is never mistaken for one of the new sequence.
+
+# Recent events kept for clients resuming with Last-Event-ID
+EVENT_HISTORY_SIZE = 10000
+# Per-client buffer; when a slow client falls this far behind, its oldest events are dropped
+CLIENT_BUFFER_SIZE = 1000
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_INTERVAL = 15.0
+
+def parse_event_id(value: str) -> Tuple[str, int]:
+    """Splits an event id into (epoch, seq); raises ValueError if malformed."""
+    epoch, _, seq = value.rpartition("-")
+    return epoch, int(seq)
+
+class Event:
+    __slots__ = ("id", "type", "scraper_id", "message")
+
+    def __init__(self, epoch: str, id: int, type: str, scraper_id: str, data: Dict[str, Any]):
+        self.id = id
+        self.type = type
+        self.scraper_id = scraper_id
+        # Serialized once, however many clients receive it
+        self.message = f"id: {epoch}-{id}\nevent: {type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+class Subscription:
+    def __init__(self, scraper_ids: Optional[Set[str]] = None, buffer_size: int = CLIENT_BUFFER_SIZE):
+        self.scraper_ids = scraper_ids
+        self.buffer: Deque[Event] = deque(maxlen=buffer_size)
+        self.dropped = 0
+        self.ready = asyncio.Event()
+
+    def wants(self, event: Event) -> bool:
+        return self.scraper_ids is None or event.scraper_id in self.scraper_ids
+
+    def push(self, event: Event):
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(event)
+        self.ready.set()
+
+class EventBus:
+    def __init__(self, history_size: int = EVENT_HISTORY_SIZE, epoch: Optional[str] = None):
+        self.epoch = epoch or uuid.uuid4().hex[:8]
+        self.ids = itertools.count(1)
+        self.history: Deque[Event] = deque(maxlen=history_size)
+        self.subscriptions: Set[Subscription] = set()
+
+    def publish(self, type: str, scraper_id: str, data: Dict[str, Any]) -> Event:
+        """Never blocks: slow subscribers lose their oldest buffered events instead."""
+        event = Event(self.epoch, next(self.ids), type, scraper_id, data)
+        self.history.append(event)
+        for subscription in self.subscriptions:
+            if subscription.wants(event):
+                subscription.push(event)
+        return event
+
+    def subscribe(self, scraper_ids: Optional[Iterable[str]] = None, last_event_id: Optional[str] = None) -> Subscription:
+        """Raises ValueError for a malformed last_event_id."""
+        subscription = Subscription(set(scraper_ids) if scraper_ids else None)
+        if last_event_id is not None:
+            epoch, last_seq = parse_event_id(last_event_id)
+            if epoch != self.epoch:
+                # Issued before a restart (or by another process): what was missed is unknown
+                subscription.dropped += 1
+            else:
+                if self.history and self.history[0].id > last_seq + 1:
+                    # Part of what the client missed is no longer in history
+                    subscription.dropped += 1
+                for event in self.history:
+                    if event.id > last_seq and subscription.wants(event):
+                        subscription.push(event)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscriptions.discard(subscription)
+
+    async def stream(self, subscription: Subscription) -> AsyncIterator[str]:
+        """SSE messages for a subscription, until the client goes away."""
+        try:
+            while True:
+                if subscription.dropped:
+                    # Tell the client its view has gaps, so it can re-fetch
+                    yield f"event: overflow\ndata: {json.dumps({'dropped': subscription.dropped})}\n\n"
+                    subscription.dropped = 0
+                while subscription.buffer:
+                    yield subscription.buffer.popleft().message
+                subscription.ready.clear()
+                try:
+                    await asyncio.wait_for(subscription.ready.wait(), HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+event_bus = EventBus()
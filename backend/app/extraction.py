@@ -0,0 +1,60 @@
+import random
+from typing import Any, Dict, List, Optional
+
+from .dom import parse_html
+from .replay import compile_selectors, element_text, match_selectors
+from .stats import coerce_number
+
+# Extraction for scrapers the platform runs itself (see scheduler.py): each
+# selector in a config is one field, and its i-th match is that field of item i.
+
+def extract_items(html: str, selectors: Dict[str, str], snapshot_hash: Optional[str] = None) -> List[Dict[str, Optional[str]]]:
+    """
+    Applies a config's selectors to a page, with the same compiled selectors
+    as replay. There are as many items as the most matches of
+    any selector; fields with fewer matches (or invalid selectors) are None.
+    """
+    matches = match_selectors(parse_html(html, snapshot_hash), compile_selectors(selectors))
+    columns = {field: [element_text(el) for el in elements] for field, elements in matches.items()}
+    count = max((len(values) for values in columns.values()), default=0)
+    return [
+        {field: (values[i] or None) if i < len(values) else None for field, values in columns.items()}
+        for i in range(count)
+    ]
+
+def field_totals(items: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Exact per-field totals, in the shape of models.FieldSummary."""
+    totals: Dict[str, Dict[str, Any]] = {}
+    distinct: Dict[str, set] = {}
+    for item in items:
+        for field, value in item.items():
+            summary = totals.setdefault(field, {"count": 0, "nulls": 0, "numeric_count": 0, "numeric_sum": 0.0})
+            summary["count"] += 1
+            if value is None:
+                summary["nulls"] += 1
+                continue
+            number = coerce_number(value)
+            if number is None:
+                distinct.setdefault(field, set()).add(value)
+            else:
+                summary["numeric_count"] += 1
+                summary["numeric_sum"] += number
+    for field, summary in totals.items():
+        summary["distinct"] = len(distinct.get(field, ()))
+    return totals
+
+def extract_run(html: str, selectors: Dict[str, str], sample_size: int, snapshot_hash: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Extraction results as ingest fields: the item count, a uniform sample of
+    at most `sample_size` items (in page order) and, when the sample doesn't
+    hold every item, exact per-field totals. Runs in the repair process pool,
+    so only this small summary is sent back, never every item. The parsed
+    page stays in that process's DOM cache for replays and repairs.
+    """
+    items = extract_items(html, selectors, snapshot_hash)
+    result: Dict[str, Any] = {"items_extracted": len(items), "extracted_data_sample": items, "field_stats": None}
+    if len(items) > sample_size:
+        keep = sorted(random.sample(range(len(items)), sample_size))
+        result["extracted_data_sample"] = [items[i] for i in keep]
+        result["field_stats"] = field_totals(items)
+    return result
@@ -0,0 +1,72 @@
+import math
+from typing import Any, Dict, List
+
+from .models import Alert, DriftType, HealthSummary, RunStatus, Scraper, ScraperRun
+
+# Success rates are reported over the last N runs for each of these N
+HEALTH_WINDOWS = (10, 100)
+# Run durations kept for the percentiles
+DURATION_WINDOW = 100
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = math.ceil(q * len(sorted_values))
+    return sorted_values[max(0, rank - 1)]
+
+class ScraperHealth:
+    """
+    Health of one scraper, updated one run at a time.
+    Besides the HealthSummary fields, the stored document keeps the sliding
+    windows (recent statuses and durations) that the summary is derived from.
+    """
+
+    def __init__(self, doc: Dict[str, Any]):
+        self.doc = doc
+        self.recent_statuses: List[bool] = doc.get("recent_statuses", [])
+        self.recent_durations: List[float] = doc.get("recent_durations", [])
+
+    @classmethod
+    def for_scraper(cls, scraper: Scraper) -> "ScraperHealth":
+        summary = HealthSummary(
+            scraper_id=scraper.id,
+            name=scraper.config.name,
+            target_url=scraper.config.target_url,
+            created_at=scraper.created_at
+        )
+        return cls(summary.model_dump(mode='json'))
+
+    @property
+    def scraper_id(self) -> str:
+        return self.doc["scraper_id"]
+
+    def to_doc(self) -> Dict[str, Any]:
+        return {**self.doc, "recent_statuses": self.recent_statuses, "recent_durations": self.recent_durations}
+
+    def summary(self) -> HealthSummary:
+        return HealthSummary(**self.doc)
+
+    def update(self, run: ScraperRun, alerts: List[Alert], open_incidents: int):
+        """Folds an analyzed run, the alerts it raised and the resulting open incident count into the summary."""
+        doc = self.doc
+        success = run.status == RunStatus.SUCCESS
+        self.recent_statuses = (self.recent_statuses + [success])[-max(HEALTH_WINDOWS):]
+        self.recent_durations = (self.recent_durations + [run.duration_ms])[-DURATION_WINDOW:]
+
+        doc["version"] = doc.get("version", 0) + 1
+        doc["total_runs"] = doc.get("total_runs", 0) + 1
+        doc["last_run_id"] = run.id
+        doc["last_run_at"] = run.timestamp.isoformat()
+        doc["last_status"] = run.status.value
+        doc["success_rate"] = {
+            f"last_{n}": sum(self.recent_statuses[-n:]) / len(self.recent_statuses[-n:])
+            for n in HEALTH_WINDOWS
+        }
+        durations = sorted(self.recent_durations)
+        doc["p50_duration_ms"] = percentile(durations, 0.5)
+        doc["p95_duration_ms"] = percentile(durations, 0.95)
+
+        doc["open_incidents"] = open_incidents
+        drifts = [a for a in alerts if a.type != DriftType.RUN_FAILURE]
+        if drifts:
+            doc["last_drift_type"] = drifts[-1].type.value
+            doc["last_drift_at"] = drifts[-1].timestamp.isoformat()
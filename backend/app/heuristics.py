@@ -0,0 +1,269 @@
+import re
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import soupsieve
+from bs4 import BeautifulSoup, Tag
+
+from .cache import LRUCache
+from .dom import DomDiff, subtree_text
+
+# Deterministic, offline selector repair: fingerprint the element the broken
+# selector used to match, score elements of the new page against it, and
+# emit selectors that were verified to match the winning candidate.
+
+ANCESTOR_DEPTH = 4
+# Candidates scoring below this are not worth turning into selectors
+MIN_CANDIDATE_SCORE = 0.35
+# Verification budget per broken selector
+MAX_CANDIDATES_VERIFIED = 25
+
+WEIGHTS = {
+    "tag": 0.15,
+    "classes": 0.25,
+    "text": 0.20,
+    "ancestors": 0.15,
+    "position": 0.05,
+    "located": 0.20,
+}
+
+_SHAPE_RE = [(re.compile(r"\d+"), "9"), (re.compile(r"[^\W\d_]+"), "a"), (re.compile(r"\s+"), " ")]
+_TOKEN_SPLIT = re.compile(r"[-_]+")
+
+def text_shape(text: str) -> str:
+    """'$19.99' -> '$9.9', 'Cool Widget' -> 'a a'."""
+    for pattern, repl in _SHAPE_RE:
+        text = pattern.sub(repl, text)
+    return text
+
+def class_tokens(classes: List[str]) -> Set[str]:
+    """Class names split into sub-tokens, so 'price' and 'price-v2' partially match."""
+    tokens = set()
+    for cls in classes:
+        tokens.add(cls)
+        tokens.update(t for t in _TOKEN_SPLIT.split(cls) if t)
+    return tokens
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+class ElementFingerprint:
+    __slots__ = ("element", "tag", "classes", "class_set", "tokens", "text", "shape", "ancestors", "position")
+
+    def __init__(self, element: Tag):
+        self.element = element
+        self.tag = element.name
+        self.classes = list(element.get("class") or [])
+        self.class_set = frozenset(self.classes)
+        self.tokens = class_tokens(self.classes)
+        self.text = subtree_text(element)
+        self.shape = text_shape(self.text)
+        ancestors = []
+        parent = element.parent
+        while parent is not None and parent.name != "[document]" and len(ancestors) < ANCESTOR_DEPTH:
+            ancestors.append(parent.name)
+            parent = parent.parent
+        self.ancestors = tuple(ancestors)
+        # 1-based index among same-tag siblings, as in :nth-of-type
+        self.position = 1 + sum(1 for s in element.find_previous_siblings(element.name))
+
+def ancestor_similarity(a: Tuple[str, ...], b: Tuple[str, ...]) -> float:
+    if not a and not b:
+        return 1.0
+    matched = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        matched += 1
+    return matched / max(len(a), len(b))
+
+def score(old: ElementFingerprint, candidate: ElementFingerprint, located: bool) -> float:
+    s = 0.0
+    if old.tag == candidate.tag:
+        s += WEIGHTS["tag"]
+    s += WEIGHTS["classes"] * jaccard(old.tokens, candidate.tokens)
+    if old.text and old.text == candidate.text:
+        s += WEIGHTS["text"]
+    elif old.shape and old.shape == candidate.shape:
+        s += WEIGHTS["text"] * 0.75
+    s += WEIGHTS["ancestors"] * ancestor_similarity(old.ancestors, candidate.ancestors)
+    s += WEIGHTS["position"] / (1 + abs(old.position - candidate.position))
+    if located:
+        s += WEIGHTS["located"]
+    return s
+
+class CandidateIndex:
+    """Fingerprints of every text-bearing element of a page, grouped for fast candidate lookup."""
+
+    def __init__(self, soup: BeautifulSoup):
+        self.soup = soup
+        self.by_tag: Dict[str, List[ElementFingerprint]] = {}
+        self.by_shape: Dict[str, List[ElementFingerprint]] = {}
+        self.by_token: Dict[str, List[ElementFingerprint]] = {}
+        for element in soup.find_all(True):
+            if element.name in ("html", "head", "body", "script", "style"):
+                continue
+            fp = ElementFingerprint(element)
+            if not fp.text:
+                continue
+            self.by_tag.setdefault(fp.tag, []).append(fp)
+            self.by_shape.setdefault(fp.shape, []).append(fp)
+            for token in fp.tokens:
+                self.by_token.setdefault(token, []).append(fp)
+
+    def candidates(self, old: ElementFingerprint) -> List[ElementFingerprint]:
+        seen = {}
+        for fp in self.by_shape.get(old.shape, []):
+            seen[id(fp.element)] = fp
+        for token in old.tokens:
+            for fp in self.by_token.get(token, []):
+                seen[id(fp.element)] = fp
+        for fp in self.by_tag.get(old.tag, []):
+            if fp.tokens & old.tokens or fp.shape == old.shape:
+                seen[id(fp.element)] = fp
+        return list(seen.values())
+
+# Only derived data is cached here (compiled selectors, match counts): an
+# index holds elements, which would keep evicted DOM trees alive, so indexes
+# are cached with their tree instead (ParsedPage.index)
+_selector_cache = LRUCache(1024)
+_count_cache = LRUCache(4096)
+
+def compile_selector(selector: str):
+    """soupsieve-compiled selector, cached. Raises on invalid CSS."""
+    return _selector_cache.get_or_create(selector, lambda: soupsieve.compile(selector))
+
+def count_selector(index: CandidateIndex, key: str, selector: str, tag: str) -> int:
+    """
+    Number of indexed `tag` elements a (possibly complex) selector matches.
+    Matching only the index pool instead of walking the whole tree keeps this
+    cheap, and results are cached per (page, selector).
+    """
+    def count():
+        compiled = compile_selector(selector)
+        return sum(1 for fp in index.by_tag.get(tag, []) if compiled.match(fp.element))
+    return _count_cache.get_or_create((key, selector), count)
+
+def count_form(index: CandidateIndex, key: str, fp: ElementFingerprint, kind: str, selector: str) -> int:
+    """Match count for one of the forms produced by candidate_selectors."""
+    if kind == "id":
+        return 1
+    if kind == "tag_class":
+        return _count_cache.get_or_create((key, selector), lambda: sum(
+            1 for other in index.by_tag.get(fp.tag, []) if fp.class_set <= other.class_set
+        ))
+    if kind == "class":
+        return _count_cache.get_or_create((key, selector), lambda: sum(
+            1 for other in index.by_token.get(fp.classes[0], []) if fp.class_set <= other.class_set
+        ))
+    return count_selector(index, key, selector, fp.tag)
+
+def candidate_selectors(element: Tag) -> Iterator[Tuple[str, str]]:
+    """(kind, selector) forms for an element, from most to least general. Generated lazily."""
+    tag = element.name
+    classes = [soupsieve.escape(c) for c in element.get("class") or []]
+    if element.get("id"):
+        yield ("id", f"#{soupsieve.escape(element['id'])}")
+    if classes:
+        yield ("tag_class", f"{tag}." + ".".join(classes))
+        yield ("class", "." + ".".join(classes))
+    parent = element.parent
+    if parent is not None and parent.name not in ("[document]", "html", "body"):
+        parent_classes = [soupsieve.escape(c) for c in parent.get("class") or []]
+        parent_sel = parent.name + ("." + ".".join(parent_classes) if parent_classes else "")
+        yield ("child", f"{parent_sel} > {tag}" + ("." + ".".join(classes) if classes else ""))
+    # Fully positional fallback, anchored at the nearest ancestor with an id
+    path = []
+    node = element
+    while node is not None and node.name not in ("[document]", "html"):
+        if node.get("id") and node is not element:
+            path.append(f"#{soupsieve.escape(node['id'])}")
+            break
+        index = 1 + sum(1 for s in node.find_previous_siblings(node.name))
+        path.append(f"{node.name}:nth-of-type({index})")
+        node = node.parent
+    yield ("path", " > ".join(reversed(path)))
+
+def describe_change(old: ElementFingerprint, new: ElementFingerprint) -> str:
+    changes = []
+    if old.tag != new.tag:
+        changes.append(f"tag {old.tag} -> {new.tag}")
+    if set(old.classes) != set(new.classes):
+        changes.append(f"class {' '.join(old.classes) or '-'} -> {' '.join(new.classes) or '-'}")
+    if old.ancestors != new.ancestors:
+        changes.append(f"ancestors {' < '.join(old.ancestors)} -> {' < '.join(new.ancestors)}")
+    if old.text != new.text:
+        changes.append("text changed" if old.shape != new.shape else "same text shape")
+    return ", ".join(changes) or "unchanged element"
+
+class SelectorCandidate:
+    __slots__ = ("selector", "confidence", "summary")
+
+    def __init__(self, selector: str, confidence: float, summary: str):
+        self.selector = selector
+        self.confidence = confidence
+        self.summary = summary
+
+    def __repr__(self) -> str:
+        return f"SelectorCandidate({self.selector!r}, {self.confidence:.2f})"
+
+def rank_selector_repairs(diff: DomDiff, broken_selector: str, top_k: int = 3) -> List[SelectorCandidate]:
+    """
+    Ranks replacement selectors for `broken_selector`. Every returned selector
+    was re-run against the new page and matches the element it was built for.
+    """
+    try:
+        compiled_broken = compile_selector(broken_selector)
+    except Exception:
+        return []
+    old_element = compiled_broken.select_one(diff.old_soup)
+    if old_element is None:
+        return []
+    old = ElementFingerprint(old_element)
+    old_index = diff.old_page.index(CandidateIndex)
+    old_count = max(1, count_selector(old_index, diff.old_key, broken_selector, old.tag))
+
+    index = diff.new_page.index(CandidateIndex)
+    located = diff.locate(old_element)
+
+    scored = []
+    for fp in index.candidates(old):
+        s = score(old, fp, located is fp.element)
+        if s >= MIN_CANDIDATE_SCORE:
+            scored.append((s, fp))
+    if located is not None and not any(fp.element is located for _, fp in scored):
+        fp = ElementFingerprint(located)
+        scored.append((score(old, fp, True), fp))
+    scored.sort(key=lambda x: x[0], reverse=True)
+
+    results: List[SelectorCandidate] = []
+    seen_selectors = set()
+    for s, fp in scored[:MAX_CANDIDATES_VERIFIED]:
+        if len(results) >= top_k:
+            break
+        # Verify: pick the selector form that matches the candidate and
+        # matches about as many elements as the old selector did.
+        best: Optional[Tuple[float, str]] = None
+        for kind, selector in candidate_selectors(fp.element):
+            try:
+                if not compile_selector(selector).match(fp.element):
+                    continue
+            except Exception:
+                continue
+            count = max(1, count_form(index, diff.new_key, fp, kind, selector))
+            count_ratio = min(count, old_count) / max(count, old_count)
+            if best is None or count_ratio > best[0]:
+                best = (count_ratio, selector)
+            if count_ratio == 1.0:
+                break
+        # Siblings in a list all generalize to the same selector; keep only the best-scoring one.
+        if best is None or best[1] in seen_selectors:
+            continue
+        count_ratio, selector = best
+        seen_selectors.add(selector)
+        confidence = round(min(1.0, s) * (0.5 + 0.5 * count_ratio), 3)
+        results.append(SelectorCandidate(selector, confidence, describe_change(old, fp)))
+
+    results.sort(key=lambda c: c.confidence, reverse=True)
+    return results
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import re
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from .models import Alert, Incident, IncidentStatus
+
+# Minimum time between repair attempts for the same open incident
+INCIDENT_REPAIR_INTERVAL = timedelta(seconds=float(os.getenv("INCIDENT_REPAIR_INTERVAL", "3600")))
+
+# Variable parts of alert messages, replaced before fingerprinting so that
+# "timeout after 30s" and "timeout after 31s" are the same incident
+_NORMALIZERS = [
+    (re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"), "<id>"),
+    (re.compile(r"\b[0-9a-f]{16,}\b"), "<hex>"),
+    (re.compile(r"'[^']*'|\"[^\"]*\""), "<str>"),
+    (re.compile(r"[-+]?\d+(?:[.,]\d+)*%?"), "<n>"),
+    (re.compile(r"\s+"), " "),
+]
+
+def normalize_message(message: str) -> str:
+    message = message.lower()
+    for pattern, repl in _NORMALIZERS:
+        message = pattern.sub(repl, message)
+    return message.strip()
+
+def alert_fingerprint(alert: Alert) -> str:
+    parts = [
+        alert.scraper_id,
+        alert.type.value,
+        normalize_message(alert.message),
+        ",".join(sorted(alert.missing_keys or [])),
+    ]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+class IncidentTracker:
+    """
+    Open incidents of one scraper, loaded once per analysis job.
+    The caller persists `changed()` when the job is done.
+    """
+
+    def __init__(self, scraper_id: str, open_incidents: List[Incident]):
+        self.scraper_id = scraper_id
+        self.open: Dict[str, Incident] = {i.fingerprint: i for i in open_incidents}
+        self.dirty: Dict[str, Incident] = {}
+
+    @property
+    def open_count(self) -> int:
+        return len(self.open)
+
+    def observe(self, alert: Alert) -> Tuple[Incident, bool]:
+        """Folds an alert into its open incident. Returns (incident, whether it is new)."""
+        fingerprint = alert_fingerprint(alert)
+        incident = self.open.get(fingerprint)
+        if incident is None:
+            incident = Incident(
+                id=str(uuid.uuid4()),
+                scraper_id=alert.scraper_id,
+                fingerprint=fingerprint,
+                type=alert.type,
+                severity=alert.severity,
+                message=alert.message,
+                missing_keys=alert.missing_keys,
+                alert_id=alert.id,
+                first_seen=alert.timestamp,
+                last_seen=alert.timestamp,
+                last_run_id=alert.run_id
+            )
+            self.open[fingerprint] = incident
+            self.dirty[incident.id] = incident
+            return incident, True
+        incident.count += 1
+        incident.last_seen = alert.timestamp
+        incident.last_run_id = alert.run_id
+        self.dirty[incident.id] = incident
+        return incident, False
+
+    def should_repair(self, incident: Incident, now: Optional[datetime] = None) -> bool:
+        """Rate-limits repair attempts per incident; records the attempt when allowed."""
+        now = now or datetime.now()
+        if incident.last_repair_at and now - incident.last_repair_at < INCIDENT_REPAIR_INTERVAL:
+            return False
+        incident.last_repair_at = now
+        self.dirty[incident.id] = incident
+        return True
+
+    def resolve_all(self, now: Optional[datetime] = None):
+        """Called after a clean successful run."""
+        now = now or datetime.now()
+        for incident in self.open.values():
+            incident.status = IncidentStatus.RESOLVED
+            incident.resolved_at = now
+            self.dirty[incident.id] = incident
+        self.open = {}
+
+    def changed(self) -> List[Incident]:
+        changed = list(self.dirty.values())
+        self.dirty = {}
+        return changed
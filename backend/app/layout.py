@@ -0,0 +1,163 @@
+import hashlib
+import os
+import re
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+# Structural fingerprints of snapshots: a 64-bit SimHash over tag-path
+# shingles, so two runs' page layouts compare in constant time (Hamming
+# distance of two integers) without parsing or diffing either page.
+
+SIMHASH_BITS = 64
+# Tags per path shingle: a tag with its parent and grandparent
+SHINGLE_DEPTH = 3
+# Fingerprints further apart than this many bits count as a layout change
+LAYOUT_CHANGE_BITS = int(os.getenv("LAYOUT_CHANGE_BITS", "12"))
+# Layout changes are related when their new layouts are at most this far apart.
+# With 64 bits in RELATED_BANDS bands, any two such fingerprints share a band.
+RELATED_LAYOUT_BITS = 7
+RELATED_BANDS = RELATED_LAYOUT_BITS + 1
+# How long layout changes stay in the index
+LAYOUT_INDEX_WINDOW = timedelta(hours=float(os.getenv("LAYOUT_INDEX_WINDOW_HOURS", "24")))
+
+# Only the start of large pages is fingerprinted. That bounds the cost at
+# ingest (~50-100 us per KB, so a few ms at most) and still covers the head,
+# header, navigation and first screens of content that a redesign changes.
+LAYOUT_SCAN_CHARS = 64 * 1024
+
+# Just "<" and the (lowercased) tag name: attributes and "/>" don't matter,
+# since HTML parsers ignore "/>" on anything but void elements too
+_TAG_RE = re.compile(r"<(/?[a-z][a-z0-9:-]*)")
+# Content that isn't layout: scripts, styles, comments
+_SKIP_RE = re.compile(r"<!--.*?-->|<(script|style|noscript|template)\b[^>]*>.*?</\1\s*>", re.S)
+# Elements that never contain others: HTML void elements and common SVG shapes (written "<path/>")
+LEAF_TAGS = frozenset((
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr",
+    "circle", "ellipse", "line", "path", "polygon", "polyline", "rect", "stop", "use"
+))
+
+def tag_path_shingles(html: str) -> Set[str]:
+    """
+    Distinct paths of up to SHINGLE_DEPTH nested tags ("div/ul/li"). Only
+    tag names are used: class names churn with every deploy on many sites,
+    and repeated items (50 or 60 products) produce the same shingles.
+    """
+    paths: Set[Tuple[str, ...]] = set()
+    add = paths.add
+    # Padded so every path has SHINGLE_DEPTH - 1 ancestors
+    stack = [""] * (SHINGLE_DEPTH - 1)
+    depth = 1 - SHINGLE_DEPTH
+    for name in _TAG_RE.findall(_SKIP_RE.sub("", html[:LAYOUT_SCAN_CHARS].lower())):
+        if name[0] == "/":
+            # Tolerate unclosed tags: pop back to the matching open one, if any
+            name = name[1:]
+            if name in stack:
+                while stack.pop() != name:
+                    pass
+            continue
+        add((*stack[depth:], name))
+        if name not in LEAF_TAGS:
+            stack.append(name)
+    return {"/".join(filter(None, path)) for path in paths}
+
+def _feature_bits(feature: str) -> str:
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=SIMHASH_BITS // 8).digest()
+    return format(int.from_bytes(digest, "big"), f"0{SIMHASH_BITS}b")
+
+def simhash(features: Set[str]) -> int:
+    """Each bit is set when it is set in the hashes of most features."""
+    hashes = [_feature_bits(feature) for feature in features]
+    majority = len(hashes) / 2
+    # Column-wise counts over the bit strings, rather than a Python loop per feature and bit
+    return int("".join("1" if column.count("1") > majority else "0" for column in zip(*hashes)) or "0", 2)
+
+def layout_fingerprint(html: str) -> Optional[str]:
+    """16 hex digits, or None for a page without tags."""
+    shingles = tag_path_shingles(html)
+    if not shingles:
+        return None
+    return f"{simhash(shingles):016x}"
+
+def layout_distance(a: str, b: str) -> int:
+    """Bits that differ between two fingerprints (0 = same layout, ~32 = unrelated)."""
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+def bands(fingerprint: str, count: int = RELATED_BANDS) -> List[Tuple[int, int]]:
+    """(band number, band bits) pairs covering all 64 bits."""
+    value = int(fingerprint, 16)
+    edges = [round(i * SIMHASH_BITS / count) for i in range(count + 1)]
+    return [(i, (value >> edges[i]) & ((1 << (edges[i + 1] - edges[i])) - 1)) for i in range(count)]
+
+class LayoutChange:
+    __slots__ = ("scraper_id", "run_id", "timestamp", "old_fingerprint", "new_fingerprint", "distance")
+
+    def __init__(self, scraper_id: str, run_id: str, timestamp: datetime, old_fingerprint: str, new_fingerprint: str):
+        self.scraper_id = scraper_id
+        self.run_id = run_id
+        self.timestamp = timestamp
+        self.old_fingerprint = old_fingerprint
+        self.new_fingerprint = new_fingerprint
+        self.distance = layout_distance(old_fingerprint, new_fingerprint)
+
+class LayoutChangeIndex:
+    """
+    Recent layout changes, banded (LSH) by their new fingerprint, so finding
+    the scrapers whose sites moved to a similar layout in the same window
+    (e.g. a shared platform or theme rollout) only looks at colliding buckets.
+    In-process, like the event bus: it covers the runs this process analyzed.
+    """
+
+    def __init__(self, window: timedelta = LAYOUT_INDEX_WINDOW):
+        self.window = window
+        self.changes: Deque[LayoutChange] = deque()
+        self.buckets: Dict[Tuple[int, int], List[LayoutChange]] = {}
+        self.latest: Dict[str, LayoutChange] = {}
+        self.lock = threading.Lock()
+
+    def add(self, change: LayoutChange):
+        with self.lock:
+            self.expire(change.timestamp - self.window)
+            self.changes.append(change)
+            self.latest[change.scraper_id] = change
+            for band in bands(change.new_fingerprint):
+                self.buckets.setdefault(band, []).append(change)
+
+    def expire(self, before: datetime):
+        # Changes arrive roughly in time order; a late one just expires a bit late
+        while self.changes and self.changes[0].timestamp < before:
+            old = self.changes.popleft()
+            for band in bands(old.new_fingerprint):
+                bucket = self.buckets.get(band)
+                if bucket is not None:
+                    bucket.remove(old)
+                    if not bucket:
+                        del self.buckets[band]
+            if self.latest.get(old.scraper_id) is old:
+                del self.latest[old.scraper_id]
+
+    def latest_change(self, scraper_id: str) -> Optional[LayoutChange]:
+        with self.lock:
+            return self.latest.get(scraper_id)
+
+    def related(
+        self, change: LayoutChange, window: Optional[timedelta] = None, max_bits: int = RELATED_LAYOUT_BITS
+    ) -> List[Tuple[LayoutChange, int]]:
+        """
+        Other scrapers' changes within `window` of `change` whose new layouts
+        are at most `max_bits` apart from it, nearest first, one per scraper.
+        """
+        window = window or self.window
+        best: Dict[str, Tuple[LayoutChange, int]] = {}
+        with self.lock:
+            candidates = {id(c): c for band in bands(change.new_fingerprint) for c in self.buckets.get(band, ())}
+        for other in candidates.values():
+            if other.scraper_id == change.scraper_id or abs(other.timestamp - change.timestamp) > window:
+                continue
+            distance = layout_distance(change.new_fingerprint, other.new_fingerprint)
+            if distance <= max_bits and (other.scraper_id not in best or distance < best[other.scraper_id][1]):
+                best[other.scraper_id] = (other, distance)
+        return sorted(best.values(), key=lambda pair: (pair[1], pair[0].timestamp))
+
+layout_changes = LayoutChangeIndex()
@@ -1,30 +1,97 @@
+import asyncio
 import os
-import motor.motor_asyncio
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any, MutableMapping, Set, Tuple
+from datetime import datetime, timedelta
 import uuid
 import logging
 
-from .models import Scraper, ScraperConfig, ScraperRun, Alert, RepairSuggestion, RunStatus, DriftType
+from .models import Scraper, ScraperConfig, ScraperRun, RunSummary, Alert, RepairSuggestion, HealthSummary, Incident, IncidentStatus, MetricsBucket, MetricsResolution, RunStatus, DriftType, FieldSummary, ReplayResult, LayoutChangeInfo, RelatedLayoutChanges
 from .database import (
-    connect_to_mongo,
-    close_mongo_connection,
+    connect_to_storage,
+    close_storage,
     create_scraper as db_create_scraper,
     get_scraper as db_get_scraper,
+    get_all_scrapers as db_get_all_scrapers,
     save_run as db_save_run,
+    save_runs as db_save_runs,
     get_last_successful_run as db_get_last_successful_run,
     save_alert as db_save_alert,
-    get_runs as db_get_runs,
-    get_all_scrapers as db_get_all_scrapers,
-    get_alerts as db_get_alerts
+    get_run as db_get_run,
+    get_runs_by_ids as db_get_runs_by_ids,
+    get_scraper_docs as db_get_scraper_docs,
+    count_scrapers as db_count_scrapers,
+    get_run_summaries as db_get_run_summaries,
+    get_run_summary_docs as db_get_run_summary_docs,
+    get_latest_run_key as db_get_latest_run_key,
+    get_runs_expired_before as db_get_runs_expired_before,
+    get_alert_docs as db_get_alert_docs,
+    get_latest_alert_key as db_get_latest_alert_key,
+    save_snapshot as db_save_snapshot,
+    get_snapshot as db_get_snapshot,
+    snapshot_exists as db_snapshot_exists,
+    get_rolling_stats as db_get_rolling_stats,
+    save_rolling_stats as db_save_rolling_stats,
+    save_repair_suggestions as db_save_repair_suggestions,
+    find_repair_suggestions as db_find_repair_suggestions,
+    get_repair_suggestion_docs as db_get_repair_suggestion_docs,
+    get_latest_repair_key as db_get_latest_repair_key,
+    get_health as db_get_health,
+    save_health as db_save_health,
+    get_fleet as db_get_fleet,
+    get_incidents as db_get_incidents,
+    get_open_incidents as db_get_open_incidents,
+    save_incidents as db_save_incidents,
+    get_rollups as db_get_rollups
 )
-from .analyzer import detect_drift
-from .repair import generate_fix_prompt, mock_llm_repair
-
-app = FastAPI(title="Scraper SRE Platform")
+from .analyzer import detect_drift, compute_schema_fingerprint
+from .stats import RollingStats, summarize_sample
+from .health import ScraperHealth
+from .incidents import IncidentTracker
+from .retention import run_retention
+from .scheduler import SCHEDULER_ENABLED, Scheduler
+from .events import event_bus
+from .telemetry import (
+    ALERTS_RAISED,
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    REGISTRY,
+    RUNS_INGESTED,
+    HTTPMetricsMiddleware,
+    timed,
+    update_fleet_gauges
+)
+from .decompression import DecompressionMiddleware
+from .analysis_queue import AnalysisWorkers, Job, QueueFull, run_cpu_bound, shutdown_repair_pool
+from .snapshots import snapshot_hash as compute_snapshot_hash
+from .cache import LRUCache
+from .responses import json_response, make_etag, not_modified
+from .layout import LayoutChange, layout_changes, layout_fingerprint
+from .pagination import MAX_PAGE_SIZE, SortKey, encode_cursor, decode_cursor, timestamp_key
+
+background_tasks: List[asyncio.Task] = []
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup runs before a cold-started instance can answer anything, so it only
+    # does cheap setup: no index builds, retention passes or repair processes.
+    await connect_to_storage()
+    await analysis_workers.start()
+    background_tasks.append(asyncio.create_task(run_retention()))
+    if scheduler is not None:
+        background_tasks.append(asyncio.create_task(scheduler.run()))
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await analysis_workers.stop()
+    shutdown_repair_pool()
+    await close_storage()
+
+app = FastAPI(title="Scraper SRE Platform", lifespan=lifespan)
 
 # Allow CORS for frontend
 app.add_middleware(
@@ -33,24 +100,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+# Listings are mostly repetitive JSON and compress ~10x; SSE is excluded by the middleware
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+# Compressed ingest bodies (gzip/zstd from the SDK), with a cap on their decoded size
+app.add_middleware(DecompressionMiddleware, paths=("/api/v1/ingest",))
+app.add_middleware(HTTPMetricsMiddleware)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@app.on_event("startup")
-async def startup_event():
-    await connect_to_mongo()
+# Export one set of gauges per scraper on /metrics (disable for very large fleets)
+METRICS_PER_SCRAPER = os.getenv("METRICS_PER_SCRAPER", "true").lower() == "true"
+
+# Upper bound on runs accepted by a single batch ingest request
+MAX_INGEST_BATCH_SIZE = int(os.getenv("MAX_INGEST_BATCH_SIZE", "1000"))
+
+# Layout fingerprints by snapshot hash ("" for pages without tags), so a page
+# that hasn't changed isn't fingerprinted again
+layout_fingerprints = LRUCache(4096)
+
+# Memo keys for which no repair was found, so unfixable breakages aren't recomputed either
+unrepairable = LRUCache(4096)
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    await close_mongo_connection()
+# Seconds clients are asked to wait when the analysis queue is full
+QUEUE_FULL_RETRY_AFTER = 5
+
+# Recent runs searched for the latest snapshot to replay selectors against
+REPLAY_LOOKBACK = 20
+# Snapshots loaded and replayed at once by a bulk replay
+REPLAY_CONCURRENCY = 8
 
 class RegisterRequest(BaseModel):
     name: str
     target_url: str
     selectors: Dict[str, str]
+    schedule_interval: Optional[float] = Field(default=None, gt=0)
 
 class IngestRunRequest(BaseModel):
     scraper_id: str
@@ -59,23 +146,58 @@ class IngestRunRequest(BaseModel):
     items_extracted: int
     error_message: Optional[str] = None
     extracted_data_sample: Optional[List[Dict[str, Any]]] = None
+    # Exact per-field totals when extracted_data_sample is only a sample of the items
+    field_stats: Optional[Dict[str, FieldSummary]] = None
     html_snapshot: Optional[str] = None
+    # Clients that know the server already has the snapshot can send only its hash
+    snapshot_hash: Optional[str] = None
+
+class IngestBatchRequest(BaseModel):
+    runs: List[IngestRunRequest]
+
+class ReplayRequest(BaseModel):
+    # None replays every registered scraper
+    scraper_ids: Optional[List[str]] = None
+    # Candidate selectors to validate instead of each scraper's own config
+    selectors: Optional[Dict[str, str]] = None
 
 @app.get("/")
 async def root():
     return {"message": "Scraper SRE Platform API is running"}
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    if METRICS_PER_SCRAPER:
+        update_fleet_gauges(await db_get_fleet())
+    return PlainTextResponse(REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
 @app.post("/api/v1/register", response_model=Scraper)
 async def register_scraper(req: RegisterRequest):
+    from .replay import invalid_selectors
+    invalid = invalid_selectors(req.selectors)
+    if invalid:
+        raise HTTPException(status_code=422, detail=f"Invalid CSS selector for: {', '.join(invalid)}")
     scraper_id = str(uuid.uuid4())
-    config = ScraperConfig(name=req.name, target_url=req.target_url, selectors=req.selectors)
+    config = ScraperConfig(
+        name=req.name, target_url=req.target_url, selectors=req.selectors, schedule_interval=req.schedule_interval
+    )
     scraper = Scraper(id=scraper_id, config=config, created_at=datetime.now())
     await db_create_scraper(scraper)
+    await db_save_health(ScraperHealth.for_scraper(scraper))
+    if scheduler is not None:
+        scheduler.add(scraper)
     return scraper
 
 @app.get("/api/v1/scrapers", response_model=List[Scraper])
-async def list_scrapers():
-    return await db_get_all_scrapers()
+async def list_scrapers(request: Request):
+    # Scrapers are only ever added, so their count versions the list
+    etag = make_etag("scrapers", await db_count_scrapers())
+    return not_modified(request, etag) or json_response(await db_get_scraper_docs(), etag)
+
+@app.get("/api/v1/fleet", response_model=List[HealthSummary])
+async def fleet_overview():
+    # One read of the materialized summaries, however many scrapers there are
+    return await db_get_fleet()
 
 @app.get("/api/v1/scrapers/{scraper_id}", response_model=Scraper)
 async def get_scraper_details(scraper_id: str):
@@ -84,20 +206,303 @@ async def get_scraper_details(scraper_id: str):
         raise HTTPException(status_code=404, detail="Scraper not found")
     return scraper
 
-@app.get("/api/v1/scrapers/{scraper_id}/runs", response_model=List[ScraperRun])
-async def list_runs(scraper_id: str):
-    return await db_get_runs(scraper_id)
+def parse_cursor(cursor: Optional[str]) -> Optional[SortKey]:
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def paginate(items: list, limit: int, headers: MutableMapping[str, str]) -> list:
+    """
+    Handlers fetch limit + 1 items (models or stored documents); the extra one only
+    signals that another page exists. The cursor for that page is set in the X-Next-Cursor header.
+    """
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last if isinstance(last, dict) else {"timestamp": last.timestamp, "id": last.id})
+    return items
+
+@app.get("/api/v1/scrapers/{scraper_id}/runs", response_model=List[RunSummary])
+async def list_runs(
+    scraper_id: str,
+    request: Request,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    status: Optional[RunStatus] = None
+):
+    # Runs are immutable once stored, so any page is versioned by the newest run,
+    # and by the last retention pass that deleted runs
+    etag = make_etag(
+        "runs",
+        scraper_id,
+        await db_get_latest_run_key(scraper_id),
+        await db_get_runs_expired_before(),
+        str(request.url.query)
+    )
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    runs = await db_get_run_summary_docs(
+        scraper_id,
+        limit=limit + 1,
+        before=parse_cursor(cursor),
+        since=timestamp_key(since),
+        until=timestamp_key(until),
+        status=status.value if status else None
+    )
+    headers: Dict[str, str] = {}
+    return json_response(paginate(runs, limit, headers), etag, headers)
+
+@app.get("/api/v1/scrapers/{scraper_id}/metrics", response_model=List[MetricsBucket])
+async def get_metrics(
+    scraper_id: str,
+    resolution: MetricsResolution = MetricsResolution.HOUR,
+    limit: int = Query(100, ge=1, le=1000),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """Run metrics per time bucket, oldest first. Served from rollups only, so it outlives raw runs."""
+    return await db_get_rollups(
+        scraper_id,
+        resolution.value,
+        limit=limit,
+        since=timestamp_key(since),
+        until=timestamp_key(until)
+    )
+
+@app.get("/api/v1/runs/{run_id}", response_model=ScraperRun)
+async def get_run_details(run_id: str, include_snapshot: bool = False):
+    run = await db_get_run(run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+    if include_snapshot and run.snapshot_hash:
+        run.html_snapshot = await db_get_snapshot(run.snapshot_hash)
+    return run
 
 @app.get("/api/v1/scrapers/{scraper_id}/alerts", response_model=List[Alert])
-async def list_alerts(scraper_id: str):
-    return await db_get_alerts(scraper_id)
+async def list_alerts(
+    scraper_id: str,
+    request: Request,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    severity: Optional[str] = None
+):
+    etag = make_etag("alerts", scraper_id, await db_get_latest_alert_key(scraper_id), str(request.url.query))
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    alerts = await db_get_alert_docs(
+        scraper_id,
+        limit=limit + 1,
+        before=parse_cursor(cursor),
+        since=timestamp_key(since),
+        until=timestamp_key(until),
+        severity=severity
+    )
+    headers: Dict[str, str] = {}
+    return json_response(paginate(alerts, limit, headers), etag, headers)
+
+@app.get("/api/v1/scrapers/{scraper_id}/incidents", response_model=List[Incident])
+async def list_incidents(
+    scraper_id: str,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    status: Optional[IncidentStatus] = None
+):
+    return await db_get_incidents(scraper_id, limit=limit, status=status.value if status else None)
+
+def layout_change_info(change: LayoutChange, distance_to_change: Optional[int] = None) -> LayoutChangeInfo:
+    return LayoutChangeInfo(
+        scraper_id=change.scraper_id,
+        run_id=change.run_id,
+        timestamp=change.timestamp,
+        distance=change.distance,
+        distance_to_change=distance_to_change
+    )
 
-@app.post("/api/v1/ingest")
-async def ingest_run(req: IngestRunRequest, background_tasks: BackgroundTasks):
-    # 1. Save the run
-    run_id = str(uuid.uuid4())
-    run = ScraperRun(
-        id=run_id,
+@app.get("/api/v1/scrapers/{scraper_id}/layout-changes/related", response_model=RelatedLayoutChanges)
+async def related_layout_changes(scraper_id: str, window_minutes: float = Query(60, gt=0)):
+    """
+    The scraper's latest layout change, and other scrapers whose sites changed
+    to a similar layout within `window_minutes` of it (same theme or platform
+    rollout). Covers changes seen by this process in the index window.
+    """
+    change = layout_changes.latest_change(scraper_id)
+    if change is None:
+        raise HTTPException(status_code=404, detail="No recent layout change for this scraper")
+    related = layout_changes.related(change, timedelta(minutes=window_minutes))
+    return RelatedLayoutChanges(
+        change=layout_change_info(change),
+        related=[layout_change_info(other, distance) for other, distance in related]
+    )
+
+@app.get("/api/v1/scrapers/{scraper_id}/repairs", response_model=List[RepairSuggestion])
+async def list_repairs(
+    scraper_id: str,
+    request: Request,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    # Suggestions are never updated once stored, like runs and alerts
+    etag = make_etag("repairs", scraper_id, await db_get_latest_repair_key(scraper_id), str(request.url.query))
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    suggestions = await db_get_repair_suggestion_docs(
+        scraper_id,
+        limit=limit + 1,
+        before=parse_cursor(cursor),
+        since=timestamp_key(since),
+        until=timestamp_key(until)
+    )
+    headers: Dict[str, str] = {}
+    return json_response(paginate(suggestions, limit, headers), etag, headers)
+
+@app.get("/api/v1/stream")
+async def stream_events(
+    request: Request,
+    scraper_id: Optional[List[str]] = Query(None),
+    last_event_id: Optional[str] = None
+):
+    """
+    Server-sent events for new runs and alerts, optionally only for some scrapers.
+    Reconnecting clients resume after the Last-Event-ID header (or query parameter);
+    an id from before a restart gets an overflow event instead.
+    """
+    last_event_id = last_event_id or request.headers.get("last-event-id") or None
+    try:
+        subscription = event_bus.subscribe(scraper_id, last_event_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid Last-Event-ID: {last_event_id}")
+    return StreamingResponse(
+        event_bus.stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.api_route("/api/v1/snapshots/{snapshot_hash}", methods=["GET", "HEAD"])
+async def read_snapshot(snapshot_hash: str, request: Request):
+    # HEAD lets clients check whether an upload can be skipped
+    if request.method == "HEAD":
+        if not await db_snapshot_exists(snapshot_hash):
+            raise HTTPException(status_code=404, detail="Snapshot not found")
+        return Response(status_code=200)
+    html = await db_get_snapshot(snapshot_hash)
+    if html is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return HTMLResponse(html)
+
+@app.post("/api/v1/replay")
+@timed("replay_batch")
+async def replay_batch(req: ReplayRequest):
+    """
+    Replays selectors against each scraper's latest snapshot and reports exact
+    per-field hits, e.g. to re-validate a fleet after a config change. Scrapers
+    sharing a snapshot are evaluated against a single parse of it.
+    """
+    if req.scraper_ids is None:
+        scrapers = await db_get_all_scrapers()
+        unknown: List[str] = []
+    else:
+        found = await asyncio.gather(*(db_get_scraper(scraper_id) for scraper_id in req.scraper_ids))
+        scrapers = [scraper for scraper in found if scraper]
+        unknown = [scraper_id for scraper_id, scraper in zip(req.scraper_ids, found) if not scraper]
+
+    limit = asyncio.Semaphore(REPLAY_CONCURRENCY)
+
+    async def latest_snapshot_run(scraper: Scraper) -> Optional[RunSummary]:
+        async with limit:
+            runs = await db_get_run_summaries(scraper.id, limit=REPLAY_LOOKBACK)
+        return next((run for run in runs if run.snapshot_hash), None)
+
+    by_snapshot: Dict[str, List[Tuple[Scraper, RunSummary]]] = {}
+    without_snapshot: List[str] = []
+    for scraper, run in zip(scrapers, await asyncio.gather(*(latest_snapshot_run(s) for s in scrapers))):
+        if run is None:
+            without_snapshot.append(scraper.id)
+        else:
+            by_snapshot.setdefault(run.snapshot_hash, []).append((scraper, run))
+
+    results: List[ReplayResult] = []
+
+    async def replay_group(snapshot_hash: str, group: List[Tuple[Scraper, RunSummary]]):
+        async with limit:
+            html = await db_get_snapshot(snapshot_hash)
+            if html is None:
+                without_snapshot.extend(scraper.id for scraper, _ in group)
+                return
+            configs = [req.selectors or scraper.config.selectors for scraper, _ in group]
+            replayed = await replay_selectors(html, configs, snapshot_hash)
+        for (scraper, run), fields in zip(group, replayed):
+            results.append(ReplayResult(
+                scraper_id=scraper.id,
+                run_id=run.id,
+                snapshot_hash=snapshot_hash,
+                fields=fields,
+                broken_fields=broken_fields(fields)
+            ))
+
+    await asyncio.gather(*(replay_group(h, group) for h, group in by_snapshot.items()))
+    return {
+        "results": sorted(results, key=lambda r: r.scraper_id),
+        "without_snapshot": sorted(without_snapshot),
+        "unknown_scrapers": unknown
+    }
+
+async def resolve_snapshot(req: IngestRunRequest, known: Optional[Set[str]] = None) -> Optional[str]:
+    """
+    Stores an uploaded snapshot and returns its hash. For hash-only requests,
+    returns the hash if the snapshot store has it, otherwise None.
+    `known` caches hashes already resolved within a batch.
+    """
+    if req.html_snapshot:
+        # A client hashing differently would otherwise never skip an upload
+        if req.snapshot_hash and req.snapshot_hash != compute_snapshot_hash(req.html_snapshot):
+            raise HTTPException(status_code=409, detail="snapshot_hash does not match html_snapshot")
+        if known is None:
+            return await db_save_snapshot(req.html_snapshot)
+        h = compute_snapshot_hash(req.html_snapshot)
+        if h not in known:
+            await db_save_snapshot(req.html_snapshot)
+            known.add(h)
+        return h
+    if req.snapshot_hash:
+        if known is not None and req.snapshot_hash in known:
+            return req.snapshot_hash
+        if await db_snapshot_exists(req.snapshot_hash):
+            if known is not None:
+                known.add(req.snapshot_hash)
+            return req.snapshot_hash
+    return None
+
+def snapshot_layout(req: IngestRunRequest, snapshot_hash: Optional[str]) -> Optional[str]:
+    """
+    Layout fingerprint of the run's snapshot. Hash-only runs get one if this
+    process fingerprinted that snapshot before.
+    """
+    if not snapshot_hash:
+        return None
+    fingerprint = layout_fingerprints.get(snapshot_hash)
+    if fingerprint is None and req.html_snapshot:
+        # Cheap enough (a regex scan of at most LAYOUT_SCAN_CHARS) for the event loop;
+        # a trip through the busy repair pool would cost far more in queueing
+        fingerprint = layout_fingerprint(req.html_snapshot) or ""
+        layout_fingerprints.put(snapshot_hash, fingerprint)
+    return fingerprint or None
+
+def build_run(
+    req: IngestRunRequest, snapshot_hash: Optional[str] = None, layout: Optional[str] = None
+) -> ScraperRun:
+    return ScraperRun(
+        id=str(uuid.uuid4()),
         scraper_id=req.scraper_id,
         timestamp=datetime.now(),
         status=req.status,
@@ -105,64 +510,315 @@ async def ingest_run(req: IngestRunRequest, background_tasks: BackgroundTasks):
         items_extracted=req.items_extracted,
         error_message=req.error_message,
         extracted_data_sample=req.extracted_data_sample,
-        html_snapshot=req.html_snapshot
+        field_stats=req.field_stats,
+        html_snapshot=req.html_snapshot,
+        snapshot_hash=snapshot_hash,
+        schema_fingerprint=compute_schema_fingerprint(req.extracted_data_sample),
+        layout_fingerprint=layout
     )
-    await db_save_run(run)
 
-    # 2. Analyze asynchronously
-    background_tasks.add_task(analyze_run, run)
-
-    return {"run_id": run_id, "status": "processing"}
+def check_queue_capacity(jobs: int = 1):
+    # Reject before anything is stored, so a retried request doesn't duplicate runs
+    try:
+        analysis_workers.check_capacity(jobs)
+    except QueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Analysis queue is full ({e}); retry later",
+            headers={"Retry-After": str(QUEUE_FULL_RETRY_AFTER)}
+        )
 
+@app.post("/api/v1/ingest")
+@timed("ingest_run")
+async def ingest_run(req: IngestRunRequest):
+    run = await accept_run(req)
+    return {"run_id": run.id, "status": "processing"}
+
+async def accept_run(req: IngestRunRequest) -> ScraperRun:
+    """Stores one run and queues it for analysis (SDK ingest and scheduled scrapes)."""
+    check_queue_capacity()
+
+    # 1. Save the snapshot (deduplicated by content) and the run
+    snapshot_hash = await resolve_snapshot(req)
+    if req.snapshot_hash and not snapshot_hash:
+        raise HTTPException(status_code=409, detail="Unknown snapshot_hash; resend with html_snapshot")
+    run = build_run(req, snapshot_hash, snapshot_layout(req, snapshot_hash))
+    await db_save_run(run)
+    RUNS_INGESTED.labels(run.status.value).inc()
+
+    # 2. Queue for analysis by the worker owning this scraper
+    await analysis_workers.submit({run.scraper_id: [run.id]})
+    return run
+
+@app.post("/api/v1/ingest/batch")
+@timed("ingest_batch")
+async def ingest_batch(req: IngestBatchRequest):
+    if len(req.runs) > MAX_INGEST_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(req.runs)} runs (max {MAX_INGEST_BATCH_SIZE})"
+        )
+    check_queue_capacity(len({r.scraper_id for r in req.runs}))
+
+    # 1. Save distinct snapshots once, then all runs with a single bulk write.
+    # Runs referencing a snapshot we don't have are kept, minus the snapshot,
+    # and reported back so the client can stop assuming we have it.
+    known: Set[str] = set()
+    missing_snapshots: Set[str] = set()
+    hashes: List[Optional[str]] = []
+    # One request per distinct snapshot to fingerprint it from, preferably one carrying the HTML
+    sources: Dict[str, IngestRunRequest] = {}
+    for r in req.runs:
+        h = await resolve_snapshot(r, known)
+        if r.snapshot_hash and not h:
+            missing_snapshots.add(r.snapshot_hash)
+        if h and (h not in sources or (r.html_snapshot and not sources[h].html_snapshot)):
+            sources[h] = r
+        hashes.append(h)
+    # Each distinct page is fingerprinted once
+    layouts = {h: snapshot_layout(r, h) for h, r in sources.items()}
+    runs = [build_run(r, h, layouts.get(h)) for r, h in zip(req.runs, hashes)]
+    await db_save_runs(runs)
+    for run in runs:
+        RUNS_INGESTED.labels(run.status.value).inc()
+
+    # 2. Queue one analysis job per scraper, runs in batch order
+    runs_by_scraper: Dict[str, List[str]] = {}
+    for run in runs:
+        runs_by_scraper.setdefault(run.scraper_id, []).append(run.id)
+    await analysis_workers.submit(runs_by_scraper)
+
+    return {
+        "run_ids": [run.id for run in runs],
+        "status": "processing",
+        "missing_snapshots": sorted(missing_snapshots)
+    }
+
+def run_key(run: ScraperRun) -> SortKey:
+    return (timestamp_key(run.timestamp), run.id)
+
+class AnalysisResults:
+    """
+    Alerts, repairs and layout changes of one scraper's analysis, held back
+    with its stats, incidents and health until everything is computed. A job
+    that fails part-way is retried from the start, so it must not have
+    stored anything yet.
+    """
+
+    def __init__(self):
+        self.raised: List[Alert] = []
+        self.alerts: List[Alert] = [] # Only the first alert of each incident is stored
+        self.repairs: List[RepairSuggestion] = []
+        self.layout_changes: List[LayoutChange] = []
+
+    def find_repairs(self, selector: str, old_hash: str, new_hash: str) -> List[RepairSuggestion]:
+        """Suggestions for this breakage computed earlier in the same job."""
+        return [
+            s for s in self.repairs
+            if (s.old_selector, s.old_snapshot_hash, s.new_snapshot_hash) == (selector, old_hash, new_hash)
+        ]
+
+async def save_analysis(
+    results: AnalysisResults,
+    stats: RollingStats,
+    incidents: IncidentTracker,
+    health: Optional[ScraperHealth]
+):
+    for alert in results.alerts:
+        await db_save_alert(alert)
+    await db_save_repair_suggestions(results.repairs)
+    await db_save_rolling_stats(stats)
+    await db_save_incidents(incidents.changed())
+    if health:
+        await db_save_health(health)
+    for alert in results.raised:
+        ALERTS_RAISED.labels(alert.type.value).inc()
+    for change in results.layout_changes:
+        layout_changes.add(change)
+
+async def process_analysis_job(job: Job):
+    runs = await db_get_runs_by_ids(job.run_ids)
+    if len(runs) == 1:
+        await analyze_run(runs[0])
+    elif runs:
+        await analyze_batch(runs)
+
+analysis_workers = AnalysisWorkers(process_analysis_job)
+
+async def ingest_scheduled_run(payload: Dict[str, Any]):
+    await accept_run(IngestRunRequest(**payload))
+
+scheduler = Scheduler(db_get_all_scrapers, ingest_scheduled_run) if SCHEDULER_ENABLED else None
+
+@timed("analyze_run")
 async def analyze_run(run: ScraperRun):
     logger.info(f"Analyzing run {run.id} for scraper {run.scraper_id}")
 
-    # Get last successful run for comparison (excluding the current one)
-    last_run = await db_get_last_successful_run(run.scraper_id, exclude_run_id=run.id)
+    # Compare with the last successful run ingested before this one. Runs queued
+    # behind it are already stored, so "latest" would be the wrong baseline.
+    last_run = await db_get_last_successful_run(run.scraper_id, before=run_key(run))
+    stats = await db_get_rolling_stats(run.scraper_id)
+    health = await load_health(run.scraper_id)
+    incidents = IncidentTracker(run.scraper_id, await db_get_open_incidents(run.scraper_id))
+    results = AnalysisResults()
+    alerts = await analyze_against_baseline(run, last_run, stats, incidents, results)
+    if health:
+        health.update(run, alerts, incidents.open_count)
+    await save_analysis(results, stats, incidents, health)
+
+@timed("analyze_batch")
+async def analyze_batch(runs: List[ScraperRun]):
+    """
+    Analyzes a batch grouped by scraper. Each scraper's baseline is fetched once,
+    then advanced through the batch in order, as if the runs had been ingested one by one.
+    """
+    by_scraper: Dict[str, List[ScraperRun]] = {}
+    for run in runs:
+        by_scraper.setdefault(run.scraper_id, []).append(run)
+
+    for scraper_id, scraper_runs in by_scraper.items():
+        logger.info(f"Analyzing batch of {len(scraper_runs)} runs for scraper {scraper_id}")
+        last_run = await db_get_last_successful_run(scraper_id, before=run_key(scraper_runs[0]))
+        stats = await db_get_rolling_stats(scraper_id)
+        health = await load_health(scraper_id)
+        incidents = IncidentTracker(scraper_id, await db_get_open_incidents(scraper_id))
+        results = AnalysisResults()
+        for run in scraper_runs:
+            alerts = await analyze_against_baseline(run, last_run, stats, incidents, results)
+            if health:
+                health.update(run, alerts, incidents.open_count)
+            if run.status == RunStatus.SUCCESS:
+                last_run = run
+        await save_analysis(results, stats, incidents, health)
+
+async def load_health(scraper_id: str) -> Optional[ScraperHealth]:
+    health = await db_get_health(scraper_id)
+    if health is None:
+        # Scrapers registered before health summaries existed get one on their next run
+        scraper = await db_get_scraper(scraper_id)
+        if scraper:
+            health = ScraperHealth.for_scraper(scraper)
+    return health
+
+def record_alert(
+    alert: Alert,
+    incidents: IncidentTracker,
+    results: AnalysisResults,
+    repairable: bool = False
+) -> Optional[Alert]:
+    """
+    Folds an alert into its incident. Only the first alert of an incident is stored.
+    For repairable alerts, returns the alert to repair from (carrying the stored
+    alert's id), or None while the incident's repairs are rate-limited.
+    """
+    incident, is_new = incidents.observe(alert)
+    results.raised.append(alert)
+    if is_new:
+        logger.warning(f"Drift Detected: {alert.message}")
+        results.alerts.append(alert)
+    else:
+        logger.info(f"Repeat of incident {incident.id} ({incident.count}x): {alert.message}")
+    if not repairable or not incidents.should_repair(incident):
+        return None
+    return alert if is_new else alert.model_copy(update={"id": incident.alert_id})
+
+def failure_alert(run: ScraperRun) -> Alert:
+    return Alert(
+        id=str(uuid.uuid4()),
+        scraper_id=run.scraper_id,
+        run_id=run.id,
+        type=DriftType.RUN_FAILURE,
+        message=f"Run failed: {run.error_message}",
+        severity="HIGH",
+        timestamp=datetime.now()
+    )
+
+async def analyze_against_baseline(
+    run: ScraperRun,
+    last_run: Optional[ScraperRun],
+    stats: RollingStats,
+    incidents: IncidentTracker,
+    results: AnalysisResults
+) -> List[Alert]:
+    """
+    Returns the alerts raised for `run`, including ones folded into an existing incident.
+    The caller persists `results`, `stats` and `incidents`.
+    """
+    raised: List[Alert] = []
+
+    # Score successful runs against the scraper's rolling statistics, then fold them in.
+    if run.status == RunStatus.SUCCESS:
+        summary = summarize_sample(run.extracted_data_sample or [], run.field_stats)
+        for alert in stats.score(run, summary):
+            record_alert(alert, incidents, results)
+            raised.append(alert)
+        stats.update(run, summary)
 
     if not last_run:
         logger.info("No previous successful run found for comparison.")
         # If run failed, we still might want to alert
         if run.status == RunStatus.FAILURE:
-            alert = Alert(
-                id=str(uuid.uuid4()),
-                scraper_id=run.scraper_id,
-                run_id=run.id,
-                type=DriftType.VALUE_DISTRIBUTION,
-                message=f"Run failed: {run.error_message}",
-                severity="HIGH",
-                timestamp=datetime.now()
-            )
-            await db_save_alert(alert)
-        return
-
-    # Detect Drift
-    alerts = detect_drift(run, last_run)
-    for alert in alerts:
-        logger.warning(f"Drift Detected: {alert.message}")
-        await db_save_alert(alert)
-
-        # Trigger Repair if it's a schema change or null spike
-        if alert.type in [DriftType.SCHEMA_CHANGE, DriftType.NULL_SPIKE]:
-            await trigger_repair(run, last_run, alert)
-
-    # Detect Failure (if status is FAILURE)
-    if run.status == RunStatus.FAILURE:
-        alert = Alert(
-            id=str(uuid.uuid4()),
-            scraper_id=run.scraper_id,
-            run_id=run.id,
-            type=DriftType.VALUE_DISTRIBUTION, # Reusing type
-            message=f"Run failed: {run.error_message}",
-            severity="HIGH",
-            timestamp=datetime.now()
-        )
-        await db_save_alert(alert)
-        # Trigger Repair logic if we have snapshots
-        if last_run and run.html_snapshot:
-             await trigger_repair(run, last_run, alert)
-
-async def trigger_repair(current_run: ScraperRun, last_run: ScraperRun, alert: Alert):
+            alert = failure_alert(run)
+            record_alert(alert, incidents, results)
+            raised.append(alert)
+    else:
+        # Detect Drift
+        for alert in detect_drift(run, last_run):
+            if alert.type == DriftType.LAYOUT_CHANGE:
+                results.layout_changes.append(LayoutChange(
+                    run.scraper_id, run.id, run.timestamp, last_run.layout_fingerprint, run.layout_fingerprint
+                ))
+            # Trigger Repair if it's a schema change or null spike
+            repairable = alert.type in [DriftType.SCHEMA_CHANGE, DriftType.NULL_SPIKE]
+            repair_alert = record_alert(alert, incidents, results, repairable)
+            raised.append(alert)
+            if repair_alert:
+                await trigger_repair(run, last_run, repair_alert, results)
+
+        # Detect Failure (if status is FAILURE)
+        if run.status == RunStatus.FAILURE:
+            alert = failure_alert(run)
+            # Trigger Repair logic if we have snapshots
+            repair_alert = record_alert(alert, incidents, results, bool(run.html_snapshot or run.snapshot_hash))
+            raised.append(alert)
+            if repair_alert:
+                await trigger_repair(run, last_run, repair_alert, results)
+
+    # A clean successful run closes whatever was open
+    if run.status == RunStatus.SUCCESS and not raised:
+        incidents.resolve_all()
+
+    return raised
+
+async def load_snapshot(run: ScraperRun) -> Optional[str]:
+    if run.html_snapshot:
+        return run.html_snapshot
+    if run.snapshot_hash:
+        return await db_get_snapshot(run.snapshot_hash)
+    return None
+
+@timed("replay")
+async def replay_selectors(
+    html: str, configs: List[Dict[str, str]], snapshot_hash: Optional[str] = None
+) -> List[Dict[str, Dict[str, Any]]]:
+    # Imported on first use, like the repair engine; runs in the same pool,
+    # whose processes keep the parsed snapshot and compiled selectors cached
+    from .replay import replay_configs
+    return await run_cpu_bound(replay_configs, html, configs, snapshot_hash)
+
+def broken_fields(hits: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Fields whose selector extracts no value at all from the snapshot."""
+    return [field for field, hit in hits.items() if not hit["values"]]
+
+@timed("suggest_repairs")
+async def compute_repairs(**kwargs) -> List[RepairSuggestion]:
+    # Imported on first use: BeautifulSoup and lxml are only needed once a repair fires
+    from .repair import suggest_repairs
+    # Parsing and diffing are CPU-bound; keep them off the event loop
+    return await run_cpu_bound(suggest_repairs, **kwargs)
+
+@timed("trigger_repair")
+async def trigger_repair(current_run: ScraperRun, last_run: ScraperRun, alert: Alert, results: AnalysisResults):
     logger.info("Triggering AI Repair...")
 
     scraper = await db_get_scraper(current_run.scraper_id)
@@ -173,33 +829,68 @@ async def trigger_repair(current_run: ScraperRun, last_run: ScraperRun, alert: A
     broken_selectors = []
 
     if alert.type == DriftType.SCHEMA_CHANGE:
-        # Identify missing keys
-        curr_keys = set(current_run.extracted_data_sample[0].keys()) if current_run.extracted_data_sample else set()
-        last_keys = set(last_run.extracted_data_sample[0].keys()) if last_run.extracted_data_sample else set()
-        missing = last_keys - curr_keys
-
-        for key in missing:
+        # Missing keys were identified by the schema diff in detect_drift
+        for key in alert.missing_keys or []:
             if key in scraper.config.selectors:
                 broken_selectors.append((key, scraper.config.selectors[key]))
 
-    elif alert.type == DriftType.NULL_SPIKE:
-        # Assume all selectors might be broken
-        for key, sel in scraper.config.selectors.items():
-             broken_selectors.append((key, sel))
+    # Snapshots are only loaded if some selector isn't memoized yet
+    old_html = new_html = None
+
+    if alert.type == DriftType.NULL_SPIKE:
+        # Replay the config against the new page: only fields that extract
+        # nothing from it are broken. Without a snapshot, assume all might be.
+        broken = list(scraper.config.selectors)
+        new_html = await load_snapshot(current_run)
+        if new_html:
+            hits = (await replay_selectors(new_html, [scraper.config.selectors], current_run.snapshot_hash))[0]
+            broken = broken_fields(hits)
+            logger.info(f"Replay: {len(broken)} of {len(hits)} fields broken: {broken}")
+        for key in broken:
+            broken_selectors.append((key, scraper.config.selectors[key]))
 
-    # Generate Prompts
     for field, selector in broken_selectors:
-        # We need the OLD snapshot to show context.
-        if last_run.html_snapshot and current_run.html_snapshot:
-            prompt = generate_fix_prompt(
-                old_html=last_run.html_snapshot,
-                new_html=current_run.html_snapshot,
-                broken_selector=selector,
-                field_name=field
-            )
+        # The same selector breaking between the same two pages has the same
+        # repair; reuse it instead of re-parsing (or paying for another LLM call).
+        memo_key = (selector, last_run.snapshot_hash, current_run.snapshot_hash)
+        if last_run.snapshot_hash and current_run.snapshot_hash:
+            suggestions = results.find_repairs(*memo_key) or await db_find_repair_suggestions(*memo_key)
+            if suggestions:
+                best = suggestions[0]
+                logger.info(f"Reusing repair for {field}: {best.suggested_selector} (confidence {best.confidence_score:.2f})")
+                continue
+            if unrepairable.get(memo_key):
+                logger.info(f"No repair found for {field} (cached)")
+                continue
 
-            # Call LLM (Mock)
-            suggestion = mock_llm_repair(prompt)
+        # We need the OLD snapshot to show context.
+        if old_html is None:
+            old_html = await load_snapshot(last_run)
+            new_html = new_html or await load_snapshot(current_run)
+        if not (old_html and new_html):
+            break
+
+        # Rank repairs: offline heuristics first, the LLM only for low-confidence cases
+        suggestions = await compute_repairs(
+            old_html=old_html,
+            new_html=new_html,
+            broken_selector=selector,
+            field_name=field,
+            alert_id=alert.id,
+            old_hash=last_run.snapshot_hash,
+            new_hash=current_run.snapshot_hash,
+            scraper_id=current_run.scraper_id
+        )
 
-            logger.info(f"AI Suggestion for {field}: {suggestion}")
-            # In a real app, save this suggestion to DB.
+        if suggestions:
+            best = suggestions[0]
+            logger.info(
+                f"AI Suggestion for {field}: {best.suggested_selector} "
+                f"(confidence {best.confidence_score:.2f}, {best.diff_summary})"
+            )
+            results.repairs.extend(suggestions)
+        else:
+            logger.info(f"No repair found for {field}")
+            # Runs without a stored snapshot have no key that identifies their pages
+            if last_run.snapshot_hash and current_run.snapshot_hash:
+                unrepairable.put(memo_key, True)
@@ -0,0 +1,369 @@
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from .pagination import SortKey
+from .rollups import RollupKey, merge
+
+# Documents are ordered by (timestamp, id). Timestamps are the ISO strings
+# produced by model_dump(mode='json'), which sort chronologically.
+
+RepairKey = Tuple[str, Optional[str], Optional[str]]
+
+def sort_key(doc: Dict[str, Any]) -> SortKey:
+    return (doc["timestamp"], doc["id"])
+
+class SortedIndex:
+    """
+    A sequence of documents kept in (timestamp, id) order.
+    Appending in chronological order is O(1); out-of-order inserts fall back to a bisect.
+    """
+
+    def __init__(self):
+        self.keys: List[SortKey] = []
+        self.docs: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def insert(self, doc: Dict[str, Any]):
+        key = sort_key(doc)
+        if not self.keys or key >= self.keys[-1]:
+            self.keys.append(key)
+            self.docs.append(doc)
+            return
+        pos = bisect_right(self.keys, key)
+        self.keys.insert(pos, key)
+        self.docs.insert(pos, doc)
+
+    def expire(self, before: SortKey) -> List[Dict[str, Any]]:
+        """Removes and returns every document with key < before, oldest first."""
+        pos = bisect_left(self.keys, before)
+        expired = self.docs[:pos]
+        del self.keys[:pos]
+        del self.docs[:pos]
+        return expired
+
+    def last(self) -> Optional[Dict[str, Any]]:
+        return self.docs[-1] if self.docs else None
+
+    def iter_desc(self, before: Optional[SortKey] = None) -> Iterator[Dict[str, Any]]:
+        """Newest first, optionally starting below a key."""
+        hi = len(self.docs) if before is None else bisect_left(self.keys, before)
+        for i in range(hi - 1, -1, -1):
+            yield self.docs[i]
+
+    def latest(self, limit: int) -> List[Dict[str, Any]]:
+        if limit <= 0:
+            return []
+        return self.docs[-limit:][::-1]
+
+    def page(
+        self,
+        limit: int,
+        before: Optional[SortKey] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Newest-first page of documents with key < before and since <= timestamp < until.
+        Both ends are found by bisection, so any page costs O(log n + limit).
+        """
+        hi = len(self.keys)
+        if before is not None:
+            hi = bisect_left(self.keys, before)
+        if until is not None:
+            hi = min(hi, bisect_left(self.keys, (until,)))
+        lo = bisect_left(self.keys, (since,)) if since is not None else 0
+        start = max(lo, hi - limit)
+        if start >= hi:
+            return []
+        return self.docs[start:hi][::-1]
+
+class ScraperBucket:
+    """All runs, alerts and repair suggestions belonging to one scraper."""
+
+    def __init__(self):
+        self.runs = SortedIndex()
+        self.runs_by_status: Dict[str, SortedIndex] = {}
+        self.alerts = SortedIndex()
+        self.alerts_by_severity: Dict[str, SortedIndex] = {}
+        self.repairs = SortedIndex()
+
+    @property
+    def successful_runs(self) -> SortedIndex:
+        return self.run_index("SUCCESS")
+
+    def run_index(self, status: Optional[str] = None) -> SortedIndex:
+        if status is None:
+            return self.runs
+        index = self.runs_by_status.get(status)
+        if index is None:
+            index = self.runs_by_status[status] = SortedIndex()
+        return index
+
+    def alert_index(self, severity: Optional[str] = None) -> SortedIndex:
+        if severity is None:
+            return self.alerts
+        index = self.alerts_by_severity.get(severity)
+        if index is None:
+            index = self.alerts_by_severity[severity] = SortedIndex()
+        return index
+
+class MemoryStore:
+    """
+    Indexed in-memory storage engine used in mock mode.
+    Scrapers, runs and alerts are reachable by id in O(1), and every
+    per-scraper sequence is kept in timestamp order so the latest entries
+    never require a scan or a sort.
+    """
+
+    def __init__(self):
+        self.scrapers: Dict[str, Dict[str, Any]] = {}
+        self.runs: Dict[str, Dict[str, Any]] = {}
+        self.alerts: Dict[str, Dict[str, Any]] = {}
+        self.buckets: Dict[str, ScraperBucket] = {}
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self.health: Dict[str, Dict[str, Any]] = {}
+        self.incidents: Dict[str, Dict[str, Any]] = {}
+        self.incidents_by_scraper: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # Repair suggestions by (old_selector, old_snapshot_hash, new_snapshot_hash)
+        self.repairs_by_key: Dict[RepairKey, List[Dict[str, Any]]] = {}
+        # Number of stored runs referencing each snapshot
+        self.snapshot_refs: Dict[str, int] = {}
+        # Rollups by (scraper_id, resolution): sorted bucket starts and docs by bucket start
+        self.rollup_buckets: Dict[Tuple[str, str], List[str]] = {}
+        self.rollups: Dict[Tuple[str, str], Dict[str, Dict[str, Any]]] = {}
+        # `before` of the last expire_runs that deleted runs
+        self.runs_expired_before: Optional[str] = None
+
+    def bucket(self, scraper_id: str) -> ScraperBucket:
+        bucket = self.buckets.get(scraper_id)
+        if bucket is None:
+            bucket = self.buckets[scraper_id] = ScraperBucket()
+        return bucket
+
+    def clear(self):
+        self.scrapers.clear()
+        self.runs.clear()
+        self.alerts.clear()
+        self.buckets.clear()
+        self.stats.clear()
+        self.health.clear()
+        self.incidents.clear()
+        self.incidents_by_scraper.clear()
+        self.repairs_by_key.clear()
+        self.snapshot_refs.clear()
+        self.rollup_buckets.clear()
+        self.rollups.clear()
+        self.runs_expired_before = None
+
+    # --- Scrapers ---
+
+    def add_scraper(self, doc: Dict[str, Any]):
+        self.scrapers[doc["id"]] = doc
+
+    def get_scraper(self, scraper_id: str) -> Optional[Dict[str, Any]]:
+        return self.scrapers.get(scraper_id)
+
+    def all_scrapers(self) -> List[Dict[str, Any]]:
+        return list(self.scrapers.values())
+
+    # --- Runs ---
+
+    def add_run(self, doc: Dict[str, Any]):
+        self.runs[doc["id"]] = doc
+        bucket = self.bucket(doc["scraper_id"])
+        bucket.runs.insert(doc)
+        bucket.run_index(doc["status"]).insert(doc)
+        if doc.get("snapshot_hash"):
+            self.snapshot_refs[doc["snapshot_hash"]] = self.snapshot_refs.get(doc["snapshot_hash"], 0) + 1
+
+    def add_runs(self, docs: List[Dict[str, Any]]):
+        for doc in docs:
+            self.add_run(doc)
+
+    def get_runs(self, run_ids: List[str]) -> List[Dict[str, Any]]:
+        return [self.runs[run_id] for run_id in run_ids if run_id in self.runs]
+
+    def expire_runs(self, before: str) -> Tuple[int, Set[str]]:
+        """
+        Deletes runs with timestamp < before, except each scraper's latest
+        successful run (the drift baseline). Returns the number deleted and
+        the snapshot hashes no stored run references anymore.
+        """
+        deleted = 0
+        released: Set[str] = set()
+        for bucket in self.buckets.values():
+            baseline = bucket.successful_runs.last()
+            expired = bucket.runs.expire((before,))
+            for index in bucket.runs_by_status.values():
+                index.expire((before,))
+            for doc in expired:
+                if doc is baseline:
+                    bucket.runs.insert(doc)
+                    bucket.successful_runs.insert(doc)
+                    continue
+                del self.runs[doc["id"]]
+                deleted += 1
+                h = doc.get("snapshot_hash")
+                if h:
+                    self.snapshot_refs[h] -= 1
+                    if not self.snapshot_refs[h]:
+                        del self.snapshot_refs[h]
+                        released.add(h)
+        if deleted:
+            self.runs_expired_before = before
+        return deleted, released
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        return self.runs.get(run_id)
+
+    def last_successful_run(
+        self,
+        scraper_id: str,
+        before: Optional[SortKey] = None
+    ) -> Optional[Dict[str, Any]]:
+        bucket = self.buckets.get(scraper_id)
+        if bucket is None:
+            return None
+        return next(bucket.successful_runs.iter_desc(before), None)
+
+    def latest_runs(self, scraper_id: str, limit: int) -> List[Dict[str, Any]]:
+        bucket = self.buckets.get(scraper_id)
+        if bucket is None:
+            return []
+        return bucket.runs.latest(limit)
+
+    def page_runs(
+        self,
+        scraper_id: str,
+        limit: int,
+        before: Optional[SortKey] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        bucket = self.buckets.get(scraper_id)
+        if bucket is None:
+            return []
+        return bucket.run_index(status).page(limit, before=before, since=since, until=until)
+
+    # --- Alerts ---
+
+    def add_alert(self, doc: Dict[str, Any]):
+        self.alerts[doc["id"]] = doc
+        bucket = self.bucket(doc["scraper_id"])
+        bucket.alerts.insert(doc)
+        bucket.alert_index(doc["severity"]).insert(doc)
+
+    def page_alerts(
+        self,
+        scraper_id: str,
+        limit: int,
+        before: Optional[SortKey] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        severity: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        bucket = self.buckets.get(scraper_id)
+        if bucket is None:
+            return []
+        return bucket.alert_index(severity).page(limit, before=before, since=since, until=until)
+
+    # --- Repair suggestions ---
+
+    def add_repairs(self, docs: List[Dict[str, Any]]):
+        for doc in docs:
+            self.bucket(doc["scraper_id"]).repairs.insert(doc)
+            key = (doc["old_selector"], doc["old_snapshot_hash"], doc["new_snapshot_hash"])
+            self.repairs_by_key.setdefault(key, []).append(doc)
+
+    def find_repairs(self, key: RepairKey) -> List[Dict[str, Any]]:
+        return self.repairs_by_key.get(key, [])
+
+    def page_repairs(
+        self,
+        scraper_id: str,
+        limit: int,
+        before: Optional[SortKey] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        bucket = self.buckets.get(scraper_id)
+        if bucket is None:
+            return []
+        return bucket.repairs.page(limit, before=before, since=since, until=until)
+
+    # --- Incidents ---
+
+    def save_incident(self, doc: Dict[str, Any]):
+        self.incidents[doc["id"]] = doc
+        self.incidents_by_scraper.setdefault(doc["scraper_id"], {})[doc["id"]] = doc
+
+    def scraper_incidents(self, scraper_id: str, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Newest activity first. Incidents are few per scraper, so a sort is fine here."""
+        docs = self.incidents_by_scraper.get(scraper_id, {}).values()
+        if status is not None:
+            docs = [doc for doc in docs if doc["status"] == status]
+        return sorted(docs, key=lambda doc: (doc["last_seen"], doc["id"]), reverse=True)
+
+    # --- Rollups ---
+
+    def add_rollups(self, increments: Dict[RollupKey, Dict[str, Any]]):
+        for (scraper_id, resolution, start), inc in increments.items():
+            series = (scraper_id, resolution)
+            docs = self.rollups.setdefault(series, {})
+            doc = docs.get(start)
+            if doc is None:
+                doc = docs[start] = {"scraper_id": scraper_id, "resolution": resolution, "bucket": start}
+                buckets = self.rollup_buckets.setdefault(series, [])
+                buckets.insert(bisect_right(buckets, start), start)
+            merge(doc, inc)
+
+    def page_rollups(
+        self,
+        scraper_id: str,
+        resolution: str,
+        limit: int,
+        since: Optional[str] = None,
+        until: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """The newest `limit` buckets with since <= start < until, oldest first."""
+        series = (scraper_id, resolution)
+        buckets = self.rollup_buckets.get(series, [])
+        hi = bisect_left(buckets, until) if until is not None else len(buckets)
+        lo = bisect_left(buckets, since) if since is not None else 0
+        docs = self.rollups[series] if buckets else {}
+        return [docs[start] for start in buckets[max(lo, hi - limit):hi]]
+
+    def expire_rollups(self, resolution: str, before: str) -> int:
+        deleted = 0
+        for (scraper_id, res), buckets in self.rollup_buckets.items():
+            if res != resolution:
+                continue
+            pos = bisect_left(buckets, before)
+            docs = self.rollups[(scraper_id, res)]
+            for start in buckets[:pos]:
+                del docs[start]
+            del buckets[:pos]
+            deleted += pos
+        return deleted
+
+    # --- Health summaries ---
+
+    def get_health(self, scraper_id: str) -> Optional[Dict[str, Any]]:
+        return self.health.get(scraper_id)
+
+    def save_health(self, doc: Dict[str, Any]):
+        self.health[doc["scraper_id"]] = doc
+
+    def all_health(self) -> List[Dict[str, Any]]:
+        return list(self.health.values())
+
+    # --- Rolling statistics ---
+
+    def get_stats(self, scraper_id: str) -> Optional[Dict[str, Any]]:
+        return self.stats.get(scraper_id)
+
+    def save_stats(self, doc: Dict[str, Any]):
+        self.stats[doc["scraper_id"]] = doc
@@ -11,17 +11,36 @@ class DriftType(str, Enum):
     SCHEMA_CHANGE = "SCHEMA_CHANGE"
     VALUE_DISTRIBUTION = "VALUE_DISTRIBUTION"
     NULL_SPIKE = "NULL_SPIKE"
+    RUN_FAILURE = "RUN_FAILURE"
+    LAYOUT_CHANGE = "LAYOUT_CHANGE"
 
 class ScraperConfig(BaseModel):
     name: str
     target_url: str
     selectors: Dict[str, str]  # e.g. {"price": ".price", "title": "h1"}
+    # Seconds between runs by the built-in scheduler; None for scrapers run elsewhere (SDK)
+    schedule_interval: Optional[float] = Field(default=None, gt=0)
 
 class Scraper(BaseModel):
     id: str
     config: ScraperConfig
     created_at: datetime
 
+class SchemaFingerprint(BaseModel):
+    """Compact description of the shape of a run's extracted sample."""
+    hash: str # Stable across runs whose keys, presence classes and types match
+    sample_size: int
+    key_frequencies: Dict[str, float] # Fraction of items containing a non-null value
+    key_types: Dict[str, str] # e.g. "str", "float|int"
+
+class FieldSummary(BaseModel):
+    """Exact totals for one field over every item a run extracted (sent by the SDK)."""
+    count: int
+    nulls: int = 0
+    numeric_count: int = 0
+    numeric_sum: float = 0.0
+    distinct: int = 0 # Distinct non-numeric values, capped client-side
+
 class ScraperRun(BaseModel):
     id: str
     scraper_id: str
@@ -31,7 +50,23 @@ class ScraperRun(BaseModel):
     items_extracted: int
     error_message: Optional[str] = None
     extracted_data_sample: Optional[List[Dict[str, Any]]] = None
-    html_snapshot: Optional[str] = None # Base64 or raw HTML string
+    html_snapshot: Optional[str] = None # Raw HTML; only held in memory, never stored on the run
+    snapshot_hash: Optional[str] = None # Key into the snapshot store
+    schema_fingerprint: Optional[SchemaFingerprint] = None # Computed at ingest
+    # Per-field totals over all extracted items, when the sample is only a subset
+    field_stats: Optional[Dict[str, FieldSummary]] = None
+    layout_fingerprint: Optional[str] = None # SimHash of the snapshot's tag structure, computed at ingest
+
+class RunSummary(BaseModel):
+    """The fields of a ScraperRun needed for listings (no sample data, no snapshot)."""
+    id: str
+    scraper_id: str
+    timestamp: datetime
+    status: RunStatus
+    duration_ms: float
+    items_extracted: int
+    error_message: Optional[str] = None
+    snapshot_hash: Optional[str] = None
 
 class Alert(BaseModel):
     id: str
@@ -41,6 +76,7 @@ class Alert(BaseModel):
     message: str
     severity: str # "HIGH", "MEDIUM", "LOW"
     timestamp: datetime
+    missing_keys: Optional[List[str]] = None # Fields that disappeared (fully or partially)
 
 class RepairSuggestion(BaseModel):
     id: str
@@ -50,3 +86,91 @@ class RepairSuggestion(BaseModel):
     suggested_selector: str
     confidence_score: float
     diff_summary: str
+    timestamp: datetime
+    scraper_id: Optional[str] = None
+    # Snapshots the repair was computed from; with old_selector, the memoization key
+    old_snapshot_hash: Optional[str] = None
+    new_snapshot_hash: Optional[str] = None
+
+class FieldReplay(BaseModel):
+    """One selector replayed against a stored snapshot."""
+    matches: int # Elements matched
+    values: int # Matched elements with non-empty text
+    valid: bool = True # False if the selector doesn't compile
+
+class ReplayResult(BaseModel):
+    """A scraper's selectors replayed server-side against its latest snapshot."""
+    scraper_id: str
+    run_id: str
+    snapshot_hash: Optional[str] = None
+    fields: Dict[str, FieldReplay]
+    broken_fields: List[str] # Fields that extract no value from the snapshot
+
+class LayoutChangeInfo(BaseModel):
+    scraper_id: str
+    run_id: str
+    timestamp: datetime
+    distance: int # Fingerprint bits that changed (of 64)
+    distance_to_change: Optional[int] = None # Bits between its new layout and the queried change's
+
+class RelatedLayoutChanges(BaseModel):
+    """Other scrapers whose sites moved to a similar layout around the same time."""
+    change: LayoutChangeInfo
+    related: List[LayoutChangeInfo]
+
+class HealthSummary(BaseModel):
+    """Materialized per-scraper health, kept up to date by the analysis workers."""
+    scraper_id: str
+    name: str
+    target_url: str
+    created_at: datetime
+    version: int = 0 # Incremented on every update
+    total_runs: int = 0
+    last_run_id: Optional[str] = None
+    last_run_at: Optional[datetime] = None
+    last_status: Optional[RunStatus] = None
+    success_rate: Dict[str, float] = {} # Over the last N runs, e.g. {"last_10": 0.9}
+    p50_duration_ms: Optional[float] = None
+    p95_duration_ms: Optional[float] = None
+    open_incidents: int = 0
+    last_drift_type: Optional[DriftType] = None
+    last_drift_at: Optional[datetime] = None
+
+class IncidentStatus(str, Enum):
+    OPEN = "OPEN"
+    RESOLVED = "RESOLVED"
+
+class Incident(BaseModel):
+    """Repeats of the same alert, folded together until the scraper recovers."""
+    id: str
+    scraper_id: str
+    fingerprint: str # Hash of (scraper, type, normalized message, missing keys)
+    type: DriftType
+    severity: str
+    message: str # From the first alert
+    missing_keys: Optional[List[str]] = None
+    alert_id: str # The first alert, the only one stored
+    status: IncidentStatus = IncidentStatus.OPEN
+    count: int = 1
+    first_seen: datetime
+    last_seen: datetime
+    last_run_id: str
+    resolved_at: Optional[datetime] = None
+    last_repair_at: Optional[datetime] = None
+
+class MetricsResolution(str, Enum):
+    MINUTE = "minute"
+    HOUR = "hour"
+    DAY = "day"
+
+class MetricsBucket(BaseModel):
+    """Run metrics of one scraper over one time bucket, served from rollups."""
+    bucket: datetime # Start of the bucket
+    runs: int
+    successes: int
+    failures: int
+    success_rate: float
+    avg_duration_ms: float
+    min_duration_ms: float
+    max_duration_ms: float
+    avg_items: float
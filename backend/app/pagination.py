@@ -0,0 +1,39 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+# Keyset pagination over (timestamp, id), newest first.
+# A cursor is the opaque encoding of the last key on the previous page.
+SortKey = Tuple[str, str]
+
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    timestamp = doc["timestamp"]
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.isoformat()
+    raw = json.dumps([timestamp, doc["id"]], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> SortKey:
+    """Raises ValueError for malformed cursors."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(timestamp, str) or not isinstance(doc_id, str):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return (timestamp, doc_id)
+
+def timestamp_key(dt: Optional[datetime]) -> Optional[str]:
+    """
+    Converts a filter bound to the stored timestamp format
+    (naive local time, as written by model_dump(mode='json')).
+    """
+    if dt is None:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return dt.isoformat()
@@ -1,13 +1,40 @@
 import difflib
-from bs4 import BeautifulSoup
-from typing import Optional, Tuple
+import os
+import uuid
+from datetime import datetime
+from typing import List, Optional, Tuple
 
-def get_dom_context(html: str, selector: str) -> str:
+from bs4 import BeautifulSoup, Tag
+from soupsieve import SelectorSyntaxError
+
+from .cache import LRUCache
+from .dom import MAX_CONTEXT_CHARS, DomDiff, html_key, parse_html, get_dom_diff
+from .heuristics import compile_selector, rank_selector_repairs
+from .models import RepairSuggestion
+from .telemetry import timed
+
+# Heuristic suggestions at or above this confidence skip the LLM entirely
+LLM_FALLBACK_THRESHOLD = float(os.getenv("LLM_FALLBACK_THRESHOLD", "0.6"))
+# Confidence assigned to an LLM answer that verified against the new snapshot
+LLM_VERIFIED_CONFIDENCE = 0.6
+
+# (selector, confidence, summary) rankings per (old page, new page, broken
+# selector): a repeated repair skips diffing, without keeping any tree alive
+_ranking_cache = LRUCache(1024)
+
+def select_one(soup: BeautifulSoup, selector: str) -> Optional[Tag]:
+    """First match of `selector`, or None if it isn't valid CSS (configs aren't guaranteed to be)."""
+    try:
+        return compile_selector(selector).select_one(soup)
+    except SelectorSyntaxError:
+        return None
+
+@timed("get_dom_context")
+def get_dom_context(html: str, selector: str, snapshot_hash: Optional[str] = None) -> str:
     """
     Extracts a snippet of the DOM around the selector.
     """
-    soup = BeautifulSoup(html, 'lxml')
-    element = soup.select_one(selector)
+    element = select_one(parse_html(html, snapshot_hash), selector)
     if element:
         # Get parent to give context
         return str(element.parent)
@@ -17,20 +44,24 @@ def generate_fix_prompt(
     old_html: str,
     new_html: str,
     broken_selector: str,
-    field_name: str
+    field_name: str,
+    old_hash: Optional[str] = None,
+    new_hash: Optional[str] = None,
+    diff: Optional[DomDiff] = None
 ) -> str:
     """
     Constructs the prompt for the LLM to repair the selector.
     """
 
-    # In a real system, we'd use more sophisticated diffing to find where the element *moved* to.
-    # For now, we just provide the old context (what it looked like) and the new context (the whole body or a relevant section).
+    # Show the old context (what it looked like) and the region of the new page
+    # the element appears to have moved to, found via the structural diff.
+    old_context = get_dom_context(old_html, broken_selector, old_hash)
 
-    old_context = get_dom_context(old_html, broken_selector)
-
-    # Truncate new_html to avoid token limits in a real scenario,
-    # but for this demo we assume small snippets.
-    new_context = new_html[:2000]
+    diff = diff or get_dom_diff(old_html, new_html, old_hash, new_hash)
+    new_context = diff.region(select_one(diff.old_soup, broken_selector))
+    if new_context is None:
+        # Couldn't locate it; fall back to the start of the page.
+        new_context = new_html[:MAX_CONTEXT_CHARS]
 
     prompt = f"""
 You are an expert web scraping engineer. A CSS selector has broken due to a website update.
@@ -61,3 +92,73 @@ def mock_llm_repair(prompt: str) -> str:
     if 'class="price-v2"' in prompt:
         return ".price-v2"
     return "unable-to-fix"
+
+def verify_selector(diff: DomDiff, selector: str) -> bool:
+    """A repaired selector must parse and match a non-empty element in the new snapshot."""
+    try:
+        element = diff.new_soup.select_one(selector)
+    except Exception:
+        return False
+    return element is not None and bool(element.get_text(strip=True))
+
+def suggest_repairs(
+    old_html: str,
+    new_html: str,
+    broken_selector: str,
+    field_name: str,
+    alert_id: str,
+    old_hash: Optional[str] = None,
+    new_hash: Optional[str] = None,
+    scraper_id: Optional[str] = None
+) -> List[RepairSuggestion]:
+    """
+    Ranked repair suggestions for one broken selector, best first.
+    The offline heuristic engine runs first; the LLM is only consulted
+    when its best candidate is below LLM_FALLBACK_THRESHOLD.
+    """
+    def suggestion(selector: str, confidence: float, summary: str) -> RepairSuggestion:
+        return RepairSuggestion(
+            id=str(uuid.uuid4()),
+            alert_id=alert_id,
+            field_name=field_name,
+            old_selector=broken_selector,
+            suggested_selector=selector,
+            confidence_score=confidence,
+            diff_summary=summary,
+            timestamp=datetime.now(),
+            scraper_id=scraper_id,
+            old_snapshot_hash=old_hash,
+            new_snapshot_hash=new_hash
+        )
+
+    key = (html_key(old_html, old_hash), html_key(new_html, new_hash), broken_selector, field_name)
+    ranking = _ranking_cache.get_or_create(
+        key, lambda: rank_repairs(old_html, new_html, broken_selector, field_name, old_hash, new_hash)
+    )
+    return [suggestion(*ranked) for ranked in ranking]
+
+def rank_repairs(
+    old_html: str,
+    new_html: str,
+    broken_selector: str,
+    field_name: str,
+    old_hash: Optional[str] = None,
+    new_hash: Optional[str] = None
+) -> List[Tuple[str, float, str]]:
+    """(selector, confidence, summary) for each suggestion, best first."""
+    try:
+        compile_selector(broken_selector)
+    except SelectorSyntaxError:
+        # Nothing to locate on the old page, so nothing to repair
+        return []
+    diff = get_dom_diff(old_html, new_html, old_hash, new_hash)
+    ranking = [(c.selector, c.confidence, c.summary) for c in rank_selector_repairs(diff, broken_selector)]
+    if ranking and ranking[0][1] >= LLM_FALLBACK_THRESHOLD:
+        return ranking
+
+    prompt = generate_fix_prompt(old_html, new_html, broken_selector, field_name, old_hash, new_hash, diff)
+    selector = mock_llm_repair(prompt)
+    if verify_selector(diff, selector) and selector not in {ranked[0] for ranked in ranking}:
+        ranking.append((selector, LLM_VERIFIED_CONFIDENCE, "Suggested by LLM, verified against the new snapshot"))
+        ranking.sort(key=lambda ranked: ranked[1], reverse=True)
+    return ranking
@@ -0,0 +1,81 @@
+import os
+import soupsieve
+from bs4 import Tag
+from typing import Any, Dict, List, Optional
+
+from .cache import LRUCache
+from .dom import normalize_text, parse_html
+
+# Server-side replay of a config's selectors against a stored snapshot, so
+# breakage is measured per field instead of inferred from what a client reported.
+
+# Compiled selector sets, one per distinct config
+SELECTOR_CACHE_SIZE = int(os.getenv("SELECTOR_CACHE_SIZE", "1024"))
+
+_compiled_cache = LRUCache(SELECTOR_CACHE_SIZE)
+
+CompiledSelectors = Dict[str, Optional[soupsieve.SoupSieve]]
+
+def compile_selectors(selectors: Dict[str, str]) -> CompiledSelectors:
+    """
+    Compiled patterns for a config, cached by its (field, selector) pairs.
+    An invalid selector compiles to None and matches nothing.
+    """
+    def compile_all() -> CompiledSelectors:
+        compiled: CompiledSelectors = {}
+        for field, selector in selectors.items():
+            try:
+                compiled[field] = soupsieve.compile(selector)
+            except Exception:
+                compiled[field] = None
+        return compiled
+    return _compiled_cache.get_or_create(tuple(sorted(selectors.items())), compile_all)
+
+def invalid_selectors(selectors: Dict[str, str]) -> List[str]:
+    """Fields whose selector isn't valid CSS."""
+    compiled = compile_selectors(selectors)
+    return [field for field in selectors if compiled[field] is None]
+
+def match_selectors(root: Tag, compiled: CompiledSelectors) -> Dict[str, List[Tag]]:
+    """
+    Matches of every pattern (keyed by field, or by selector) in document order.
+    Each pattern runs its own select() over the shared tree: soupsieve sets up
+    its matcher once per select() but again on every match() call, so a single
+    walk testing each element against every pattern is several times slower.
+    """
+    return {key: pattern.select(root) if pattern is not None else [] for key, pattern in compiled.items()}
+
+def element_text(element: Tag) -> str:
+    return normalize_text(element.get_text(" "))
+
+def field_hits(matches: List[Tag], valid: bool = True) -> Dict[str, Any]:
+    """Elements matched, how many of them have text, and whether the selector compiled."""
+    return {
+        "matches": len(matches),
+        "values": sum(1 for element in matches if element_text(element)),
+        "valid": valid
+    }
+
+def replay_configs(
+    html: str,
+    configs: List[Dict[str, str]],
+    snapshot_hash: Optional[str] = None
+) -> List[Dict[str, Dict[str, Any]]]:
+    """
+    Per-field hit counts of each config against one snapshot. The snapshot is
+    parsed once (and cached) and each distinct selector evaluated once,
+    however many configs share them. Runs in the repair process pool, so it
+    must stay picklable.
+    """
+    soup = parse_html(html, snapshot_hash)
+    patterns: CompiledSelectors = {}
+    for selectors in configs:
+        compiled = compile_selectors(selectors)
+        for field, selector in selectors.items():
+            patterns.setdefault(selector, compiled[field])
+    matches = match_selectors(soup, patterns)
+    hits = {selector: field_hits(matches[selector], pattern is not None) for selector, pattern in patterns.items()}
+    return [{field: hits[selector] for field, selector in selectors.items()} for selectors in configs]
+
+def replay_snapshot(html: str, selectors: Dict[str, str], snapshot_hash: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    return replay_configs(html, [selectors], snapshot_hash)[0]
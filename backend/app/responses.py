@@ -0,0 +1,48 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the standard library encoder
+    orjson = None
+
+# Read endpoints that can serve stored documents as they are skip building
+# Pydantic models and FastAPI's response_model validation, and answer
+# conditional requests with 304 before running the query at all.
+
+# Clients may keep a copy but must revalidate it (cheaply, via If-None-Match) on every use
+CACHE_CONTROL = "private, no-cache"
+
+def dump_json(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+def make_etag(*parts: Any) -> str:
+    """
+    Weak validator for a response derived from `parts` (version markers and the
+    query string). Weak, since gzip-encoded and plain bodies share it.
+    """
+    raw = json.dumps(parts, separators=(",", ":"), default=str).encode("utf-8")
+    return f'W/"{hashlib.blake2b(raw, digest_size=12).hexdigest()}"'
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 response if the client's If-None-Match already covers `etag`, else None."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    if "*" in tags or etag.removeprefix("W/") in tags:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    return None
+
+def json_response(content: Any, etag: Optional[str] = None, headers: Optional[Dict[str, str]] = None) -> Response:
+    """`content` must already be JSON-ready (stored documents are: dumped with mode='json')."""
+    headers = dict(headers or {})
+    if etag:
+        headers["ETag"] = etag
+        headers["Cache-Control"] = CACHE_CONTROL
+    return Response(dump_json(content), media_type="application/json", headers=headers)
@@ -0,0 +1,47 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from .database import expire_runs, expire_rollups
+from .pagination import timestamp_key
+
+logger = logging.getLogger(__name__)
+
+# Raw runs (and snapshots only they reference) are deleted after this many days; 0 keeps them forever.
+# Rollups are unaffected, so long-range metrics survive.
+RUN_RETENTION_DAYS = float(os.getenv("RUN_RETENTION_DAYS", "0"))
+# How long each rollup resolution is kept (None = forever)
+ROLLUP_RETENTION: Dict[str, Optional[timedelta]] = {
+    "minute": timedelta(days=2),
+    "hour": timedelta(days=90),
+    "day": None,
+}
+# Seconds between compaction passes
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "3600"))
+# The first pass waits this long, so it never competes with a cold start
+RETENTION_STARTUP_DELAY = 60.0
+
+async def compact(now: Optional[datetime] = None) -> Dict[str, int]:
+    """One retention pass. Returns how many documents of each kind were deleted."""
+    now = now or datetime.now()
+    deleted = {"runs": 0, "snapshots": 0, "rollups": 0}
+    if RUN_RETENTION_DAYS > 0:
+        cutoff = timestamp_key(now - timedelta(days=RUN_RETENTION_DAYS))
+        deleted["runs"], deleted["snapshots"] = await expire_runs(cutoff)
+    for resolution, keep in ROLLUP_RETENTION.items():
+        if keep is not None:
+            deleted["rollups"] += await expire_rollups(resolution, timestamp_key(now - keep))
+    return deleted
+
+async def run_retention(interval: float = RETENTION_INTERVAL, delay: float = RETENTION_STARTUP_DELAY):
+    await asyncio.sleep(delay)
+    while True:
+        try:
+            deleted = await compact()
+            if any(deleted.values()):
+                logger.info(f"Retention: deleted {deleted}")
+        except Exception:
+            logger.exception("Retention pass failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,66 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Tuple
+
+from .models import MetricsBucket
+
+# Bucket sizes rollups are kept at
+RESOLUTIONS = ("minute", "hour", "day")
+
+RollupKey = Tuple[str, str, str] # (scraper_id, resolution, bucket start)
+
+def bucket_start(timestamp: datetime, resolution: str) -> datetime:
+    if resolution == "minute":
+        return timestamp.replace(second=0, microsecond=0)
+    if resolution == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    if resolution == "day":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown resolution: {resolution}")
+
+def accumulate(run_docs: Iterable[Dict[str, Any]]) -> Dict[RollupKey, Dict[str, Any]]:
+    """
+    Pre-aggregates stored run documents into increments, one per bucket,
+    so a batch of runs costs one write per bucket rather than per run.
+    """
+    increments: Dict[RollupKey, Dict[str, Any]] = {}
+    for doc in run_docs:
+        timestamp = datetime.fromisoformat(doc["timestamp"])
+        success = doc["status"] == "SUCCESS"
+        duration = doc["duration_ms"]
+        for resolution in RESOLUTIONS:
+            key = (doc["scraper_id"], resolution, bucket_start(timestamp, resolution).isoformat())
+            inc = increments.get(key)
+            if inc is None:
+                inc = increments[key] = {
+                    "runs": 0, "successes": 0, "failures": 0,
+                    "duration_ms_sum": 0.0, "duration_ms_min": duration, "duration_ms_max": duration,
+                    "items_sum": 0
+                }
+            inc["runs"] += 1
+            inc["successes" if success else "failures"] += 1
+            inc["duration_ms_sum"] += duration
+            inc["duration_ms_min"] = min(inc["duration_ms_min"], duration)
+            inc["duration_ms_max"] = max(inc["duration_ms_max"], duration)
+            inc["items_sum"] += doc["items_extracted"]
+    return increments
+
+def merge(doc: Dict[str, Any], inc: Dict[str, Any]):
+    """Mock-mode equivalent of the $inc/$min/$max upsert."""
+    for field in ("runs", "successes", "failures", "duration_ms_sum", "items_sum"):
+        doc[field] = doc.get(field, 0) + inc[field]
+    doc["duration_ms_min"] = min(doc.get("duration_ms_min", inc["duration_ms_min"]), inc["duration_ms_min"])
+    doc["duration_ms_max"] = max(doc.get("duration_ms_max", inc["duration_ms_max"]), inc["duration_ms_max"])
+
+def to_bucket(doc: Dict[str, Any]) -> MetricsBucket:
+    runs = doc["runs"]
+    return MetricsBucket(
+        bucket=doc["bucket"],
+        runs=runs,
+        successes=doc["successes"],
+        failures=doc["failures"],
+        success_rate=doc["successes"] / runs if runs else 0.0,
+        avg_duration_ms=doc["duration_ms_sum"] / runs if runs else 0.0,
+        min_duration_ms=doc["duration_ms_min"],
+        max_duration_ms=doc["duration_ms_max"],
+        avg_items=doc["items_sum"] / runs if runs else 0.0
+    )
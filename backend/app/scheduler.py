@@ -0,0 +1,330 @@
+import asyncio
+import heapq
+import logging
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .analysis_queue import run_cpu_bound
+from .models import RunStatus, Scraper
+from .snapshots import snapshot_hash
+from .telemetry import SCHEDULED_SCRAPES
+
+logger = logging.getLogger(__name__)
+
+# The built-in executor: the platform runs registered configs that have a
+# schedule_interval itself, instead of only observing runs reported by the SDK.
+# Enable it in one process per deployment, or every worker will scrape.
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "false").lower() == "true"
+# Requests in flight across all hosts, and to any single host
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "32"))
+SCRAPE_PER_HOST = int(os.getenv("SCRAPE_PER_HOST", "2"))
+# Minimum seconds between the starts of two requests to the same host
+SCRAPE_POLITENESS_DELAY = float(os.getenv("SCRAPE_POLITENESS_DELAY", "1.0"))
+SCRAPE_TIMEOUT = float(os.getenv("SCRAPE_TIMEOUT", "30"))
+# Larger pages are recorded as failed runs instead of being downloaded in full
+SCRAPE_MAX_PAGE_BYTES = int(os.getenv("SCRAPE_MAX_PAGE_BYTES", str(10 * 1024 * 1024)))
+# Each interval is stretched or shrunk by up to this fraction, so scrapers
+# registered together don't keep hitting their hosts in lockstep
+SCHEDULE_JITTER = 0.1
+# Seconds between reloads of the registered configs
+SCHEDULE_REFRESH_INTERVAL = 60.0
+# Extracted items sent with a run; larger runs also send exact per-field totals
+SCRAPE_SAMPLE_SIZE = 100
+USER_AGENT = "ScraperSRE/1.0 (scheduled scraper health check)"
+
+class PageTooLarge(Exception):
+    pass
+
+class FetchResult:
+    __slots__ = ("status_code", "html", "etag", "last_modified", "error")
+
+    def __init__(
+        self,
+        status_code: int = 0,
+        html: Optional[str] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        error: Optional[str] = None
+    ):
+        self.status_code = status_code
+        self.html = html
+        self.etag = etag
+        self.last_modified = last_modified
+        self.error = error
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status_code == 304
+
+class HostLimiter:
+    """Caps concurrent requests to one host and spaces out their starts by `delay` seconds."""
+
+    def __init__(self, concurrency: int, delay: float):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.delay = delay
+        self.next_start = 0.0
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        try:
+            # Reserve the next start slot before sleeping, so waiters queue up behind it
+            now = time.monotonic()
+            start = max(now, self.next_start)
+            self.next_start = start + self.delay
+            if start > now:
+                await asyncio.sleep(start - now)
+        except BaseException:
+            self.semaphore.release()
+            raise
+
+    async def __aexit__(self, *exc):
+        self.semaphore.release()
+
+class Fetcher:
+    """
+    One pooled HTTP client for every scheduled scraper, with global and
+    per-host concurrency limits. Requests carry the validators of the last
+    response, so an unchanged page costs a 304 instead of a download.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = SCRAPE_CONCURRENCY,
+        per_host: int = SCRAPE_PER_HOST,
+        delay: float = SCRAPE_POLITENESS_DELAY,
+        timeout: float = SCRAPE_TIMEOUT,
+        max_page_bytes: int = SCRAPE_MAX_PAGE_BYTES,
+        transport: Any = None
+    ):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.delay = delay
+        self.timeout = timeout
+        self.max_page_bytes = max_page_bytes
+        self.transport = transport
+        self.slots = asyncio.Semaphore(concurrency)
+        self.hosts: Dict[str, HostLimiter] = {}
+        self.client = None
+
+    async def open(self):
+        import httpx  # only needed by deployments that run the scheduler
+        self.client = httpx.AsyncClient(
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            headers={"User-Agent": USER_AGENT},
+            transport=self.transport
+        )
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def host(self, url: str) -> HostLimiter:
+        netloc = urlsplit(url).netloc.lower()
+        limiter = self.hosts.get(netloc)
+        if limiter is None:
+            limiter = self.hosts[netloc] = HostLimiter(self.per_host, self.delay)
+        return limiter
+
+    async def fetch(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> FetchResult:
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        # Wait for the host first, so requests queued behind a slow host don't hold global slots
+        async with self.host(url):
+            async with self.slots:
+                try:
+                    async with self.client.stream("GET", url, headers=headers) as response:
+                        result = FetchResult(
+                            response.status_code,
+                            etag=response.headers.get("etag"),
+                            last_modified=response.headers.get("last-modified")
+                        )
+                        if result.not_modified:
+                            return result
+                        if response.status_code >= 400:
+                            result.error = f"HTTP {response.status_code}"
+                            return result
+                        body = bytearray()
+                        async for chunk in response.aiter_bytes():
+                            body += chunk
+                            if len(body) > self.max_page_bytes:
+                                raise PageTooLarge()
+                        result.html = body.decode(response.encoding or "utf-8", errors="replace")
+                        return result
+                except PageTooLarge:
+                    return FetchResult(error=f"Page larger than {self.max_page_bytes} bytes")
+                except Exception as e:
+                    # httpx.HTTPError (timeouts, refused connections, bad TLS) and invalid URLs
+                    return FetchResult(error=f"{type(e).__name__}: {e}")
+
+class Validators:
+    """What the last successful fetch of a scraper's page returned."""
+    __slots__ = ("etag", "last_modified", "content_hash")
+
+    def __init__(self, etag: Optional[str] = None, last_modified: Optional[str] = None, content_hash: Optional[str] = None):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_hash = content_hash
+
+class Scheduler:
+    """
+    Runs each scheduled config every `schedule_interval` seconds (jittered)
+    and hands the result to `ingest` as an ingest request body, so it is
+    stored and analyzed exactly like a run reported by the SDK. Pages that
+    come back 304, or with the same content as last time, skip extraction
+    and ingest. A scraper whose previous scrape is still running skips a turn.
+    """
+
+    def __init__(
+        self,
+        load_scrapers: Callable[[], Awaitable[List[Scraper]]],
+        ingest: Callable[[Dict[str, Any]], Awaitable[Any]],
+        fetcher: Optional[Fetcher] = None,
+        refresh_interval: float = SCHEDULE_REFRESH_INTERVAL,
+        jitter: float = SCHEDULE_JITTER,
+        sample_size: int = SCRAPE_SAMPLE_SIZE,
+        rng: Optional[random.Random] = None
+    ):
+        self.load_scrapers = load_scrapers
+        self.ingest = ingest
+        self.fetcher = fetcher or Fetcher()
+        self.refresh_interval = refresh_interval
+        self.jitter = jitter
+        self.sample_size = sample_size
+        self.rng = rng or random.Random()
+        self.scrapers: Dict[str, Scraper] = {}
+        # Heap of (due time, scraper id); an entry is stale unless it matches due_at
+        self.queue: List[Tuple[float, str]] = []
+        self.due_at: Dict[str, float] = {}
+        self.validators: Dict[str, Validators] = {}
+        self.running: Dict[str, asyncio.Task] = {}
+        self.changed = asyncio.Event()
+
+    def add(self, scraper: Scraper, now: Optional[float] = None):
+        """Schedules (or reschedules, or with no interval unschedules) a scraper."""
+        interval = scraper.config.schedule_interval
+        if not interval or interval <= 0:
+            self.remove(scraper.id)
+            return
+        previous = self.scrapers.get(scraper.id)
+        self.scrapers[scraper.id] = scraper
+        if previous is not None and previous.config != scraper.config:
+            # New URL or selectors: the next fetch must be extracted even if the page is unchanged
+            self.validators.pop(scraper.id, None)
+        if previous is not None and previous.config.schedule_interval == interval:
+            return
+        # The first run lands anywhere in the first interval, spreading out scrapers loaded together
+        self.push(scraper.id, (now or time.monotonic()) + self.rng.uniform(0, interval))
+
+    def remove(self, scraper_id: str):
+        self.scrapers.pop(scraper_id, None)
+        self.due_at.pop(scraper_id, None)
+        self.validators.pop(scraper_id, None)
+
+    def push(self, scraper_id: str, due: float):
+        self.due_at[scraper_id] = due
+        heapq.heappush(self.queue, (due, scraper_id))
+        self.changed.set()
+
+    def next_due(self, now: float, interval: float) -> float:
+        return now + interval * (1 + self.rng.uniform(-self.jitter, self.jitter))
+
+    async def refresh(self, now: float):
+        scrapers = await self.load_scrapers()
+        seen = set()
+        for scraper in scrapers:
+            seen.add(scraper.id)
+            self.add(scraper, now)
+        for scraper_id in list(self.scrapers):
+            if scraper_id not in seen:
+                self.remove(scraper_id)
+
+    def start_due(self, now: float):
+        while self.queue and self.queue[0][0] <= now:
+            due, scraper_id = heapq.heappop(self.queue)
+            if self.due_at.get(scraper_id) != due:
+                continue
+            scraper = self.scrapers[scraper_id]
+            self.push(scraper_id, self.next_due(now, scraper.config.schedule_interval))
+            if scraper_id in self.running:
+                logger.debug(f"Scheduler: previous scrape of {scraper_id} still running; skipping this turn")
+                continue
+            task = asyncio.create_task(self.scrape(scraper))
+            self.running[scraper_id] = task
+            task.add_done_callback(lambda _, scraper_id=scraper_id: self.running.pop(scraper_id, None))
+
+    async def run(self):
+        await self.fetcher.open()
+        try:
+            next_refresh = 0.0
+            while True:
+                now = time.monotonic()
+                if now >= next_refresh:
+                    try:
+                        await self.refresh(now)
+                    except Exception:
+                        logger.exception("Scheduler: loading scraper configs failed")
+                    next_refresh = now + self.refresh_interval
+                self.start_due(now)
+                wake = min(next_refresh, self.queue[0][0]) if self.queue else next_refresh
+                self.changed.clear()
+                try:
+                    await asyncio.wait_for(self.changed.wait(), max(0.0, wake - time.monotonic()))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            tasks = list(self.running.values())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.fetcher.close()
+
+    async def scrape(self, scraper: Scraper):
+        config = scraper.config
+        last = self.validators.get(scraper.id) or Validators()
+        start = time.perf_counter()
+        result = await self.fetcher.fetch(config.target_url, last.etag, last.last_modified)
+        if result.not_modified:
+            SCHEDULED_SCRAPES.labels("not_modified").inc()
+            return
+
+        payload: Dict[str, Any] = {"scraper_id": scraper.id}
+        validators = None
+        if result.error is None:
+            validators = Validators(result.etag, result.last_modified, snapshot_hash(result.html))
+            if validators.content_hash == last.content_hash:
+                self.validators[scraper.id] = validators
+                SCHEDULED_SCRAPES.labels("unchanged").inc()
+                return
+            from .extraction import extract_run
+            try:
+                payload.update(await run_cpu_bound(
+                    extract_run, result.html, config.selectors, self.sample_size, validators.content_hash
+                ))
+                payload.update(status=RunStatus.SUCCESS.value, html_snapshot=result.html)
+            except Exception as e:
+                result.error = f"Extraction failed: {e}"
+        if result.error is not None:
+            # Forget the page, so the first good fetch after a failure is ingested in full
+            self.validators.pop(scraper.id, None)
+            validators = None
+            payload.update(status=RunStatus.FAILURE.value, items_extracted=0, error_message=result.error)
+        payload["duration_ms"] = (time.perf_counter() - start) * 1000
+
+        try:
+            await self.ingest(payload)
+        except Exception as e:
+            logger.warning(f"Scheduler: could not ingest run of {scraper.id}: {e}")
+            return
+        # Only now, so a page whose run was never ingested (e.g. queue full) is fetched in full again
+        if validators is not None:
+            self.validators[scraper.id] = validators
+        SCHEDULED_SCRAPES.labels("failed" if result.error else "ingested").inc()
@@ -0,0 +1,145 @@
+import asyncio
+import hashlib
+import os
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+# Compression level for stored snapshots. HTML compresses ~5-10x at level 6.
+COMPRESSION_LEVEL = 6
+
+def snapshot_hash(html: str) -> str:
+    """Content address of a snapshot (must match the SDK's computation)."""
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+def compress(html: str) -> bytes:
+    return zlib.compress(html.encode("utf-8"), COMPRESSION_LEVEL)
+
+def decompress(blob: bytes) -> str:
+    return zlib.decompress(blob).decode("utf-8")
+
+class SnapshotStore(ABC):
+    """
+    Content-addressed blob store for HTML snapshots.
+    Snapshots are stored compressed under their SHA-256, so identical pages are stored once.
+    """
+
+    async def put(self, html: str) -> str:
+        h = snapshot_hash(html)
+        if not await self.exists(h):
+            await self._write(h, compress(html))
+        return h
+
+    async def get(self, h: str) -> Optional[str]:
+        blob = await self._read(h)
+        if blob is None:
+            return None
+        return decompress(blob)
+
+    @abstractmethod
+    async def exists(self, h: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def delete(self, h: str):
+        ...
+
+    @abstractmethod
+    async def _write(self, h: str, blob: bytes):
+        ...
+
+    @abstractmethod
+    async def _read(self, h: str) -> Optional[bytes]:
+        ...
+
+class MemorySnapshotStore(SnapshotStore):
+    """Used in mock mode."""
+
+    def __init__(self):
+        self.blobs: Dict[str, bytes] = {}
+
+    async def exists(self, h: str) -> bool:
+        return h in self.blobs
+
+    async def delete(self, h: str):
+        self.blobs.pop(h, None)
+
+    async def _write(self, h: str, blob: bytes):
+        self.blobs[h] = blob
+
+    async def _read(self, h: str) -> Optional[bytes]:
+        return self.blobs.get(h)
+
+class LocalSnapshotStore(SnapshotStore):
+    """
+    Stores each snapshot as a zlib file under `root/<first 2 hex chars>/<hash>.z`.
+    Writes go through a temp file and an atomic rename, so concurrent writers of
+    the same snapshot are harmless.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, h: str) -> str:
+        if len(h) != 64 or not all(c in "0123456789abcdef" for c in h):
+            raise ValueError(f"Invalid snapshot hash: {h}")
+        return os.path.join(self.root, h[:2], f"{h}.z")
+
+    async def exists(self, h: str) -> bool:
+        try:
+            return os.path.exists(self._path(h))
+        except ValueError:
+            return False
+
+    async def delete(self, h: str):
+        try:
+            os.remove(self._path(h))
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def _write_sync(self, h: str, blob: bytes):
+        path = self._path(h)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, path)
+
+    def _read_sync(self, h: str) -> Optional[bytes]:
+        try:
+            with open(self._path(h), "rb") as f:
+                return f.read()
+        except (FileNotFoundError, ValueError):
+            return None
+
+    async def _write(self, h: str, blob: bytes):
+        await asyncio.to_thread(self._write_sync, h, blob)
+
+    async def _read(self, h: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._read_sync, h)
+
+class GridFSSnapshotStore(SnapshotStore):
+    """Stores compressed snapshots in a GridFS bucket, using the hash as filename."""
+
+    def __init__(self, database, bucket_name: str = "snapshots"):
+        from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+        self.files = database[f"{bucket_name}.files"]
+        self.bucket = AsyncIOMotorGridFSBucket(database, bucket_name=bucket_name)
+
+    async def exists(self, h: str) -> bool:
+        return await self.files.find_one({"filename": h}, projection={"_id": 1}) is not None
+
+    async def delete(self, h: str):
+        async for doc in self.files.find({"filename": h}, projection={"_id": 1}):
+            await self.bucket.delete(doc["_id"])
+
+    async def _write(self, h: str, blob: bytes):
+        await self.bucket.upload_from_stream(h, blob, metadata={"compression": "zlib"})
+
+    async def _read(self, h: str) -> Optional[bytes]:
+        doc = await self.files.find_one({"filename": h}, projection={"_id": 1})
+        if doc is None:
+            return None
+        stream = await self.bucket.open_download_stream(doc["_id"])
+        return await stream.read()
@@ -0,0 +1,384 @@
+import asyncio
+import json
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .pagination import SortKey
+from .snapshots import LocalSnapshotStore, SnapshotStore
+from .storage import HEALTH_SUMMARY_FIELDS, RUN_SUMMARY_FIELDS, StorageBackend, project
+
+# Embedded storage engine: one SQLite file in WAL mode. Readers never block
+# the writer, and every process on the host can open the same file, so
+# several uvicorn workers share one dataset without an external database.
+
+# Milliseconds a writer waits for another process's transaction before failing
+BUSY_TIMEOUT_MS = 10000
+# Ids per `IN (...)` query
+MAX_IN_PARAMS = 500
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS scrapers (id TEXT PRIMARY KEY, doc TEXT NOT NULL)",
+    # Runs keep their listing fields apart from the (larger) sample data
+    "CREATE TABLE IF NOT EXISTS runs ("
+    "id TEXT PRIMARY KEY, scraper_id TEXT NOT NULL, timestamp TEXT NOT NULL, status TEXT NOT NULL, "
+    "snapshot_hash TEXT, summary TEXT NOT NULL, detail TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS runs_scraper ON runs (scraper_id, timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS runs_scraper_status ON runs (scraper_id, status, timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS runs_timestamp ON runs (timestamp)",
+    "CREATE INDEX IF NOT EXISTS runs_snapshot ON runs (snapshot_hash) WHERE snapshot_hash IS NOT NULL",
+    "CREATE TABLE IF NOT EXISTS alerts ("
+    "id TEXT PRIMARY KEY, scraper_id TEXT NOT NULL, timestamp TEXT NOT NULL, severity TEXT NOT NULL, doc TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS alerts_scraper ON alerts (scraper_id, timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS alerts_scraper_severity ON alerts (scraper_id, severity, timestamp, id)",
+    "CREATE TABLE IF NOT EXISTS incidents ("
+    "id TEXT PRIMARY KEY, scraper_id TEXT NOT NULL, status TEXT NOT NULL, last_seen TEXT NOT NULL, doc TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS incidents_scraper ON incidents (scraper_id, status, last_seen, id)",
+    "CREATE TABLE IF NOT EXISTS repairs ("
+    "id TEXT PRIMARY KEY, scraper_id TEXT, timestamp TEXT NOT NULL, old_selector TEXT NOT NULL, "
+    "old_snapshot_hash TEXT, new_snapshot_hash TEXT, doc TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS repairs_scraper ON repairs (scraper_id, timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS repairs_key ON repairs (old_selector, old_snapshot_hash, new_snapshot_hash)",
+    "CREATE TABLE IF NOT EXISTS rollups ("
+    "scraper_id TEXT NOT NULL, resolution TEXT NOT NULL, bucket TEXT NOT NULL, "
+    "runs INTEGER NOT NULL, successes INTEGER NOT NULL, failures INTEGER NOT NULL, "
+    "duration_ms_sum REAL NOT NULL, duration_ms_min REAL NOT NULL, duration_ms_max REAL NOT NULL, "
+    "items_sum INTEGER NOT NULL, PRIMARY KEY (scraper_id, resolution, bucket)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS rollups_bucket ON rollups (resolution, bucket)",
+    # Health keeps the fleet overview fields apart from the sliding windows
+    "CREATE TABLE IF NOT EXISTS health (scraper_id TEXT PRIMARY KEY, summary TEXT NOT NULL, windows TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS stats (scraper_id TEXT PRIMARY KEY, doc TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+]
+
+ROLLUP_COLUMNS = (
+    "scraper_id", "resolution", "bucket", "runs", "successes", "failures",
+    "duration_ms_sum", "duration_ms_min", "duration_ms_max", "items_sum"
+)
+
+def dumps(doc: Dict[str, Any]) -> str:
+    return json.dumps(doc, separators=(",", ":"))
+
+def split(doc: Dict[str, Any], fields: List[str]) -> Tuple[str, str]:
+    """(the given fields, everything else) as two JSON strings."""
+    rest = {k: v for k, v in doc.items() if k not in fields}
+    return dumps(project(doc, fields)), dumps(rest)
+
+def joined(first: str, second: str) -> Dict[str, Any]:
+    doc = json.loads(first)
+    doc.update(json.loads(second))
+    return doc
+
+def keyset_clause(
+    before: Optional[SortKey] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+) -> Tuple[str, List[Any]]:
+    """SQL equivalent of keyset_query: (timestamp, id) < before and since <= timestamp < until."""
+    clauses, params = [], []
+    if before is not None:
+        clauses.append("(timestamp, id) < (?, ?)")
+        params.extend(before)
+    if since is not None:
+        clauses.append("timestamp >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("timestamp < ?")
+        params.append(until)
+    return "".join(f" AND {c}" for c in clauses), params
+
+class SQLiteBackend(StorageBackend):
+    """
+    Each thread gets its own connection and queries run in asyncio's thread
+    pool, so reads proceed in parallel. Writes are single transactions
+    (BEGIN IMMEDIATE), which SQLite serializes across threads and processes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.local = threading.local()
+        self.connections: List[sqlite3.Connection] = []
+        self.lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            # Durable across process crashes; only an OS crash can lose the last commits
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+
+    async def read(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        return await asyncio.to_thread(lambda: fn(self.connection()))
+
+    async def write(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        def run():
+            c = self.connection()
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(c)
+                if isinstance(result, sqlite3.Cursor):
+                    # A cursor finalized later on the event loop thread would race
+                    # this thread's next statement on the same connection
+                    result.close()
+                    result = None
+            except BaseException:
+                c.execute("ROLLBACK")
+                raise
+            c.execute("COMMIT")
+            return result
+        return await asyncio.to_thread(run)
+
+    async def open(self):
+        def create(c: sqlite3.Connection):
+            # Persistent: set once for the file, every later connection uses WAL
+            c.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                c.execute(statement)
+        await asyncio.to_thread(lambda: create(self.connection()))
+
+    async def close(self):
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections = []
+        self.local = threading.local()
+
+    def snapshot_store(self) -> SnapshotStore:
+        # Files written with atomic renames are as safe to share between processes as the database
+        return LocalSnapshotStore(f"{self.path}-snapshots")
+
+    # --- Scrapers ---
+
+    async def add_scraper(self, doc):
+        await self.write(lambda c: c.execute("INSERT INTO scrapers VALUES (?, ?)", (doc["id"], dumps(doc))))
+
+    async def get_scraper(self, scraper_id):
+        row = await self.read(lambda c: c.execute("SELECT doc FROM scrapers WHERE id = ?", (scraper_id,)).fetchone())
+        return json.loads(row[0]) if row else None
+
+    async def all_scrapers(self):
+        rows = await self.read(lambda c: c.execute("SELECT doc FROM scrapers").fetchall())
+        return [json.loads(row[0]) for row in rows]
+
+    async def count_scrapers(self):
+        return await self.read(lambda c: c.execute("SELECT COUNT(*) FROM scrapers").fetchone()[0])
+
+    # --- Runs ---
+
+    async def add_runs(self, docs):
+        rows = [
+            (doc["id"], doc["scraper_id"], doc["timestamp"], doc["status"], doc.get("snapshot_hash"),
+             *split(doc, RUN_SUMMARY_FIELDS))
+            for doc in docs
+        ]
+        await self.write(lambda c: c.executemany("INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?)", rows))
+
+    async def get_run(self, run_id):
+        row = await self.read(lambda c: c.execute("SELECT summary, detail FROM runs WHERE id = ?", (run_id,)).fetchone())
+        return joined(*row) if row else None
+
+    async def get_runs(self, run_ids):
+        def fetch(c: sqlite3.Connection) -> Dict[str, Dict[str, Any]]:
+            docs = {}
+            for i in range(0, len(run_ids), MAX_IN_PARAMS):
+                chunk = run_ids[i:i + MAX_IN_PARAMS]
+                marks = ", ".join("?" * len(chunk))
+                for run_id, summary, detail in c.execute(
+                    f"SELECT id, summary, detail FROM runs WHERE id IN ({marks})", chunk
+                ):
+                    docs[run_id] = joined(summary, detail)
+            return docs
+        docs = await self.read(fetch)
+        return [docs[run_id] for run_id in run_ids if run_id in docs]
+
+    async def last_successful_run(self, scraper_id, before=None):
+        where, params = keyset_clause(before)
+        row = await self.read(lambda c: c.execute(
+            "SELECT summary, detail FROM runs WHERE scraper_id = ? AND status = 'SUCCESS'"
+            f"{where} ORDER BY timestamp DESC, id DESC LIMIT 1",
+            [scraper_id, *params]
+        ).fetchone())
+        return joined(*row) if row else None
+
+    async def latest_runs(self, scraper_id, limit):
+        rows = await self.read(lambda c: c.execute(
+            "SELECT summary, detail FROM runs WHERE scraper_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?",
+            (scraper_id, limit)
+        ).fetchall())
+        return [joined(*row) for row in rows]
+
+    async def page_runs(self, scraper_id, limit, before=None, since=None, until=None, status=None):
+        where, params = keyset_clause(before, since, until)
+        if status:
+            where = " AND status = ?" + where
+            params.insert(0, status)
+        rows = await self.read(lambda c: c.execute(
+            f"SELECT summary FROM runs WHERE scraper_id = ?{where} ORDER BY timestamp DESC, id DESC LIMIT ?",
+            [scraper_id, *params, limit]
+        ).fetchall())
+        return [json.loads(row[0]) for row in rows]
+
+    async def expire_runs(self, before):
+        def expire(c: sqlite3.Connection) -> Tuple[int, Set[str]]:
+            # Each affected scraper's drift baseline, found through the status index
+            c.execute("CREATE TEMP TABLE IF NOT EXISTS expire_keep (id TEXT PRIMARY KEY)")
+            c.execute("DELETE FROM expire_keep")
+            c.execute(
+                "INSERT OR IGNORE INTO expire_keep SELECT id FROM (SELECT ("
+                "SELECT id FROM runs r WHERE r.scraper_id = s.scraper_id AND r.status = 'SUCCESS' "
+                "ORDER BY timestamp DESC, id DESC LIMIT 1"
+                ") AS id FROM (SELECT DISTINCT scraper_id FROM runs WHERE timestamp < ?) s) WHERE id IS NOT NULL",
+                (before,)
+            )
+            hashes = [row[0] for row in c.execute(
+                "DELETE FROM runs WHERE timestamp < ? AND id NOT IN (SELECT id FROM expire_keep) RETURNING snapshot_hash",
+                (before,)
+            )]
+            released = {
+                h for h in set(hashes)
+                if h and c.execute("SELECT 1 FROM runs WHERE snapshot_hash = ? LIMIT 1", (h,)).fetchone() is None
+            }
+            if hashes:
+                c.execute("INSERT OR REPLACE INTO meta VALUES ('runs_expired_before', ?)", (before,))
+            return len(hashes), released
+        return await self.write(expire)
+
+    async def runs_expired_before(self):
+        row = await self.read(lambda c: c.execute(
+            "SELECT value FROM meta WHERE key = 'runs_expired_before'"
+        ).fetchone())
+        return row[0] if row else None
+
+    # --- Alerts ---
+
+    async def add_alert(self, doc):
+        await self.write(lambda c: c.execute(
+            "INSERT INTO alerts VALUES (?, ?, ?, ?, ?)",
+            (doc["id"], doc["scraper_id"], doc["timestamp"], doc["severity"], dumps(doc))
+        ))
+
+    async def page_alerts(self, scraper_id, limit, before=None, since=None, until=None, severity=None):
+        where, params = keyset_clause(before, since, until)
+        if severity:
+            where = " AND severity = ?" + where
+            params.insert(0, severity)
+        rows = await self.read(lambda c: c.execute(
+            f"SELECT doc FROM alerts WHERE scraper_id = ?{where} ORDER BY timestamp DESC, id DESC LIMIT ?",
+            [scraper_id, *params, limit]
+        ).fetchall())
+        return [json.loads(row[0]) for row in rows]
+
+    # --- Incidents ---
+
+    async def save_incidents(self, docs):
+        rows = [(doc["id"], doc["scraper_id"], doc["status"], doc["last_seen"], dumps(doc)) for doc in docs]
+        await self.write(lambda c: c.executemany("INSERT OR REPLACE INTO incidents VALUES (?, ?, ?, ?, ?)", rows))
+
+    async def scraper_incidents(self, scraper_id, status=None, limit=None):
+        where, params = "", [scraper_id]
+        if status:
+            where = " AND status = ?"
+            params.append(status)
+        params.append(-1 if limit is None else limit)
+        rows = await self.read(lambda c: c.execute(
+            f"SELECT doc FROM incidents WHERE scraper_id = ?{where} ORDER BY last_seen DESC, id DESC LIMIT ?",
+            params
+        ).fetchall())
+        return [json.loads(row[0]) for row in rows]
+
+    # --- Repair suggestions ---
+
+    async def add_repairs(self, docs):
+        rows = [
+            (doc["id"], doc.get("scraper_id"), doc["timestamp"], doc["old_selector"],
+             doc.get("old_snapshot_hash"), doc.get("new_snapshot_hash"), dumps(doc))
+            for doc in docs
+        ]
+        await self.write(lambda c: c.executemany("INSERT INTO repairs VALUES (?, ?, ?, ?, ?, ?, ?)", rows))
+
+    async def find_repairs(self, key):
+        rows = await self.read(lambda c: c.execute(
+            "SELECT doc FROM repairs WHERE old_selector = ? AND old_snapshot_hash = ? AND new_snapshot_hash = ?",
+            key
+        ).fetchall())
+        return [json.loads(row[0]) for row in rows]
+
+    async def page_repairs(self, scraper_id, limit, before=None, since=None, until=None):
+        where, params = keyset_clause(before, since, until)
+        rows = await self.read(lambda c: c.execute(
+            f"SELECT doc FROM repairs WHERE scraper_id = ?{where} ORDER BY timestamp DESC, id DESC LIMIT ?",
+            [scraper_id, *params, limit]
+        ).fetchall())
+        return [json.loads(row[0]) for row in rows]
+
+    # --- Rollups ---
+
+    async def add_rollups(self, increments):
+        rows = [
+            (scraper_id, resolution, start, inc["runs"], inc["successes"], inc["failures"],
+             inc["duration_ms_sum"], inc["duration_ms_min"], inc["duration_ms_max"], inc["items_sum"])
+            for (scraper_id, resolution, start), inc in increments.items()
+        ]
+        # The upsert is the $inc/$min/$max of the Mongo backend, atomic per row
+        await self.write(lambda c: c.executemany(
+            f"INSERT INTO rollups VALUES ({', '.join('?' * len(ROLLUP_COLUMNS))}) "
+            "ON CONFLICT (scraper_id, resolution, bucket) DO UPDATE SET "
+            "runs = runs + excluded.runs, successes = successes + excluded.successes, "
+            "failures = failures + excluded.failures, duration_ms_sum = duration_ms_sum + excluded.duration_ms_sum, "
+            "items_sum = items_sum + excluded.items_sum, "
+            "duration_ms_min = min(duration_ms_min, excluded.duration_ms_min), "
+            "duration_ms_max = max(duration_ms_max, excluded.duration_ms_max)",
+            rows
+        ))
+
+    async def page_rollups(self, scraper_id, resolution, limit, since=None, until=None):
+        where, params = "", [scraper_id, resolution]
+        if since is not None:
+            where += " AND bucket >= ?"
+            params.append(since)
+        if until is not None:
+            where += " AND bucket < ?"
+            params.append(until)
+        rows = await self.read(lambda c: c.execute(
+            f"SELECT {', '.join(ROLLUP_COLUMNS)} FROM rollups WHERE scraper_id = ? AND resolution = ?{where} "
+            "ORDER BY bucket DESC LIMIT ?",
+            [*params, limit]
+        ).fetchall())
+        return [dict(zip(ROLLUP_COLUMNS, row)) for row in reversed(rows)]
+
+    async def expire_rollups(self, resolution, before):
+        return await self.write(lambda c: c.execute(
+            "DELETE FROM rollups WHERE resolution = ? AND bucket < ?", (resolution, before)
+        ).rowcount)
+
+    # --- Health summaries ---
+
+    async def get_health(self, scraper_id):
+        row = await self.read(lambda c: c.execute(
+            "SELECT summary, windows FROM health WHERE scraper_id = ?", (scraper_id,)
+        ).fetchone())
+        return joined(*row) if row else None
+
+    async def save_health(self, doc):
+        row = (doc["scraper_id"], *split(doc, HEALTH_SUMMARY_FIELDS))
+        await self.write(lambda c: c.execute("INSERT OR REPLACE INTO health VALUES (?, ?, ?)", row))
+
+    async def all_health(self):
+        rows = await self.read(lambda c: c.execute("SELECT summary FROM health").fetchall())
+        return [json.loads(row[0]) for row in rows]
+
+    # --- Rolling statistics ---
+
+    async def get_stats(self, scraper_id):
+        row = await self.read(lambda c: c.execute("SELECT doc FROM stats WHERE scraper_id = ?", (scraper_id,)).fetchone())
+        return json.loads(row[0]) if row else None
+
+    async def save_stats(self, doc):
+        await self.write(lambda c: c.execute(
+            "INSERT OR REPLACE INTO stats VALUES (?, ?)", (doc["scraper_id"], dumps(doc))
+        ))
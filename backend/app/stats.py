@@ -0,0 +1,353 @@
+import hashlib
+import math
+import re
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .models import Alert, DriftType, FieldSummary, ScraperRun
+
+# Streaming per-scraper statistics used for VALUE_DISTRIBUTION drift.
+# Every structure here is O(1) to update and serializes to a plain dict,
+# so the whole state is one small document per scraper.
+
+EWMA_ALPHA = 0.1
+# Runs observed before a scraper's statistics are trusted for alerting
+MIN_RUNS_FOR_SCORING = 5
+Z_SCORE_THRESHOLD = 4.0
+NULL_RATE_JUMP = 0.3
+CARDINALITY_COLLAPSE_RATIO = 0.2
+MIN_CARDINALITY_FOR_COLLAPSE = 5.0
+
+# A single number with an optional currency prefix ("$", "EUR ") and short unit suffix.
+# _NUMBER_RE and coerce_number are copied in sdk/scraper_sre/sampling.py (the SDK
+# doesn't depend on the backend) and must be kept identical to that copy;
+# sdk/tests/test_sampling.py checks that both agree.
+_NUMBER_RE = re.compile(r"^(?:[^\w\s+\-]{1,2}|[A-Z]{3}\s)?\s?([-+]?\d[\d,]*(?:\.\d+)?|[-+]?\.\d+)\s?[^\d]{0,8}$")
+
+def coerce_number(value: Any) -> Optional[float]:
+    """Numbers and number-like strings ("$1,299.00", "4.5 stars") become floats."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) if math.isfinite(value) else None
+    if isinstance(value, str):
+        match = _NUMBER_RE.match(value.strip())
+        if match:
+            try:
+                return float(match.group(1).replace(",", ""))
+            except ValueError:
+                return None
+    return None
+
+class Ewma:
+    """Exponentially weighted mean and variance."""
+
+    def __init__(self, mean: float = 0.0, var: float = 0.0, n: int = 0):
+        self.mean = mean
+        self.var = var
+        self.n = n
+
+    def update(self, x: float, alpha: float = EWMA_ALPHA):
+        if self.n == 0:
+            self.mean = x
+            self.var = 0.0
+        else:
+            diff = x - self.mean
+            incr = alpha * diff
+            self.mean += incr
+            self.var = (1 - alpha) * (self.var + diff * incr)
+        self.n += 1
+
+    def z_score(self, x: float) -> float:
+        std = math.sqrt(self.var)
+        if std < 1e-9:
+            # No variance observed yet (e.g. a constant series): treat a 10%
+            # relative change as one standard deviation.
+            if abs(self.mean) < 1e-9:
+                return 0.0 if abs(x) < 1e-9 else math.copysign(math.inf, x)
+            return (x - self.mean) / (abs(self.mean) * 0.1)
+        return (x - self.mean) / std
+
+    def to_doc(self) -> Dict[str, Any]:
+        return {"mean": self.mean, "var": self.var, "n": self.n}
+
+    @classmethod
+    def from_doc(cls, doc: Optional[Dict[str, Any]]) -> "Ewma":
+        return cls(**doc) if doc else cls()
+
+class P2Quantile:
+    """
+    P-square streaming quantile estimator (Jain & Chlamtac, 1985).
+    Five markers, O(1) memory and update.
+    """
+
+    def __init__(self, p: float, heights: Optional[List[float]] = None, positions: Optional[List[float]] = None,
+                 desired: Optional[List[float]] = None, count: int = 0):
+        self.p = p
+        self.heights = heights or []
+        self.positions = positions or [1.0, 2.0, 3.0, 4.0, 5.0]
+        self.desired = desired or [1.0, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5.0]
+        self.increments = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+        self.count = count
+
+    def update(self, x: float):
+        self.count += 1
+        q = self.heights
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while k < 3 and x >= q[k + 1]:
+                k += 1
+
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                step = 1 if d > 0 else -1
+                candidate = self._parabolic(i, step)
+                if not q[i - 1] < candidate < q[i + 1]:
+                    candidate = q[i] + step * (q[i + step] - q[i]) / (n[i + step] - n[i])
+                q[i] = candidate
+                n[i] += step
+
+    def _parabolic(self, i: int, d: int) -> float:
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self) -> Optional[float]:
+        if not self.heights:
+            return None
+        if len(self.heights) < 5:
+            idx = min(len(self.heights) - 1, int(round(self.p * (len(self.heights) - 1))))
+            return self.heights[idx]
+        return self.heights[2]
+
+    def to_doc(self) -> Dict[str, Any]:
+        return {"p": self.p, "heights": self.heights, "positions": self.positions,
+                "desired": self.desired, "count": self.count}
+
+    @classmethod
+    def from_doc(cls, doc: Optional[Dict[str, Any]], p: float) -> "P2Quantile":
+        return cls(**doc) if doc else cls(p)
+
+class HyperLogLog:
+    """Cardinality estimator with 2**precision one-byte registers."""
+
+    def __init__(self, precision: int = 8, registers: Optional[str] = None):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray.fromhex(registers) if registers else bytearray(self.m)
+
+    def add(self, value: Any):
+        h = int.from_bytes(hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "big")
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def estimate(self) -> float:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * self.m and zeros:
+            return self.m * math.log(self.m / zeros)
+        return raw
+
+    def to_doc(self) -> Dict[str, Any]:
+        return {"precision": self.precision, "registers": self.registers.hex()}
+
+    @classmethod
+    def from_doc(cls, doc: Optional[Dict[str, Any]]) -> "HyperLogLog":
+        return cls(**doc) if doc else cls()
+
+def summarize_sample(
+    sample: List[Dict[str, Any]],
+    field_stats: Optional[Dict[str, FieldSummary]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-field aggregates of one run's extracted sample. `field_stats`, when the
+    client sent them, are exact totals over every extracted item and replace the
+    sample's counts, means and distinct counts; the sample still feeds the
+    quantile and cardinality sketches.
+    """
+    fields: Dict[str, Dict[str, Any]] = {}
+    keys = set(field_stats or {})
+    for item in sample:
+        keys.update(item.keys())
+    for key in keys:
+        numbers = []
+        categories = set()
+        nulls = 0
+        for item in sample:
+            value = item.get(key)
+            if value is None or value == "":
+                nulls += 1
+                continue
+            number = coerce_number(value)
+            if number is not None:
+                numbers.append(number)
+            elif isinstance(value, (str, int, float, bool)):
+                categories.add(value)
+        fields[key] = {
+            "count": len(sample),
+            "nulls": nulls,
+            "numbers": numbers,
+            "number_count": len(numbers),
+            "number_sum": sum(numbers),
+            "categories": categories,
+            "distinct": len(categories),
+        }
+        totals = (field_stats or {}).get(key)
+        if totals is not None:
+            fields[key].update(
+                count=totals.count,
+                nulls=totals.nulls,
+                number_count=totals.numeric_count,
+                number_sum=totals.numeric_sum,
+                distinct=totals.distinct,
+            )
+    return fields
+
+class FieldStats:
+    def __init__(self, doc: Optional[Dict[str, Any]] = None):
+        doc = doc or {}
+        self.null_rate = Ewma.from_doc(doc.get("null_rate"))
+        self.numeric_mean = Ewma.from_doc(doc.get("numeric_mean"))
+        self.p50 = P2Quantile.from_doc(doc.get("p50"), 0.5)
+        self.p95 = P2Quantile.from_doc(doc.get("p95"), 0.95)
+        self.distinct_per_run = Ewma.from_doc(doc.get("distinct_per_run"))
+        self.cardinality = HyperLogLog.from_doc(doc.get("cardinality"))
+
+    def to_doc(self) -> Dict[str, Any]:
+        return {
+            "null_rate": self.null_rate.to_doc(),
+            "numeric_mean": self.numeric_mean.to_doc(),
+            "p50": self.p50.to_doc(),
+            "p95": self.p95.to_doc(),
+            "distinct_per_run": self.distinct_per_run.to_doc(),
+            "cardinality": self.cardinality.to_doc(),
+        }
+
+class RollingStats:
+    """All streaming statistics for one scraper."""
+
+    def __init__(self, scraper_id: str, doc: Optional[Dict[str, Any]] = None):
+        doc = doc or {}
+        self.scraper_id = scraper_id
+        self.runs = doc.get("runs", 0)
+        self.item_count = Ewma.from_doc(doc.get("item_count"))
+        self.fields: Dict[str, FieldStats] = {
+            name: FieldStats(field_doc) for name, field_doc in doc.get("fields", {}).items()
+        }
+
+    def to_doc(self) -> Dict[str, Any]:
+        return {
+            "scraper_id": self.scraper_id,
+            "runs": self.runs,
+            "item_count": self.item_count.to_doc(),
+            "fields": {name: field.to_doc() for name, field in self.fields.items()},
+        }
+
+    def update(self, run: ScraperRun, summary: Optional[Dict[str, Dict[str, Any]]] = None):
+        """Folds a successful run into the statistics."""
+        self.runs += 1
+        self.item_count.update(float(run.items_extracted))
+        if summary is None:
+            summary = summarize_sample(run.extracted_data_sample or [], run.field_stats)
+        for name, agg in summary.items():
+            field = self.fields.get(name)
+            if field is None:
+                field = self.fields[name] = FieldStats()
+            if agg["count"]:
+                field.null_rate.update(agg["nulls"] / agg["count"])
+            if agg["number_count"]:
+                field.numeric_mean.update(agg["number_sum"] / agg["number_count"])
+            for x in agg["numbers"]:
+                field.p50.update(x)
+                field.p95.update(x)
+            if agg["distinct"]:
+                field.distinct_per_run.update(float(agg["distinct"]))
+            for value in agg["categories"]:
+                field.cardinality.add(value)
+
+    def score(self, run: ScraperRun, summary: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Alert]:
+        """Compares a run against the current statistics (before it is folded in)."""
+        if self.runs < MIN_RUNS_FOR_SCORING:
+            return []
+        if summary is None:
+            summary = summarize_sample(run.extracted_data_sample or [], run.field_stats)
+
+        findings = []
+        z = self.item_count.z_score(float(run.items_extracted))
+        if abs(z) > Z_SCORE_THRESHOLD:
+            findings.append(
+                f"Item count {run.items_extracted} deviates from rolling mean "
+                f"{self.item_count.mean:.1f} (z={z:.1f})"
+            )
+
+        for name, agg in summary.items():
+            field = self.fields.get(name)
+            if field is None or not agg["count"]:
+                continue
+
+            null_rate = agg["nulls"] / agg["count"]
+            if field.null_rate.n >= MIN_RUNS_FOR_SCORING and null_rate - field.null_rate.mean > NULL_RATE_JUMP:
+                findings.append(
+                    f"Field '{name}' null rate {null_rate:.0%} (usually {field.null_rate.mean:.0%})"
+                )
+
+            if agg["number_count"] and field.numeric_mean.n >= MIN_RUNS_FOR_SCORING:
+                mean = agg["number_sum"] / agg["number_count"]
+                z = field.numeric_mean.z_score(mean)
+                if abs(z) > Z_SCORE_THRESHOLD:
+                    p50, p95 = field.p50.value(), field.p95.value()
+                    # The quantiles only see sampled values, so totals can
+                    # carry numbers even when no sample ever did
+                    history = ""
+                    if p50 is not None and p95 is not None:
+                        history = f", historical p50={p50:.2f}, p95={p95:.2f}"
+                    findings.append(
+                        f"Field '{name}' mean {mean:.2f} shifted from {field.numeric_mean.mean:.2f} "
+                        f"(z={z:.1f}{history})"
+                    )
+
+            if agg["distinct"] and field.distinct_per_run.n >= MIN_RUNS_FOR_SCORING:
+                usual = field.distinct_per_run.mean
+                distinct = agg["distinct"]
+                if usual >= MIN_CARDINALITY_FOR_COLLAPSE and distinct < usual * CARDINALITY_COLLAPSE_RATIO:
+                    findings.append(
+                        f"Field '{name}' has {distinct} distinct values (usually {usual:.1f}, "
+                        f"~{field.cardinality.estimate():.0f} seen overall)"
+                    )
+
+        if not findings:
+            return []
+        return [Alert(
+            id=str(uuid.uuid4()),
+            scraper_id=run.scraper_id,
+            run_id=run.id,
+            type=DriftType.VALUE_DISTRIBUTION,
+            message="Value distribution drift. " + "; ".join(findings),
+            severity="MEDIUM",
+            timestamp=datetime.now()
+        )]
@@ -0,0 +1,562 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .memory_store import MemoryStore, RepairKey
+from .models import HealthSummary, RunSummary
+from .pagination import SortKey
+from .rollups import RollupKey
+from .snapshots import GridFSSnapshotStore, MemorySnapshotStore, SnapshotStore
+
+# Storage engines behind database.py. Backends deal in JSON-ready documents
+# (model_dump(mode='json')); database.py converts to and from models.
+#
+#   mock://               in-process memory (one process only)
+#   sqlite:///path.db     embedded SQLite in WAL mode, shared by every process on the host
+#   mongodb://...         MongoDB
+
+logger = logging.getLogger(__name__)
+
+# Fields fetched for run listings; everything else stays in the database.
+RUN_SUMMARY_FIELDS = list(RunSummary.model_fields.keys())
+# Fields served by the fleet overview; the sliding windows stay in the database.
+HEALTH_SUMMARY_FIELDS = list(HealthSummary.model_fields.keys())
+
+def project(doc: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Mock-mode equivalent of a Mongo projection."""
+    return {field: doc[field] for field in fields if field in doc}
+
+class StorageBackend(ABC):
+    """
+    Document storage for scrapers, runs, alerts, incidents, repair suggestions,
+    rollups, health summaries and rolling statistics.
+    Per-scraper sequences are ordered by (timestamp, id), newest first.
+    """
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    def snapshot_store(self) -> SnapshotStore:
+        """Where snapshots go when SNAPSHOT_STORE_PATH isn't set. Called after open()."""
+        ...
+
+    # --- Scrapers ---
+
+    @abstractmethod
+    async def add_scraper(self, doc: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    async def get_scraper(self, scraper_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def all_scrapers(self) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def count_scrapers(self) -> int:
+        ...
+
+    # --- Runs ---
+
+    @abstractmethod
+    async def add_runs(self, docs: List[Dict[str, Any]]):
+        ...
+
+    @abstractmethod
+    async def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def get_runs(self, run_ids: List[str]) -> List[Dict[str, Any]]:
+        """Runs in the order of `run_ids`; unknown ids are skipped."""
+        ...
+
+    @abstractmethod
+    async def last_successful_run(
+        self,
+        scraper_id: str,
+        before: Optional[SortKey] = None
+    ) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def latest_runs(self, scraper_id: str, limit: int) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def page_runs(
+        self,
+        scraper_id: str,
+        limit: int,
+        before: Optional[SortKey] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Newest-first page; documents carry at least RUN_SUMMARY_FIELDS."""
+        ...
+
+    @abstractmethod
+    async def expire_runs(self, before: str) -> Tuple[int, Set[str]]:
+        """
+        Deletes runs with timestamp < before, except each scraper's latest
+        successful run. Returns the number deleted and the snapshot hashes
+        no remaining run references. A call that deletes runs records
+        `before` for runs_expired_before.
+        """
+        ...
+
+    @abstractmethod
+    async def runs_expired_before(self) -> Optional[str]:
+        """`before` of the last expire_runs call that deleted runs, in any process."""
+        ...
+
+    # --- Alerts ---
+
+    @abstractmethod
+    async def add_alert(self, doc: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    async def page_alerts(
+        self,
+        scraper_id: str,
+        limit: int,
+        before: Optional[SortKey] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        severity: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        ...
+
+    # --- Incidents ---
+
+    @abstractmethod
+    async def save_incidents(self, docs: List[Dict[str, Any]]):
+        """Inserts or replaces by id."""
+        ...
+
+    @abstractmethod
+    async def scraper_incidents(
+        self,
+        scraper_id: str,
+        status: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Most recently active first."""
+        ...
+
+    # --- Repair suggestions ---
+
+    @abstractmethod
+    async def add_repairs(self, docs: List[Dict[str, Any]]):
+        ...
+
+    @abstractmethod
+    async def find_repairs(self, key: RepairKey) -> List[Dict[str, Any]]:
+        """Suggestions for (old_selector, old_snapshot_hash, new_snapshot_hash), in any order."""
+        ...
+
+    @abstractmethod
+    async def page_repairs(
+        self,
+        scraper_id: str,
+        limit: int,
+        before: Optional[SortKey] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        ...
+
+    # --- Rollups ---
+
+    @abstractmethod
+    async def add_rollups(self, increments: Dict[RollupKey, Dict[str, Any]]):
+        """Adds the counters and sums, and folds in the minimum and maximum, of each bucket."""
+        ...
+
+    @abstractmethod
+    async def page_rollups(
+        self,
+        scraper_id: str,
+        resolution: str,
+        limit: int,
+        since: Optional[str] = None,
+        until: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """The newest `limit` buckets with since <= start < until, oldest first."""
+        ...
+
+    @abstractmethod
+    async def expire_rollups(self, resolution: str, before: str) -> int:
+        ...
+
+    # --- Health summaries ---
+
+    @abstractmethod
+    async def get_health(self, scraper_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def save_health(self, doc: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    async def all_health(self) -> List[Dict[str, Any]]:
+        """Every scraper's health; documents carry at least HEALTH_SUMMARY_FIELDS."""
+        ...
+
+    # --- Rolling statistics ---
+
+    @abstractmethod
+    async def get_stats(self, scraper_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def save_stats(self, doc: Dict[str, Any]):
+        ...
+
+class MemoryBackend(StorageBackend):
+    """
+    Mock mode. Data lives in this process only, so it is lost on restart and
+    not shared between uvicorn workers; use SQLite for that.
+    """
+
+    def __init__(self):
+        self.store = MemoryStore()
+
+    def snapshot_store(self) -> SnapshotStore:
+        return MemorySnapshotStore()
+
+    async def add_scraper(self, doc):
+        self.store.add_scraper(doc)
+
+    async def get_scraper(self, scraper_id):
+        return self.store.get_scraper(scraper_id)
+
+    async def all_scrapers(self):
+        return self.store.all_scrapers()
+
+    async def count_scrapers(self):
+        return len(self.store.scrapers)
+
+    async def add_runs(self, docs):
+        self.store.add_runs(docs)
+
+    async def get_run(self, run_id):
+        return self.store.get_run(run_id)
+
+    async def get_runs(self, run_ids):
+        return self.store.get_runs(run_ids)
+
+    async def last_successful_run(self, scraper_id, before=None):
+        return self.store.last_successful_run(scraper_id, before=before)
+
+    async def latest_runs(self, scraper_id, limit):
+        return self.store.latest_runs(scraper_id, limit)
+
+    async def page_runs(self, scraper_id, limit, before=None, since=None, until=None, status=None):
+        return self.store.page_runs(scraper_id, limit, before=before, since=since, until=until, status=status)
+
+    async def expire_runs(self, before):
+        return self.store.expire_runs(before)
+
+    async def runs_expired_before(self):
+        return self.store.runs_expired_before
+
+    async def add_alert(self, doc):
+        self.store.add_alert(doc)
+
+    async def page_alerts(self, scraper_id, limit, before=None, since=None, until=None, severity=None):
+        return self.store.page_alerts(scraper_id, limit, before=before, since=since, until=until, severity=severity)
+
+    async def save_incidents(self, docs):
+        for doc in docs:
+            self.store.save_incident(doc)
+
+    async def scraper_incidents(self, scraper_id, status=None, limit=None):
+        return self.store.scraper_incidents(scraper_id, status)[:limit]
+
+    async def add_repairs(self, docs):
+        self.store.add_repairs(docs)
+
+    async def find_repairs(self, key):
+        return self.store.find_repairs(key)
+
+    async def page_repairs(self, scraper_id, limit, before=None, since=None, until=None):
+        return self.store.page_repairs(scraper_id, limit, before=before, since=since, until=until)
+
+    async def add_rollups(self, increments):
+        self.store.add_rollups(increments)
+
+    async def page_rollups(self, scraper_id, resolution, limit, since=None, until=None):
+        return self.store.page_rollups(scraper_id, resolution, limit, since=since, until=until)
+
+    async def expire_rollups(self, resolution, before):
+        return self.store.expire_rollups(resolution, before)
+
+    async def get_health(self, scraper_id):
+        return self.store.get_health(scraper_id)
+
+    async def save_health(self, doc):
+        self.store.save_health(doc)
+
+    async def all_health(self):
+        return self.store.all_health()
+
+    async def get_stats(self, scraper_id):
+        return self.store.get_stats(scraper_id)
+
+    async def save_stats(self, doc):
+        self.store.save_stats(doc)
+
+def keyset_query(
+    query: Dict[str, Any],
+    before: Optional[SortKey] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+) -> Dict[str, Any]:
+    """Adds the (timestamp, id) < before and since/until conditions to a Mongo query."""
+    timestamp_range = {}
+    if since is not None:
+        timestamp_range["$gte"] = since
+    if until is not None:
+        timestamp_range["$lt"] = until
+    if timestamp_range:
+        query["timestamp"] = timestamp_range
+    if before is not None:
+        query["$or"] = [
+            {"timestamp": {"$lt": before[0]}},
+            {"timestamp": before[0], "id": {"$lt": before[1]}}
+        ]
+    return query
+
+def log_index_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Creating MongoDB indexes failed: {task.exception()}")
+
+KEYSET_SORT = [("timestamp", -1), ("id", -1)]
+NO_ID = {"_id": 0}
+RUN_SUMMARY_PROJECTION = {**{field: 1 for field in RUN_SUMMARY_FIELDS}, "_id": 0}
+HEALTH_SUMMARY_PROJECTION = {**{field: 1 for field in HEALTH_SUMMARY_FIELDS}, "_id": 0}
+
+class MongoBackend(StorageBackend):
+    def __init__(self, url: str, db_name: str):
+        self.url = url
+        self.db_name = db_name
+        self.client = None
+        self.db = None
+        self.indexing: Optional[asyncio.Task] = None
+
+    async def open(self):
+        from motor.motor_asyncio import AsyncIOMotorClient
+        # Motor only connects when the first command runs, and index builds go
+        # to the background, so opening never waits on a round trip to the server
+        self.client = AsyncIOMotorClient(self.url)
+        self.db = self.client[self.db_name]
+        self.indexing = asyncio.create_task(self.ensure_indexes())
+        self.indexing.add_done_callback(log_index_failure)
+
+    async def close(self):
+        if self.indexing is not None:
+            self.indexing.cancel()
+        if self.client:
+            self.client.close()
+
+    def snapshot_store(self) -> SnapshotStore:
+        return GridFSSnapshotStore(self.db)
+
+    async def ensure_indexes(self):
+        """
+        Compound indexes backing the keyset-paginated, newest-first queries.
+        create_index is a no-op for indexes that already exist.
+        """
+        db = self.db
+        await db.scrapers.create_index("id", unique=True)
+        await db.runs.create_index("id", unique=True)
+        await db.runs.create_index([("scraper_id", 1), ("timestamp", -1), ("id", -1)])
+        await db.runs.create_index([("scraper_id", 1), ("status", 1), ("timestamp", -1), ("id", -1)])
+        await db.runs.create_index("timestamp")
+        await db.runs.create_index("snapshot_hash", sparse=True)
+        await db.alerts.create_index([("scraper_id", 1), ("timestamp", -1), ("id", -1)])
+        await db.alerts.create_index([("scraper_id", 1), ("severity", 1), ("timestamp", -1), ("id", -1)])
+        await db.stats.create_index("scraper_id", unique=True)
+        await db.health.create_index("scraper_id", unique=True)
+        await db.rollups.create_index([("scraper_id", 1), ("resolution", 1), ("bucket", 1)], unique=True)
+        await db.rollups.create_index([("resolution", 1), ("bucket", 1)])
+        await db.incidents.create_index("id", unique=True)
+        await db.incidents.create_index([("scraper_id", 1), ("status", 1), ("last_seen", -1)])
+        await db.repairs.create_index([("scraper_id", 1), ("timestamp", -1), ("id", -1)])
+        await db.repairs.create_index([("old_selector", 1), ("old_snapshot_hash", 1), ("new_snapshot_hash", 1)])
+
+    async def add_scraper(self, doc):
+        # insert_one/insert_many add _id to the dicts they are given
+        await self.db.scrapers.insert_one(dict(doc))
+
+    async def get_scraper(self, scraper_id):
+        return await self.db.scrapers.find_one({"id": scraper_id}, NO_ID)
+
+    async def all_scrapers(self):
+        return [doc async for doc in self.db.scrapers.find({}, NO_ID)]
+
+    async def count_scrapers(self):
+        return await self.db.scrapers.count_documents({})
+
+    async def add_runs(self, docs):
+        if len(docs) == 1:
+            await self.db.runs.insert_one(dict(docs[0]))
+        else:
+            await self.db.runs.insert_many([dict(doc) for doc in docs], ordered=False)
+
+    async def get_run(self, run_id):
+        return await self.db.runs.find_one({"id": run_id}, NO_ID)
+
+    async def get_runs(self, run_ids):
+        docs = {}
+        async for doc in self.db.runs.find({"id": {"$in": run_ids}}, NO_ID):
+            docs[doc["id"]] = doc
+        return [docs[run_id] for run_id in run_ids if run_id in docs]
+
+    async def last_successful_run(self, scraper_id, before=None):
+        query = keyset_query({"scraper_id": scraper_id, "status": "SUCCESS"}, before=before)
+        return await self.db.runs.find_one(query, NO_ID, sort=KEYSET_SORT)
+
+    async def latest_runs(self, scraper_id, limit):
+        cursor = self.db.runs.find({"scraper_id": scraper_id}, NO_ID).sort(KEYSET_SORT).limit(limit)
+        return [doc async for doc in cursor]
+
+    async def page_runs(self, scraper_id, limit, before=None, since=None, until=None, status=None):
+        query = {"scraper_id": scraper_id}
+        if status:
+            query["status"] = status
+        query = keyset_query(query, before=before, since=since, until=until)
+        cursor = self.db.runs.find(query, RUN_SUMMARY_PROJECTION).sort(KEYSET_SORT).limit(limit)
+        return [doc async for doc in cursor]
+
+    async def expire_runs(self, before):
+        db = self.db
+        baselines = db.runs.aggregate([
+            {"$match": {"status": "SUCCESS"}},
+            {"$sort": {"scraper_id": 1, "timestamp": -1, "id": -1}},
+            {"$group": {"_id": "$scraper_id", "id": {"$first": "$id"}}}
+        ])
+        keep = [doc["id"] async for doc in baselines]
+        query = {"timestamp": {"$lt": before}, "id": {"$nin": keep}}
+        candidates = [h for h in await db.runs.distinct("snapshot_hash", query) if h]
+        result = await db.runs.delete_many(query)
+        if result.deleted_count:
+            await db.meta.update_one({"_id": "runs_expired_before"}, {"$set": {"value": before}}, upsert=True)
+        released = set()
+        for h in candidates:
+            if await db.runs.find_one({"snapshot_hash": h}, {"_id": 1}) is None:
+                released.add(h)
+        return result.deleted_count, released
+
+    async def runs_expired_before(self):
+        doc = await self.db.meta.find_one({"_id": "runs_expired_before"})
+        return doc["value"] if doc else None
+
+    async def add_alert(self, doc):
+        await self.db.alerts.insert_one(dict(doc))
+
+    async def page_alerts(self, scraper_id, limit, before=None, since=None, until=None, severity=None):
+        query = {"scraper_id": scraper_id}
+        if severity:
+            query["severity"] = severity
+        query = keyset_query(query, before=before, since=since, until=until)
+        cursor = self.db.alerts.find(query, NO_ID).sort(KEYSET_SORT).limit(limit)
+        return [doc async for doc in cursor]
+
+    async def save_incidents(self, docs):
+        from pymongo import ReplaceOne
+        await self.db.incidents.bulk_write(
+            [ReplaceOne({"id": doc["id"]}, dict(doc), upsert=True) for doc in docs], ordered=False
+        )
+
+    async def scraper_incidents(self, scraper_id, status=None, limit=None):
+        query = {"scraper_id": scraper_id}
+        if status:
+            query["status"] = status
+        cursor = self.db.incidents.find(query, NO_ID).sort([("last_seen", -1), ("id", -1)])
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        return [doc async for doc in cursor]
+
+    async def add_repairs(self, docs):
+        await self.db.repairs.insert_many([dict(doc) for doc in docs])
+
+    async def find_repairs(self, key):
+        old_selector, old_snapshot_hash, new_snapshot_hash = key
+        cursor = self.db.repairs.find({
+            "old_selector": old_selector,
+            "old_snapshot_hash": old_snapshot_hash,
+            "new_snapshot_hash": new_snapshot_hash
+        }, NO_ID)
+        return [doc async for doc in cursor]
+
+    async def page_repairs(self, scraper_id, limit, before=None, since=None, until=None):
+        query = keyset_query({"scraper_id": scraper_id}, before=before, since=since, until=until)
+        cursor = self.db.repairs.find(query, NO_ID).sort(KEYSET_SORT).limit(limit)
+        return [doc async for doc in cursor]
+
+    async def add_rollups(self, increments):
+        from pymongo import UpdateOne
+        await self.db.rollups.bulk_write([
+            UpdateOne(
+                {"scraper_id": scraper_id, "resolution": resolution, "bucket": start},
+                {
+                    "$inc": {f: inc[f] for f in ("runs", "successes", "failures", "duration_ms_sum", "items_sum")},
+                    "$min": {"duration_ms_min": inc["duration_ms_min"]},
+                    "$max": {"duration_ms_max": inc["duration_ms_max"]}
+                },
+                upsert=True
+            )
+            for (scraper_id, resolution, start), inc in increments.items()
+        ], ordered=False)
+
+    async def page_rollups(self, scraper_id, resolution, limit, since=None, until=None):
+        query: Dict[str, Any] = {"scraper_id": scraper_id, "resolution": resolution}
+        bucket_range = {}
+        if since is not None:
+            bucket_range["$gte"] = since
+        if until is not None:
+            bucket_range["$lt"] = until
+        if bucket_range:
+            query["bucket"] = bucket_range
+        cursor = self.db.rollups.find(query, NO_ID).sort("bucket", -1).limit(limit)
+        docs = [doc async for doc in cursor]
+        return docs[::-1]
+
+    async def expire_rollups(self, resolution, before):
+        result = await self.db.rollups.delete_many({"resolution": resolution, "bucket": {"$lt": before}})
+        return result.deleted_count
+
+    async def get_health(self, scraper_id):
+        return await self.db.health.find_one({"scraper_id": scraper_id}, NO_ID)
+
+    async def save_health(self, doc):
+        await self.db.health.replace_one({"scraper_id": doc["scraper_id"]}, doc, upsert=True)
+
+    async def all_health(self):
+        return [doc async for doc in self.db.health.find({}, HEALTH_SUMMARY_PROJECTION)]
+
+    async def get_stats(self, scraper_id):
+        return await self.db.stats.find_one({"scraper_id": scraper_id}, NO_ID)
+
+    async def save_stats(self, doc):
+        await self.db.stats.replace_one({"scraper_id": doc["scraper_id"]}, doc, upsert=True)
+
+def create_storage(url: str, db_name: str) -> StorageBackend:
+    if url.startswith("mock://"):
+        return MemoryBackend()
+    if url.startswith("sqlite:///"):
+        from .sqlite_store import SQLiteBackend
+        return SQLiteBackend(url[len("sqlite:///"):])
+    return MongoBackend(url, db_name)
@@ -0,0 +1,350 @@
+import asyncio
+import functools
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Minimal Prometheus text-format (0.0.4) metrics. Hand-rolled to keep the hot
+# path to a perf_counter() call and a few additions, with no extra dependency.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers sub-millisecond mock-store calls up to slow repairs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+def escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{escape_label(v)}"' for n, v in zip(names, values)) + "}"
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), registry: Optional["Registry"] = None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.children: Dict[Tuple[str, ...], Any] = {}
+        self.lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def labels(self, *values: str):
+        """The child for one combination of label values. Resolve once and keep it on hot paths."""
+        key = tuple(str(v) for v in values)
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self.new_child())
+        return child
+
+    def clear(self):
+        with self.lock:
+            self.children = {}
+
+    def new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+class Counter(Metric):
+    type = "counter"
+
+    def new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}_total{format_labels(self.labelnames, key)} {format_value(child.value)}"
+            for key, child in list(self.children.items())
+        ]
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, *args, callback: Optional[Callable[[], float]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Unlabelled gauges can be computed when scraped instead of maintained
+        self.callback = callback
+
+    def new_child(self):
+        return _Value()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def samples(self) -> List[str]:
+        if self.callback is not None:
+            return [f"{self.name} {format_value(self.callback())}"]
+        return [
+            f"{self.name}{format_labels(self.labelnames, key)} {format_value(child.value)}"
+            for key, child in list(self.children.items())
+        ]
+
+class _HistogramValue:
+    __slots__ = ("upper_bounds", "counts", "sum")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.sum += value
+        for i, bound in enumerate(self.upper_bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        self.upper_bounds = tuple(sorted(buckets))
+        super().__init__(*args, **kwargs)
+
+    def new_child(self):
+        return _HistogramValue(self.upper_bounds)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, child in list(self.children.items()):
+            cumulative = 0
+            for bound, count in zip(self.upper_bounds + (math.inf,), child.counts):
+                cumulative += count
+                labels = format_labels(self.labelnames + ("le",), key + (format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric):
+        self.metrics.append(metric)
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+REGISTRY = Registry()
+
+# --- Metrics ---
+
+OPERATION_DURATION = Histogram(
+    "scraper_sre_operation_duration_seconds", "Duration of pipeline operations", ["operation"]
+)
+OPERATION_IN_FLIGHT = Gauge(
+    "scraper_sre_operation_in_flight", "Pipeline operations currently running", ["operation"]
+)
+OPERATION_ERRORS = Counter(
+    "scraper_sre_operation_errors", "Pipeline operations that raised", ["operation"]
+)
+DB_DURATION = Histogram(
+    "scraper_sre_db_duration_seconds", "Duration of storage operations", ["operation"]
+)
+DB_IN_FLIGHT = Gauge(
+    "scraper_sre_db_in_flight", "Storage operations currently running", ["operation"]
+)
+DB_ERRORS = Counter(
+    "scraper_sre_db_errors", "Storage operations that raised", ["operation"]
+)
+HTTP_DURATION = Histogram(
+    "scraper_sre_http_request_duration_seconds", "HTTP request latency by route", ["method", "route", "status"]
+)
+HTTP_IN_FLIGHT = Gauge(
+    "scraper_sre_http_requests_in_flight", "HTTP requests currently being served"
+)
+RUNS_INGESTED = Counter(
+    "scraper_sre_runs_ingested", "Runs accepted by ingest", ["status"]
+)
+ALERTS_RAISED = Counter(
+    "scraper_sre_alerts_raised", "Alerts raised by analysis, including repeats folded into incidents", ["type"]
+)
+SCHEDULED_SCRAPES = Counter(
+    "scraper_sre_scheduled_scrapes", "Scrapes run by the built-in scheduler",
+    ["result"] # ingested, failed, not_modified (304) or unchanged (same page content)
+)
+QUEUE_LAG = Histogram(
+    "scraper_sre_analysis_queue_lag_seconds", "Time from enqueue to the start of analysis",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+)
+
+QUEUE_DEPTH = Gauge(
+    "scraper_sre_analysis_queue_depth", "Analysis jobs waiting (approximate for persistent queues)",
+    callback=lambda: 0
+)
+
+# Per-scraper gauges, refreshed from the health summaries on each scrape
+SCRAPER_SUCCESS_RATE = Gauge(
+    "scraper_sre_scraper_success_rate", "Success rate over the last N runs", ["scraper_id", "window"]
+)
+SCRAPER_P95_DURATION = Gauge(
+    "scraper_sre_scraper_p95_duration_ms", "p95 run duration over recent runs", ["scraper_id"]
+)
+SCRAPER_OPEN_INCIDENTS = Gauge(
+    "scraper_sre_scraper_open_incidents", "Open incidents", ["scraper_id"]
+)
+SCRAPER_LAST_RUN = Gauge(
+    "scraper_sre_scraper_last_run_timestamp_seconds", "Time of the last analyzed run", ["scraper_id"]
+)
+
+def _timed(histogram: Histogram, in_flight: Gauge, errors: Counter, operation: str):
+    observed = histogram.labels(operation)
+    running = in_flight.labels(operation)
+    failed = errors.labels(operation)
+
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                running.inc()
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception:
+                    failed.inc()
+                    raise
+                finally:
+                    observed.observe(time.perf_counter() - start)
+                    running.dec()
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            running.inc()
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                failed.inc()
+                raise
+            finally:
+                observed.observe(time.perf_counter() - start)
+                running.dec()
+        return wrapper
+    return decorator
+
+def timed(operation: str):
+    """Records duration, in-flight count and errors of a pipeline function (sync or async)."""
+    return _timed(OPERATION_DURATION, OPERATION_IN_FLIGHT, OPERATION_ERRORS, operation)
+
+# Operations timed in a repair pool process land in that process's REGISTRY,
+# which /metrics never renders. run_cpu_bound ships what each call recorded
+# back with its result, and the parent merges it into its own metrics.
+
+OperationTotals = Dict[str, Tuple[List[int], float, float]]
+
+def snapshot_operations() -> OperationTotals:
+    """Bucket counts, sum and error count of every timed operation."""
+    errors = {key[0]: child.value for key, child in list(OPERATION_ERRORS.children.items())}
+    return {
+        key[0]: (list(child.counts), child.sum, errors.get(key[0], 0.0))
+        for key, child in list(OPERATION_DURATION.children.items())
+    }
+
+def operations_since(before: OperationTotals) -> OperationTotals:
+    """What was recorded since `before` was taken, for operations that ran."""
+    changes = {}
+    for operation, (counts, total, errors) in snapshot_operations().items():
+        old_counts, old_total, old_errors = before.get(operation, ([0] * len(counts), 0.0, 0.0))
+        added = [new - old for new, old in zip(counts, old_counts)]
+        if any(added):
+            changes[operation] = (added, total - old_total, errors - old_errors)
+    return changes
+
+def merge_operations(changes: OperationTotals):
+    for operation, (counts, total, errors) in changes.items():
+        child = OPERATION_DURATION.labels(operation)
+        for i, count in enumerate(counts):
+            child.counts[i] += count
+        child.sum += total
+        if errors:
+            OPERATION_ERRORS.labels(operation).inc(errors)
+
+def timed_db(fn):
+    """Same as timed(), for storage operations, labelled with the function name."""
+    return _timed(DB_DURATION, DB_IN_FLIGHT, DB_ERRORS, fn.__name__)(fn)
+
+class HTTPMetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request by route template
+    (e.g. /api/v1/scrapers/{scraper_id}/runs), so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.labels().inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.labels().dec()
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_DURATION.labels(scope["method"], path, str(status["code"])).observe(time.perf_counter() - start)
+
+def update_fleet_gauges(fleet):
+    """Replaces the per-scraper gauges with the current health summaries."""
+    for gauge in (SCRAPER_SUCCESS_RATE, SCRAPER_P95_DURATION, SCRAPER_OPEN_INCIDENTS, SCRAPER_LAST_RUN):
+        gauge.clear()
+    for health in fleet:
+        for window, rate in health.success_rate.items():
+            SCRAPER_SUCCESS_RATE.labels(health.scraper_id, window).set(rate)
+        if health.p95_duration_ms is not None:
+            SCRAPER_P95_DURATION.labels(health.scraper_id).set(health.p95_duration_ms)
+        SCRAPER_OPEN_INCIDENTS.labels(health.scraper_id).set(health.open_incidents)
+        if health.last_run_at is not None:
+            SCRAPER_LAST_RUN.labels(health.scraper_id).set(health.last_run_at.timestamp())
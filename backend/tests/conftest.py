@@ -0,0 +1,73 @@
+import asyncio
+import os
+
+# The app reads its configuration at import time: run it in-process, in
+# memory, whatever environment the tests are started from
+os.environ.update({
+    "STORAGE_URL": "mock://",
+    "ANALYSIS_QUEUE": "memory",
+    "REPAIR_PROCESSES": "0",
+    "SCHEDULER_ENABLED": "false",
+})
+os.environ.pop("SNAPSHOT_STORE_PATH", None)
+
+import httpx
+import pytest
+
+from demo.stub_server import product_page
+
+SELECTORS = {"name": "h1", "price": ".price"}
+OLD_PAGE = product_page("price")
+# The price class is renamed: ".price" stops matching, ".price-v2" is the repair
+NEW_PAGE = product_page("price-v2")
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+def reset_app():
+    """Empties storage and drops the analysis queue before a test starts the app."""
+    from backend.app.database import storage
+    from backend.app.main import analysis_workers
+    storage.store.clear()
+    # Each test runs its own event loop; start from a fresh queue bound to it
+    analysis_workers.queue = None
+
+@pytest.fixture
+async def client():
+    """HTTP client for the app, with its lifespan (storage, analysis workers) running."""
+    from backend.app.main import app
+    reset_app()
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            yield client
+
+async def wait_for_analysis(timeout: float = 10.0):
+    from backend.app.main import analysis_workers
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while analysis_workers.queue.pending:
+        assert loop.time() < deadline, "analysis queue did not drain"
+        await asyncio.sleep(0.01)
+
+async def register(client: httpx.AsyncClient, selectors=SELECTORS) -> str:
+    response = await client.post("/api/v1/register", json={
+        "name": "products", "target_url": "http://shop.test/products", "selectors": selectors
+    })
+    response.raise_for_status()
+    return response.json()["id"]
+
+def run_payload(scraper_id: str, sample, html=OLD_PAGE, status="SUCCESS", **fields):
+    return {
+        "scraper_id": scraper_id,
+        "status": status,
+        "duration_ms": 120.0,
+        "items_extracted": len(sample),
+        "extracted_data_sample": sample,
+        "html_snapshot": html,
+        **fields,
+    }
+
+GOOD_SAMPLE = [{"name": "Cool Widget", "price": "$19.99"}, {"name": "Gadget Pro", "price": "$49.00"}]
+# What the scraper extracts from NEW_PAGE with the old selectors
+BROKEN_SAMPLE = [{"name": "Cool Widget"}, {"name": "Gadget Pro"}]
@@ -0,0 +1,114 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from backend.app import analysis_queue, main
+from backend.app.analysis_queue import AnalysisWorkers, Job, MemoryJobQueue
+
+from .conftest import BROKEN_SAMPLE, GOOD_SAMPLE, NEW_PAGE, register, run_payload, wait_for_analysis
+
+@pytest.mark.anyio
+async def test_runs_of_a_scraper_are_handled_in_order():
+    handled = []
+
+    async def handler(job: Job):
+        handled.append(job.run_ids)
+
+    workers = AnalysisWorkers(handler, MemoryJobQueue(2))
+    await workers.start()
+    try:
+        for i in range(5):
+            await workers.submit({"a": [f"a{i}"], "b": [f"b{i}"]})
+        while workers.queue.pending:
+            await asyncio.sleep(0.01)
+    finally:
+        await workers.stop()
+    assert [ids[0] for ids in handled if ids[0].startswith("a")] == [f"a{i}" for i in range(5)]
+    assert [ids[0] for ids in handled if ids[0].startswith("b")] == [f"b{i}" for i in range(5)]
+
+class FlakyQueue(MemoryJobQueue):
+    """Fails the first call of each operation named in `failing`."""
+
+    def __init__(self, *failing: str):
+        super().__init__(1)
+        self.failing = set(failing)
+
+    def maybe_fail(self, operation: str):
+        if operation in self.failing:
+            self.failing.discard(operation)
+            raise sqlite3.OperationalError("database is locked")
+
+    async def get(self, shard: int) -> Job:
+        self.maybe_fail("get")
+        return await super().get(shard)
+
+    async def ack(self, job: Job):
+        self.maybe_fail("ack")
+        await super().ack(job)
+
+async def run_workers(queue: MemoryJobQueue, jobs: int) -> list:
+    handled = []
+
+    async def handler(job: Job):
+        handled.append(job.run_ids)
+
+    workers = AnalysisWorkers(handler, queue)
+    await workers.start()
+    try:
+        for i in range(jobs):
+            await workers.submit({"a": [f"a{i}"]})
+        while queue.pending:
+            await asyncio.sleep(0.01)
+    finally:
+        await workers.stop()
+    return handled
+
+@pytest.mark.anyio
+async def test_worker_survives_a_failing_claim(monkeypatch):
+    monkeypatch.setattr(analysis_queue, "QUEUE_RETRY_DELAY", 0)
+    assert await run_workers(FlakyQueue("get"), 3) == [["a0"], ["a1"], ["a2"]]
+
+@pytest.mark.anyio
+async def test_failing_ack_does_not_rerun_the_job(monkeypatch):
+    monkeypatch.setattr(analysis_queue, "QUEUE_RETRY_DELAY", 0)
+    queue = FlakyQueue("ack")
+    assert await run_workers(queue, 2) == [["a0"], ["a1"]]
+    assert queue.pending == 0
+
+@pytest.mark.anyio
+async def test_retried_job_stores_its_results_once(client, monkeypatch):
+    scraper_id = await register(client)
+    await client.post("/api/v1/ingest", json=run_payload(scraper_id, GOOD_SAMPLE))
+    await wait_for_analysis()
+
+    # The drifted run is stored without going through the queue, so the
+    # test can run (and fail) its analysis job itself
+    run = main.build_run(main.IngestRunRequest(**run_payload(scraper_id, BROKEN_SAMPLE, NEW_PAGE)))
+    run.snapshot_hash = await main.db_save_snapshot(NEW_PAGE)
+    run.html_snapshot = None
+    await main.db_save_run(run)
+
+    compute_repairs = main.compute_repairs
+    calls = []
+
+    async def flaky_repairs(**kwargs):
+        # Fails after the alert and its incident were raised
+        calls.append(kwargs)
+        if len(calls) == 1:
+            raise RuntimeError("repair pool died")
+        return await compute_repairs(**kwargs)
+
+    monkeypatch.setattr(main, "compute_repairs", flaky_repairs)
+    job = Job(scraper_id, [run.id])
+    with pytest.raises(RuntimeError):
+        await main.process_analysis_job(job)
+    await main.process_analysis_job(job)
+
+    alerts = (await client.get(f"/api/v1/scrapers/{scraper_id}/alerts")).json()
+    assert [a["type"] for a in alerts] == ["SCHEMA_CHANGE"]
+    incidents = (await client.get(f"/api/v1/scrapers/{scraper_id}/incidents")).json()
+    assert [(i["type"], i["count"]) for i in incidents] == [("SCHEMA_CHANGE", 1)]
+    repairs = (await client.get(f"/api/v1/scrapers/{scraper_id}/repairs")).json()
+    assert repairs and {r["alert_id"] for r in repairs} == {alerts[0]["id"]}
+    assert repairs[0]["suggested_selector"].endswith(".price-v2")
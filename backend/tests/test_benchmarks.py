@@ -0,0 +1,98 @@
+import pytest
+
+from backend.app.extraction import extract_items
+from benchmarks import compare, scenarios
+from benchmarks.fleet import FIELDS, SELECTORS, SyntheticFleet
+
+from .conftest import reset_app
+
+def registered(fleet: SyntheticFleet) -> SyntheticFleet:
+    for scraper in fleet.scrapers:
+        scraper.id = f"id-{scraper.index}"
+    return fleet
+
+def test_fleet_is_deterministic_for_a_seed():
+    runs = [list(registered(SyntheticFleet(scrapers=3, seed=7)).runs(30)) for _ in range(2)]
+    assert runs[0] == runs[1]
+    assert list(registered(SyntheticFleet(scrapers=3, seed=8)).runs(30)) != runs[0]
+    # Round-robin across the fleet
+    assert [run["scraper_id"] for run in runs[0][:4]] == ["id-0", "id-1", "id-2", "id-0"]
+
+def test_pages_have_the_requested_size():
+    fleet = registered(SyntheticFleet(scrapers=1, snapshot_bytes=10_000, drift_rate=0.0))
+    page = fleet.page(fleet.scrapers[0])
+    assert 10_000 - fleet.item_size() <= len(page) <= 10_000
+    items = extract_items(page, SELECTORS)
+    assert len(items) == fleet.items_per_page
+    assert all(item[field] is not None for item in items for field in FIELDS)
+
+def test_samples_match_what_extraction_finds_on_drifted_pages():
+    fleet = registered(SyntheticFleet(scrapers=2, snapshot_bytes=4_000, drift_rate=0.3, failure_rate=0.0))
+    drifts = 0
+    for run in fleet.runs(40):
+        extracted = extract_items(run["html_snapshot"], SELECTORS)[0]
+        sampled = run["extracted_data_sample"][0]
+        broken = {field for field in FIELDS if sampled[field] is None}
+        assert broken == {field for field in FIELDS if extracted[field] is None}
+        drifts += bool(broken)
+    assert 0 < drifts < 40
+
+def test_drifted_page_renames_one_field():
+    fleet = registered(SyntheticFleet(scrapers=1, snapshot_bytes=4_000, drift_rate=0.0))
+    item = extract_items(fleet.drifted_page(fleet.scrapers[0], "price"), SELECTORS)[0]
+    assert item["price"] is None
+    assert all(item[field] is not None for field in FIELDS if field != "price")
+    assert extract_items(fleet.drifted_page(fleet.scrapers[0], "price"), {"price": ".price-v1"})[0]["price"]
+
+def test_failed_runs_carry_no_items():
+    fleet = registered(SyntheticFleet(scrapers=1, failure_rate=1.0))
+    run = fleet.next_run(fleet.scrapers[0])
+    assert (run["status"], run["items_extracted"], run["extracted_data_sample"]) == ("FAILURE", 0, None)
+
+def test_compare_flags_regressions_beyond_the_threshold(capsys):
+    baseline = {"results": {"ingest": {
+        "accepted_per_s": 100.0, "request_latency": {"p50_ms": 10.0, "count": 50},
+        "operations": {"analyze_run": {"mean_ms": 1.0}}
+    }}}
+    current = {"results": {"ingest": {
+        "accepted_per_s": 70.0, "request_latency": {"p50_ms": 11.0, "count": 5},
+        "operations": {"analyze_run": {"mean_ms": 9.0}}
+    }}}
+    assert compare.compare(baseline, current, 0.2) == 1
+    output = capsys.readouterr().out
+    assert "ingest.accepted_per_s" in output and "REGRESSED" in output
+    # Counts aren't tracked, and per-operation breakdowns are never gated
+    assert "count" not in output and "analyze_run" not in output
+    assert compare.compare(baseline, current, 0.5) == 0
+
+@pytest.fixture
+async def harness():
+    reset_app()
+    async with scenarios.Harness({"snapshot_bytes": 4_000, "seed": 1}) as harness:
+        yield harness
+
+@pytest.mark.anyio
+async def test_ingest_scenario(harness):
+    results = await scenarios.ingest_scenario(harness, runs=10, concurrency=4, batch_size=5, scrapers=2)
+    assert results["single"]["statuses"] == {"200": 10}
+    assert results["batch"]["statuses"] == {"200": 2}
+    assert results["single"]["operations"]["analyze_run"]["calls"] == 10
+    assert results["batch"]["operations"]["ingest_batch"]["calls"] == 2
+    assert "analyze_batch" in results["batch"]["operations"]
+    for mode in ("single", "batch"):
+        assert results[mode]["request_latency"]["count"] == results[mode]["requests"]
+
+@pytest.mark.anyio
+async def test_history_scenarios(harness):
+    runs = await scenarios.get_runs_scenario(harness, depths=[5], repeat=2)
+    assert runs["5"]["full_scan"]["pages"] == 1
+    assert runs["5"]["http_list_runs_50"]["count"] == 2
+    analyzed = await scenarios.analyze_scenario(harness, depths=[5], samples=3)
+    assert analyzed["5"]["count"] == 3
+    assert analyzed["5"]["operations"]["analyze_run"]["calls"] == 3
+
+@pytest.mark.anyio
+async def test_repair_scenario_finds_renamed_classes(harness):
+    results = scenarios.repair_scenario(harness, pairs=3)
+    assert results["cold"]["count"] == results["warm"]["count"] == 3
+    assert results["top1_accuracy"] == 1.0
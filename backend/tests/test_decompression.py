@@ -0,0 +1,45 @@
+import gzip
+import json
+
+import pytest
+
+from backend.app.decompression import DecompressionMiddleware
+from backend.app.main import app
+from sdk.scraper_sre.compression import encode_body
+
+from .conftest import GOOD_SAMPLE, register, run_payload, wait_for_analysis
+
+@pytest.mark.anyio
+async def test_compressed_ingest_is_decoded_and_labelled_by_route(client):
+    scraper_id = await register(client)
+    body, headers = encode_body(run_payload(scraper_id, GOOD_SAMPLE * 20))
+    assert headers["Content-Encoding"] == "gzip"
+    response = await client.post("/api/v1/ingest", content=body, headers=headers)
+    assert response.status_code == 200
+    await wait_for_analysis()
+    runs = (await client.get(f"/api/v1/scrapers/{scraper_id}/runs")).json()
+    assert [r["items_extracted"] for r in runs] == [len(GOOD_SAMPLE) * 20]
+
+    metrics = (await client.get("/metrics")).text
+    assert 'method="POST",route="/api/v1/ingest",status="200"' in metrics
+
+@pytest.mark.anyio
+async def test_corrupt_and_unknown_encodings_are_rejected(client):
+    headers = {"Content-Type": "application/json"}
+    response = await client.post("/api/v1/ingest", content=b"not gzip", headers={**headers, "Content-Encoding": "gzip"})
+    assert response.status_code == 400
+    response = await client.post("/api/v1/ingest", content=b"{}", headers={**headers, "Content-Encoding": "br"})
+    assert response.status_code == 415
+
+@pytest.mark.anyio
+async def test_decoded_size_is_capped(client, monkeypatch):
+    middleware = app.middleware_stack
+    while not isinstance(middleware, DecompressionMiddleware):
+        middleware = middleware.app
+    monkeypatch.setattr(middleware, "max_body_bytes", 10_000)
+    # Compresses to well under the limit, decodes to far over it
+    body = gzip.compress(json.dumps({"runs": [], "padding": " " * 100_000}).encode())
+    response = await client.post(
+        "/api/v1/ingest/batch", content=body, headers={"Content-Type": "application/json", "Content-Encoding": "gzip"}
+    )
+    assert response.status_code == 413
@@ -0,0 +1,60 @@
+import pytest
+
+from backend.app.events import EventBus
+
+async def messages(bus: EventBus, subscription, count: int):
+    stream = bus.stream(subscription)
+    try:
+        return [await stream.__anext__() for _ in range(count)]
+    finally:
+        await stream.aclose()
+
+def event_ids(messages):
+    return [m.split("\n")[0][len("id: "):] for m in messages if m.startswith("id: ")]
+
+def publish(bus: EventBus, count: int, scraper_id: str = "s"):
+    for i in range(count):
+        bus.publish("run", scraper_id, {"n": i})
+
+@pytest.mark.anyio
+async def test_resuming_replays_what_was_missed():
+    bus = EventBus(epoch="boot1")
+    publish(bus, 2)
+    publish(bus, 1, "other")
+    publish(bus, 1)
+    subscription = bus.subscribe(["s"], "boot1-1")
+    assert event_ids(await messages(bus, subscription, 2)) == ["boot1-2", "boot1-4"]
+    assert subscription not in bus.subscriptions
+
+@pytest.mark.anyio
+async def test_ids_from_another_epoch_overflow():
+    before, bus = EventBus(), EventBus()
+    publish(before, 5)
+    assert bus.epoch != before.epoch
+    publish(bus, 2)
+    # The old process reached id 5; this one restarted at 1
+    subscription = bus.subscribe(None, f"{before.epoch}-1")
+    received = await messages(bus, subscription, 1)
+    assert received[0].startswith("event: overflow")
+    assert not subscription.buffer
+    # Ids of the old unprefixed form have no epoch either
+    assert bus.subscribe(None, "1").dropped == 1
+
+@pytest.mark.anyio
+async def test_resuming_past_the_history_overflows():
+    bus = EventBus(history_size=2, epoch="boot1")
+    publish(bus, 5)
+    subscription = bus.subscribe(None, "boot1-1")
+    received = await messages(bus, subscription, 3)
+    assert received[0].startswith("event: overflow")
+    assert event_ids(received) == ["boot1-4", "boot1-5"]
+    assert bus.subscribe(None, "boot1-3").dropped == 0
+
+def test_malformed_ids_are_rejected():
+    with pytest.raises(ValueError):
+        EventBus().subscribe(None, "boot1-x")
+
+@pytest.mark.anyio
+async def test_stream_rejects_malformed_last_event_ids(client):
+    response = await client.get("/api/v1/stream", headers={"Last-Event-ID": "not-an-id"})
+    assert response.status_code == 400
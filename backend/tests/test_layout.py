@@ -0,0 +1,108 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.app import main
+from backend.app.analyzer import detect_drift
+from backend.app.layout import (
+    LAYOUT_CHANGE_BITS, RELATED_BANDS, RELATED_LAYOUT_BITS, LayoutChange, LayoutChangeIndex, bands,
+    layout_distance, layout_fingerprint
+)
+from backend.app.models import DriftType, RunStatus, ScraperRun
+
+from .conftest import GOOD_SAMPLE, NEW_PAGE, OLD_PAGE, register, run_payload, wait_for_analysis
+
+BASE = "0123456789abcdef"
+T0 = datetime(2026, 1, 1, 12)
+
+def flip(fingerprint: str, *positions: int) -> str:
+    value = int(fingerprint, 16)
+    for position in positions:
+        value ^= 1 << position
+    return f"{value:016x}"
+
+def band_edges():
+    return [round(i * 64 / RELATED_BANDS) for i in range(RELATED_BANDS)]
+
+def change(scraper_id: str, new_fingerprint: str, minutes: float = 0) -> LayoutChange:
+    return LayoutChange(scraper_id, str(uuid.uuid4()), T0 + timedelta(minutes=minutes), "f" * 16, new_fingerprint)
+
+def table_page(rows: int = 3) -> str:
+    cells = "".join(f"<tr><td><b>Item {i}</b></td><td><i>$1</i></td></tr>" for i in range(rows))
+    return f"<html><head><title>t</title></head><body><nav><a>home</a></nav><table>{cells}</table></body></html>"
+
+def test_fingerprints_ignore_text_and_classes():
+    assert layout_distance(layout_fingerprint(OLD_PAGE), layout_fingerprint(NEW_PAGE)) == 0
+    assert layout_distance(layout_fingerprint(table_page(3)), layout_fingerprint(table_page(60))) == 0
+    assert layout_distance(layout_fingerprint(OLD_PAGE), layout_fingerprint(table_page())) > LAYOUT_CHANGE_BITS
+    assert layout_fingerprint("no tags here") is None
+
+def test_layout_change_needs_more_than_the_threshold():
+    def drift(old: str, new: str):
+        runs = [
+            ScraperRun(
+                id=str(uuid.uuid4()), scraper_id="s", timestamp=T0, status=RunStatus.SUCCESS,
+                duration_ms=1.0, items_extracted=0, layout_fingerprint=fingerprint
+            )
+            for fingerprint in (new, old)
+        ]
+        return [alert.type for alert in detect_drift(*runs)]
+
+    at_threshold = flip(BASE, *range(LAYOUT_CHANGE_BITS))
+    assert drift(BASE, at_threshold) == []
+    assert drift(BASE, flip(at_threshold, 63)) == [DriftType.LAYOUT_CHANGE]
+
+def test_related_changes_share_a_band():
+    index = LayoutChangeIndex()
+    # One bit flipped in every band but the last: still colliding in that one
+    near = flip(BASE, *band_edges()[:RELATED_LAYOUT_BITS])
+    # One bit in every band: nothing collides, though it is only one bit further
+    far = flip(BASE, *band_edges())
+    assert layout_distance(BASE, near) == RELATED_LAYOUT_BITS
+    assert len(set(bands(BASE)) & set(bands(near))) == 1 and not set(bands(BASE)) & set(bands(far))
+
+    query = change("a", BASE)
+    for c in (query, change("b", near, 5), change("c", far, 5), change("d", BASE, 10), change("d", near, 20)):
+        index.add(c)
+    related = index.related(query)
+    # Nearest first, one per scraper
+    assert [(c.scraper_id, distance) for c, distance in related] == [("d", 0), ("b", RELATED_LAYOUT_BITS)]
+    assert [c.scraper_id for c, _ in index.related(query, timedelta(minutes=7))] == ["b"]
+    assert [c.scraper_id for c, _ in index.related(query, max_bits=0)] == ["d"]
+
+def test_changes_expire_from_the_window():
+    index = LayoutChangeIndex(window=timedelta(hours=1))
+    old, recent = change("a", BASE), change("b", BASE, 30)
+    index.add(old)
+    index.add(recent)
+    index.add(change("c", flip(BASE, 0), 61))
+    assert index.latest_change("a") is None and index.latest_change("b") is recent
+    assert [c.scraper_id for c in index.changes] == ["b", "c"]
+    assert all(old not in bucket for bucket in index.buckets.values())
+    assert [c.scraper_id for c, _ in index.related(recent)] == ["c"]
+
+    index.add(change("d", "0" * 16, 200))
+    # Emptied buckets are dropped, not kept around empty
+    assert set(index.buckets) == set(bands("0" * 16))
+
+@pytest.mark.anyio
+async def test_related_layout_changes_endpoint(client, monkeypatch):
+    monkeypatch.setattr(main, "layout_changes", LayoutChangeIndex())
+    first, second, unchanged = [await register(client) for _ in range(3)]
+    for scraper_id in (first, second, unchanged):
+        await client.post("/api/v1/ingest", json=run_payload(scraper_id, GOOD_SAMPLE))
+    # Two sites move to the same new template
+    for scraper_id in (first, second):
+        await client.post("/api/v1/ingest", json=run_payload(scraper_id, GOOD_SAMPLE, html=table_page()))
+    await client.post("/api/v1/ingest", json=run_payload(unchanged, GOOD_SAMPLE))
+    await wait_for_analysis()
+
+    response = await client.get(f"/api/v1/scrapers/{first}/layout-changes/related")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["change"]["scraper_id"] == first and body["change"]["distance"] > LAYOUT_CHANGE_BITS
+    assert [(r["scraper_id"], r["distance_to_change"]) for r in body["related"]] == [(second, 0)]
+
+    response = await client.get(f"/api/v1/scrapers/{unchanged}/layout-changes/related")
+    assert response.status_code == 404
@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.app import retention
+from backend.app.database import storage
+from backend.app.models import Alert, RepairSuggestion, ScraperRun
+from backend.app.pagination import decode_cursor, encode_cursor
+
+from .conftest import BROKEN_SAMPLE, GOOD_SAMPLE, NEW_PAGE, register, run_payload, wait_for_analysis
+
+@pytest.mark.anyio
+async def test_repairs_listing_is_revalidated_with_its_etag(client):
+    scraper_id = await register(client)
+    url = f"/api/v1/scrapers/{scraper_id}/repairs"
+    empty = await client.get(url)
+    assert empty.json() == [] and "ETag" in empty.headers
+
+    await client.post("/api/v1/ingest", json=run_payload(scraper_id, GOOD_SAMPLE))
+    await client.post("/api/v1/ingest", json=run_payload(scraper_id, BROKEN_SAMPLE, NEW_PAGE))
+    await wait_for_analysis()
+    listed = await client.get(url, headers={"If-None-Match": empty.headers["ETag"]})
+    assert listed.status_code == 200 and listed.json()
+    assert listed.headers["ETag"] != empty.headers["ETag"]
+
+    again = await client.get(url, headers={"If-None-Match": listed.headers["ETag"]})
+    assert again.status_code == 304
+
+@pytest.mark.anyio
+async def test_runs_listing_etag_changes_when_retention_deletes_runs(client, monkeypatch):
+    monkeypatch.setattr(retention, "RUN_RETENTION_DAYS", 30)
+    scraper_id = await register(client)
+    url = f"/api/v1/scrapers/{scraper_id}/runs"
+    # The newest run survives retention, so the deletion leaves it unchanged
+    await client.post("/api/v1/ingest", json=run_payload(scraper_id, [], status="FAILURE"))
+    await client.post("/api/v1/ingest", json=run_payload(scraper_id, GOOD_SAMPLE))
+    await wait_for_analysis()
+    before = await client.get(url)
+    assert len(before.json()) == 2
+
+    # Everything is past retention; only the baseline run is kept
+    assert (await retention.compact(datetime.now() + timedelta(days=365)))["runs"] == 1
+    after = await client.get(url, headers={"If-None-Match": before.headers["ETag"]})
+    assert after.status_code == 200
+    assert [r["status"] for r in after.json()] == ["SUCCESS"]
+
+def at(hour: int, minute: int = 0) -> datetime:
+    return datetime(2026, 1, 1, hour, minute)
+
+async def store_runs(scraper_id: str, *runs):
+    await storage.add_runs([
+        ScraperRun(
+            id=run_id, scraper_id=scraper_id, timestamp=timestamp, status=status, duration_ms=100.0, items_extracted=1
+        ).model_dump(mode="json")
+        for run_id, timestamp, status in runs
+    ])
+
+async def pages(client, url: str, **params):
+    """Every page of a listing, following X-Next-Cursor."""
+    results = []
+    while True:
+        response = await client.get(url, params=params)
+        assert response.status_code == 200
+        results.append([doc["id"] for doc in response.json()])
+        if "X-Next-Cursor" not in response.headers:
+            return results
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+def test_cursors_round_trip():
+    doc = {"timestamp": at(10, 30), "id": "r/1+"}
+    cursor = encode_cursor(doc)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == ("2026-01-01T10:30:00", "r/1+")
+    assert decode_cursor(encode_cursor({"timestamp": "2026-01-01T10:30:00", "id": "x"})) == ("2026-01-01T10:30:00", "x")
+    # Not base64, not JSON, and a JSON pair of the wrong types
+    for malformed in ("not base64!", "bm90IGpzb24", "WzEsMl0"):
+        with pytest.raises(ValueError):
+            decode_cursor(malformed)
+
+@pytest.mark.anyio
+async def test_run_pages_break_timestamp_ties_by_id(client):
+    # Four runs in the same second: a timestamp-only cursor would skip or repeat some
+    await store_runs("s", ("b", at(10), "SUCCESS"), ("d", at(10), "SUCCESS"), ("a", at(10), "SUCCESS"),
+                     ("c", at(10), "FAILURE"), ("e", at(11), "SUCCESS"))
+    assert await pages(client, "/api/v1/scrapers/s/runs", limit=2) == [["e", "d"], ["c", "b"], ["a"]]
+
+@pytest.mark.anyio
+async def test_malformed_cursors_are_rejected(client):
+    for name in ("runs", "alerts", "repairs"):
+        response = await client.get(f"/api/v1/scrapers/s/{name}", params={"cursor": "not a cursor"})
+        assert response.status_code == 400
+        assert "Invalid cursor" in response.json()["detail"]
+
+@pytest.mark.anyio
+async def test_listings_are_filtered(client):
+    await store_runs("s", ("r1", at(9), "SUCCESS"), ("r2", at(10), "FAILURE"), ("r3", at(11), "SUCCESS"),
+                     ("r4", at(12), "FAILURE"))
+    runs = "/api/v1/scrapers/s/runs"
+    assert await pages(client, runs, since="2026-01-01T10:00:00", until="2026-01-01T12:00:00") == [["r3", "r2"]]
+    assert await pages(client, runs, status="FAILURE", limit=1) == [["r4"], ["r2"]]
+    assert (await client.get(runs, params={"status": "BOGUS"})).status_code == 422
+
+    for i, severity in enumerate(["HIGH", "LOW", "HIGH", "MEDIUM"]):
+        await storage.add_alert(Alert(
+            id=f"a{i}", scraper_id="s", run_id=f"r{i + 1}", type="SCHEMA_CHANGE", message="m",
+            severity=severity, timestamp=at(9 + i)
+        ).model_dump(mode="json"))
+    alerts = "/api/v1/scrapers/s/alerts"
+    assert await pages(client, alerts, severity="HIGH") == [["a2", "a0"]]
+    assert await pages(client, alerts, severity="HIGH", since="2026-01-01T10:00:00") == [["a2"]]
+    assert await pages(client, alerts, until="2026-01-01T11:00:00", limit=1) == [["a1"], ["a0"]]
+
+    await storage.add_repairs([
+        RepairSuggestion(
+            id=f"p{i}", alert_id="a0", field_name="price", old_selector=".price", suggested_selector=".price-v2",
+            confidence_score=0.9, diff_summary="", timestamp=at(9 + i), scraper_id="s"
+        ).model_dump(mode="json")
+        for i in range(3)
+    ])
+    repairs = "/api/v1/scrapers/s/repairs"
+    assert await pages(client, repairs, since="2026-01-01T10:00:00") == [["p2", "p1"]]
+    assert await pages(client, repairs, until="2026-01-01T10:00:00") == [["p0"]]
+    assert await pages(client, repairs, limit=2) == [["p2", "p1"], ["p0"]]
@@ -0,0 +1,210 @@
+from datetime import datetime
+
+import pytest
+
+from backend.app import main
+from backend.app.cache import LRUCache
+from backend.app.models import Alert, DriftType, RunStatus, ScraperRun
+from backend.app.repair import generate_fix_prompt, get_dom_context, suggest_repairs
+from backend.app.snapshots import snapshot_hash as compute_snapshot_hash
+
+from .conftest import BROKEN_SAMPLE, GOOD_SAMPLE, NEW_PAGE, OLD_PAGE, register, run_payload, wait_for_analysis
+
+# Regression tests for the path every reported run takes: ingest, drift
+# detection against the baseline, incidents, repair suggestions and the
+# materialized fleet health.
+
+async def ingest(client, payload):
+    response = await client.post("/api/v1/ingest", json=payload)
+    assert response.status_code == 200
+    await wait_for_analysis()
+
+async def listing(client, scraper_id: str, name: str):
+    response = await client.get(f"/api/v1/scrapers/{scraper_id}/{name}")
+    response.raise_for_status()
+    return response.json()
+
+async def health(client, scraper_id: str):
+    return {h["scraper_id"]: h for h in (await client.get("/api/v1/fleet")).json()}[scraper_id]
+
+@pytest.mark.anyio
+async def test_layout_change_raises_an_incident_and_a_repair(client):
+    scraper_id = await register(client)
+    await ingest(client, run_payload(scraper_id, GOOD_SAMPLE))
+    assert await listing(client, scraper_id, "alerts") == []
+    summary = await health(client, scraper_id)
+    assert (summary["total_runs"], summary["last_status"], summary["open_incidents"]) == (1, "SUCCESS", 0)
+
+    # The price class is renamed: the scraper stops extracting prices
+    await ingest(client, run_payload(scraper_id, BROKEN_SAMPLE, NEW_PAGE))
+    alerts = await listing(client, scraper_id, "alerts")
+    assert [(a["type"], a["missing_keys"]) for a in alerts] == [("SCHEMA_CHANGE", ["price"])]
+    incidents = await listing(client, scraper_id, "incidents")
+    assert [(i["status"], i["alert_id"], i["count"]) for i in incidents] == [("OPEN", alerts[0]["id"], 1)]
+    repairs = await listing(client, scraper_id, "repairs")
+    assert [(r["field_name"], r["old_selector"], r["alert_id"]) for r in repairs][0] == ("price", ".price", alerts[0]["id"])
+    assert repairs[0]["suggested_selector"].endswith(".price-v2")
+    summary = await health(client, scraper_id)
+    assert (summary["open_incidents"], summary["last_drift_type"]) == (1, "SCHEMA_CHANGE")
+
+    # The same output again is the new normal: the incident is resolved
+    await ingest(client, run_payload(scraper_id, BROKEN_SAMPLE, NEW_PAGE))
+    incidents = await listing(client, scraper_id, "incidents")
+    assert [i["status"] for i in incidents] == ["RESOLVED"]
+    assert len(await listing(client, scraper_id, "alerts")) == 1
+    assert (await health(client, scraper_id))["open_incidents"] == 0
+
+@pytest.mark.anyio
+async def test_repeated_failures_fold_into_incidents(client):
+    scraper_id = await register(client)
+    await ingest(client, run_payload(scraper_id, GOOD_SAMPLE))
+    failure = run_payload(scraper_id, [], status="FAILURE", html=None, error_message="TimeoutError: page did not load")
+    for _ in range(3):
+        await ingest(client, failure)
+
+    # Only the first alert of each kind is stored; its incident counts the repeats
+    alerts = {a["id"]: a["type"] for a in await listing(client, scraper_id, "alerts")}
+    assert sorted(alerts.values()) == ["NULL_SPIKE", "RUN_FAILURE"]
+    incidents = await listing(client, scraper_id, "incidents")
+    assert sorted((alerts[i["alert_id"]], i["status"], i["count"]) for i in incidents) == [
+        (kind, "OPEN", 3) for kind in sorted(alerts.values())
+    ]
+    summary = await health(client, scraper_id)
+    assert (summary["total_runs"], summary["last_status"], summary["open_incidents"]) == (4, "FAILURE", 2)
+
+    await ingest(client, run_payload(scraper_id, GOOD_SAMPLE))
+    assert {i["status"] for i in await listing(client, scraper_id, "incidents")} == {"RESOLVED"}
+    assert (await health(client, scraper_id))["open_incidents"] == 0
+
+@pytest.mark.anyio
+async def test_invalid_selectors_are_rejected_at_registration(client):
+    response = await client.post("/api/v1/register", json={
+        "name": "products", "target_url": "http://shop.test/products", "selectors": {"name": "h1", "price": "span[[price"}
+    })
+    assert response.status_code == 422
+    assert "price" in response.json()["detail"]
+
+@pytest.mark.anyio
+async def test_drift_is_recorded_for_configs_with_invalid_selectors(client):
+    # Stored before registration validated selectors
+    scraper_id = await register(client)
+    scraper = await main.db_get_scraper(scraper_id)
+    scraper.config.selectors["price"] = "span[[price"
+    await main.db_create_scraper(scraper)
+
+    await ingest(client, run_payload(scraper_id, GOOD_SAMPLE))
+    await ingest(client, run_payload(scraper_id, BROKEN_SAMPLE, NEW_PAGE))
+    alerts = await listing(client, scraper_id, "alerts")
+    assert [(a["type"], a["missing_keys"]) for a in alerts] == [("SCHEMA_CHANGE", ["price"])]
+    assert [i["status"] for i in await listing(client, scraper_id, "incidents")] == ["OPEN"]
+    assert await listing(client, scraper_id, "repairs") == []
+
+def test_repairs_of_invalid_selectors_are_empty():
+    assert suggest_repairs(OLD_PAGE, NEW_PAGE, "span[[price", "price", "alert") == []
+    assert get_dom_context(OLD_PAGE, "span[[price") == "Element not found"
+    assert "span[[price" in generate_fix_prompt(OLD_PAGE, NEW_PAGE, "span[[price", "price")
+
+@pytest.mark.anyio
+async def test_batches_are_ingested_in_order_per_scraper(client, monkeypatch):
+    first, second = await register(client), await register(client)
+    known = compute_snapshot_hash(OLD_PAGE)
+    unknown = compute_snapshot_hash("<html>never uploaded</html>")
+    response = await client.post("/api/v1/ingest/batch", json={"runs": [
+        run_payload(first, GOOD_SAMPLE),
+        run_payload(second, GOOD_SAMPLE, html=None, snapshot_hash=unknown),
+        # Uploaded earlier in the same batch
+        run_payload(first, BROKEN_SAMPLE, html=None, snapshot_hash=known),
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["run_ids"]) == 3
+    # The client must resend that snapshot in full; the run is kept without it
+    assert body["missing_snapshots"] == [unknown]
+    await wait_for_analysis()
+
+    runs = await listing(client, first, "runs")
+    assert [r["id"] for r in runs] == [body["run_ids"][2], body["run_ids"][0]]
+    assert {r["snapshot_hash"] for r in runs} == {known}
+    assert [r["snapshot_hash"] for r in await listing(client, second, "runs")] == [None]
+    # Analyzed in batch order: the second run of `first` drifted from the first
+    assert [a["type"] for a in await listing(client, first, "alerts")] == ["SCHEMA_CHANGE"]
+    assert (await health(client, first))["total_runs"] == 2
+
+    monkeypatch.setattr(main, "MAX_INGEST_BATCH_SIZE", 1)
+    response = await client.post("/api/v1/ingest/batch", json={"runs": [run_payload(first, GOOD_SAMPLE)] * 2})
+    assert response.status_code == 413
+
+@pytest.mark.anyio
+async def test_snapshots_are_stored_once_by_content_hash(client):
+    scraper_id = await register(client)
+    h = compute_snapshot_hash(OLD_PAGE)
+    url = f"/api/v1/snapshots/{h}"
+    assert (await client.head(url)).status_code == 404
+    # A hash-only run for a snapshot the server doesn't have must be resent in full
+    response = await client.post("/api/v1/ingest", json=run_payload(scraper_id, GOOD_SAMPLE, html=None, snapshot_hash=h))
+    assert response.status_code == 409
+
+    await ingest(client, run_payload(scraper_id, GOOD_SAMPLE, snapshot_hash=h))
+    head = await client.head(url)
+    assert (head.status_code, head.content) == (200, b"")
+    assert (await client.get(url)).text == OLD_PAGE
+    await ingest(client, run_payload(scraper_id, GOOD_SAMPLE, html=None, snapshot_hash=h))
+    assert [r["snapshot_hash"] for r in await listing(client, scraper_id, "runs")] == [h, h]
+
+@pytest.mark.anyio
+async def test_snapshot_hashes_must_match_the_body(client):
+    scraper_id = await register(client)
+    wrong = compute_snapshot_hash(NEW_PAGE)
+    response = await client.post("/api/v1/ingest", json=run_payload(scraper_id, GOOD_SAMPLE, snapshot_hash=wrong))
+    assert response.status_code == 409
+    response = await client.post("/api/v1/ingest/batch", json={"runs": [
+        run_payload(scraper_id, GOOD_SAMPLE), run_payload(scraper_id, GOOD_SAMPLE, snapshot_hash=wrong)
+    ]})
+    assert response.status_code == 409
+    assert await listing(client, scraper_id, "runs") == []
+    assert (await client.head(f"/api/v1/snapshots/{wrong}")).status_code == 404
+
+@pytest.mark.anyio
+async def test_partial_breakage_is_detected_across_the_sample(client):
+    scraper_id = await register(client)
+    await ingest(client, run_payload(scraper_id, GOOD_SAMPLE))
+    # Only the second item lost its price: item [0] alone looks unchanged
+    await ingest(client, run_payload(scraper_id, [GOOD_SAMPLE[0], BROKEN_SAMPLE[1]], NEW_PAGE))
+    alerts = await listing(client, scraper_id, "alerts")
+    assert [(a["type"], a["missing_keys"]) for a in alerts] == [("SCHEMA_CHANGE", ["price"])]
+    assert {r["field_name"] for r in await listing(client, scraper_id, "repairs")} == {"price"}
+
+@pytest.mark.anyio
+async def test_only_fields_that_replay_empty_are_repaired(client):
+    scraper_id = await register(client)
+    await ingest(client, run_payload(scraper_id, GOOD_SAMPLE))
+    # Nothing was extracted, but on the new page only the price selector finds nothing
+    await ingest(client, run_payload(scraper_id, [], NEW_PAGE))
+    alerts = await listing(client, scraper_id, "alerts")
+    assert [a["type"] for a in alerts] == ["NULL_SPIKE"]
+    repairs = await listing(client, scraper_id, "repairs")
+    assert repairs and {r["field_name"] for r in repairs} == {"price"}
+    assert repairs[0]["suggested_selector"].endswith(".price-v2")
+
+@pytest.mark.anyio
+async def test_only_runs_with_snapshots_are_memoized_as_unrepairable(client, monkeypatch):
+    monkeypatch.setattr(main, "unrepairable", LRUCache(16))
+    scraper_id = await register(client)
+    # The new page has no content left to repair to
+    bare_page = "<html><body><p>Down for maintenance</p></body></html>"
+    alert = Alert(
+        id="a", scraper_id=scraper_id, run_id="new", type=DriftType.SCHEMA_CHANGE, message="m",
+        severity="HIGH", timestamp=datetime.now(), missing_keys=["price"]
+    )
+
+    def run(run_id: str, html: str, with_hash: bool) -> ScraperRun:
+        return ScraperRun(
+            id=run_id, scraper_id=scraper_id, timestamp=datetime.now(), status=RunStatus.SUCCESS, duration_ms=1.0,
+            items_extracted=1, html_snapshot=html, snapshot_hash=compute_snapshot_hash(html) if with_hash else None
+        )
+
+    results = main.AnalysisResults()
+    await main.trigger_repair(run("new", bare_page, False), run("old", OLD_PAGE, False), alert, results)
+    assert (results.repairs, len(main.unrepairable)) == ([], 0)
+    await main.trigger_repair(run("new", bare_page, True), run("old", OLD_PAGE, True), alert, results)
+    assert (results.repairs, len(main.unrepairable)) == ([], 1)
@@ -0,0 +1,30 @@
+from backend.app import dom, heuristics
+from backend.app.repair import suggest_repairs
+from benchmarks.fleet import SELECTORS, SyntheticFleet
+
+def test_selectors_broken_between_the_same_pages_share_one_diff(monkeypatch):
+    built = []
+
+    class TextIndex(dom.TextIndex):
+        def __init__(self, soup):
+            built.append(("text", id(soup)))
+            super().__init__(soup)
+
+    class CandidateIndex(heuristics.CandidateIndex):
+        def __init__(self, soup):
+            built.append(("candidates", id(soup)))
+            super().__init__(soup)
+
+    monkeypatch.setattr(dom, "TextIndex", TextIndex)
+    monkeypatch.setattr(heuristics, "CandidateIndex", CandidateIndex)
+
+    fleet = SyntheticFleet(scrapers=1, snapshot_bytes=4_000, drift_rate=0.0)
+    scraper = fleet.scrapers[0]
+    old_html = fleet.page(scraper)
+    new_html = fleet.page(scraper, {**scraper.classes(), "price": "price-v1", "title": "title-v1"})
+    for field in ("price", "title"):
+        suggestions = suggest_repairs(old_html, new_html, SELECTORS[field], field, "alert")
+        assert suggestions[0].suggested_selector.endswith(f".{field}-v1")
+
+    old_soup, new_soup = id(dom.parse_html(old_html)), id(dom.parse_html(new_html))
+    assert sorted(built) == sorted([("text", new_soup), ("candidates", old_soup), ("candidates", new_soup)])
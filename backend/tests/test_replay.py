@@ -0,0 +1,70 @@
+import pytest
+
+from backend.app import replay
+from backend.app.cache import LRUCache
+from backend.app.replay import compile_selectors, invalid_selectors, replay_snapshot
+
+from .conftest import BROKEN_SAMPLE, GOOD_SAMPLE, NEW_PAGE, OLD_PAGE, register, run_payload, wait_for_analysis
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = LRUCache(2)
+    monkeypatch.setattr(replay, "_compiled_cache", cache)
+    return cache
+
+def test_configs_are_compiled_once(cache):
+    compiled = compile_selectors({"name": "h1", "price": ".price"})
+    # The same pairs in another order are the same config
+    assert compile_selectors({"price": ".price", "name": "h1"}) is compiled
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_least_recently_used_configs_are_evicted(cache):
+    first = compile_selectors({"price": ".price"})
+    second = compile_selectors({"price": ".price-v2"})
+    assert compile_selectors({"price": ".price"}) is first
+    compile_selectors({"price": ".cost"})
+    assert len(cache) == 2
+    assert compile_selectors({"price": ".price"}) is first
+    assert compile_selectors({"price": ".price-v2"}) is not second
+
+def test_invalid_selectors_match_nothing(cache):
+    assert invalid_selectors({"name": "h1", "price": "span[[price", "sku": ":nope"}) == ["price", "sku"]
+    fields = replay_snapshot(OLD_PAGE, {"name": "h1", "price": "span[[price"})
+    assert fields["price"] == {"matches": 0, "values": 0, "valid": False}
+    assert fields["name"]["valid"] and fields["name"]["values"] > 0
+
+@pytest.mark.anyio
+async def test_replay_reports_per_field_hits(client):
+    before, after, shared, unsampled = [await register(client) for _ in range(4)]
+    await client.post("/api/v1/ingest", json=run_payload(before, GOOD_SAMPLE))
+    for scraper_id in (after, shared):
+        await client.post("/api/v1/ingest", json=run_payload(scraper_id, BROKEN_SAMPLE, NEW_PAGE))
+    await client.post("/api/v1/ingest", json=run_payload(unsampled, GOOD_SAMPLE, html=None))
+    await wait_for_analysis()
+
+    response = await client.post("/api/v1/replay", json={"scraper_ids": [before, after, shared, unsampled, "missing"]})
+    assert response.status_code == 200
+    body = response.json()
+    results = {r["scraper_id"]: r for r in body["results"]}
+    assert results[before]["broken_fields"] == []
+    assert results[after]["broken_fields"] == results[shared]["broken_fields"] == ["price"]
+    assert results[after]["snapshot_hash"] == results[shared]["snapshot_hash"]
+    assert (body["without_snapshot"], body["unknown_scrapers"]) == ([unsampled], ["missing"])
+
+@pytest.mark.anyio
+async def test_replay_validates_candidate_selectors(client):
+    scraper_id = await register(client)
+    await client.post("/api/v1/ingest", json=run_payload(scraper_id, BROKEN_SAMPLE, NEW_PAGE))
+    await wait_for_analysis()
+
+    response = await client.post("/api/v1/replay", json={
+        "scraper_ids": [scraper_id], "selectors": {"name": "h1", "price": ".price-v2", "sku": "span[[sku"}
+    })
+    assert response.status_code == 200
+    result = response.json()["results"][0]
+    assert result["fields"]["price"]["values"] > 0
+    assert result["fields"]["sku"] == {"matches": 0, "values": 0, "valid": False}
+    assert result["broken_fields"] == ["sku"]
+
+    # Without scraper_ids, every registered scraper is replayed
+    assert [r["scraper_id"] for r in (await client.post("/api/v1/replay", json={})).json()["results"]] == [scraper_id]
@@ -0,0 +1,98 @@
+import re
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.app import main, retention
+from backend.app.rollups import accumulate, bucket_start, merge, to_bucket
+from backend.app.telemetry import CONTENT_TYPE
+
+from .conftest import GOOD_SAMPLE, register, run_payload, wait_for_analysis
+
+def run(timestamp: str, status: str = "SUCCESS", duration_ms: float = 100.0, items: int = 2):
+    return {
+        "scraper_id": "s", "timestamp": timestamp, "status": status,
+        "duration_ms": duration_ms, "items_extracted": items
+    }
+
+def test_bucket_start():
+    timestamp = datetime(2026, 1, 1, 10, 59, 59, 999)
+    assert bucket_start(timestamp, "minute") == datetime(2026, 1, 1, 10, 59)
+    assert bucket_start(timestamp, "hour") == datetime(2026, 1, 1, 10)
+    assert bucket_start(timestamp, "day") == datetime(2026, 1, 1)
+    with pytest.raises(ValueError):
+        bucket_start(timestamp, "week")
+
+def test_runs_accumulate_across_hour_and_day_boundaries():
+    increments = accumulate([
+        run("2026-01-01T22:59:59", duration_ms=50.0),
+        run("2026-01-01T23:00:00", status="FAILURE", duration_ms=150.0, items=0),
+        run("2026-01-01T23:59:59.500000", duration_ms=300.0),
+        run("2026-01-02T00:00:00", duration_ms=10.0),
+    ])
+    runs = {key[1:]: inc["runs"] for key, inc in increments.items()}
+    assert {bucket: n for (resolution, bucket), n in runs.items() if resolution == "hour"} == {
+        "2026-01-01T22:00:00": 1, "2026-01-01T23:00:00": 2, "2026-01-02T00:00:00": 1
+    }
+    assert {bucket: n for (resolution, bucket), n in runs.items() if resolution == "day"} == {
+        "2026-01-01T00:00:00": 3, "2026-01-02T00:00:00": 1
+    }
+    assert sum(n for (resolution, _), n in runs.items() if resolution == "minute") == 4
+
+    day = increments[("s", "day", "2026-01-01T00:00:00")]
+    assert (day["successes"], day["failures"], day["items_sum"]) == (2, 1, 4)
+    assert (day["duration_ms_sum"], day["duration_ms_min"], day["duration_ms_max"]) == (500.0, 50.0, 300.0)
+
+def test_merged_increments_equal_one_accumulation():
+    runs = [run("2026-01-01T10:05:00", duration_ms=80.0), run("2026-01-01T10:45:00", "FAILURE", 200.0, 0)]
+    key = ("s", "hour", "2026-01-01T10:00:00")
+    doc = {"bucket": key[2]}
+    for one in runs:
+        merge(doc, accumulate([one])[key])
+    assert doc == {"bucket": key[2], **accumulate(runs)[key]}
+
+    bucket = to_bucket(doc)
+    assert (bucket.runs, bucket.success_rate, bucket.avg_duration_ms, bucket.avg_items) == (2, 0.5, 140.0, 1.0)
+    assert (bucket.min_duration_ms, bucket.max_duration_ms) == (80.0, 200.0)
+
+@pytest.mark.anyio
+async def test_rollups_outlive_expired_runs(client, monkeypatch):
+    monkeypatch.setattr(retention, "RUN_RETENTION_DAYS", 30)
+    scraper_id = await register(client)
+    await client.post("/api/v1/ingest", json=run_payload(scraper_id, [], status="FAILURE"))
+    for _ in range(2):
+        await client.post("/api/v1/ingest", json=run_payload(scraper_id, GOOD_SAMPLE))
+    await wait_for_analysis()
+
+    deleted = await retention.compact(datetime.now() + timedelta(days=365))
+    assert deleted["runs"] == 2
+    runs = (await client.get(f"/api/v1/scrapers/{scraper_id}/runs")).json()
+    assert len(runs) == 1
+    days = (await client.get(f"/api/v1/scrapers/{scraper_id}/metrics", params={"resolution": "day"})).json()
+    assert [(d["runs"], d["successes"], d["failures"]) for d in days] == [(3, 2, 1)]
+    # Finer resolutions have a retention of their own
+    assert (await client.get(f"/api/v1/scrapers/{scraper_id}/metrics", params={"resolution": "hour"})).json() == []
+
+SAMPLE_LINE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_][a-zA-Z0-9_]*="[^"]*",?)*\})? \S+$')
+
+@pytest.mark.anyio
+async def test_metrics_endpoint_exports_per_scraper_gauges(client, monkeypatch):
+    scraper_id = await register(client)
+    await client.post("/api/v1/ingest", json=run_payload(scraper_id, GOOD_SAMPLE))
+    await wait_for_analysis()
+
+    response = await client.get("/metrics")
+    assert response.headers["content-type"] == CONTENT_TYPE
+    lines = response.text.strip().split("\n")
+    for line in lines:
+        assert line.startswith("# HELP ") or line.startswith("# TYPE ") or SAMPLE_LINE.match(line), line
+    assert "# TYPE scraper_sre_scraper_open_incidents gauge" in lines
+    assert f'scraper_sre_scraper_open_incidents{{scraper_id="{scraper_id}"}} 0' in lines
+    assert f'scraper_sre_scraper_success_rate{{scraper_id="{scraper_id}",window="last_10"}} 1' in lines
+    assert any(line.startswith(f'scraper_sre_scraper_last_run_timestamp_seconds{{scraper_id="{scraper_id}"}}') for line in lines)
+
+    # Gauges of scrapers that are gone aren't exported again
+    async def no_scrapers():
+        return []
+    monkeypatch.setattr(main, "db_get_fleet", no_scrapers)
+    assert scraper_id not in (await client.get("/metrics")).text
@@ -0,0 +1,156 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import pytest
+
+from backend.app.models import Scraper, ScraperConfig
+from backend.app.scheduler import Fetcher, HostLimiter, Scheduler
+from backend.app.telemetry import SCHEDULED_SCRAPES
+from demo.stub_server import StubSite, start_stub_server
+
+from .conftest import SELECTORS
+
+@pytest.fixture
+def serve():
+    """Starts stub sites on free ports; returns their base URL and the site."""
+    servers = []
+
+    def serve(site=None):
+        server, site = start_stub_server(site=site)
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}", site
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def make_scraper(url: str, scraper_id: str = "s1") -> Scraper:
+    config = ScraperConfig(name=scraper_id, target_url=url, selectors=SELECTORS, schedule_interval=60)
+    return Scraper(id=scraper_id, config=config, created_at=datetime.now())
+
+@asynccontextmanager
+async def scheduler_with(delay: float = 0, **fetcher_options):
+    ingested = []
+
+    async def ingest(payload):
+        ingested.append(payload)
+
+    async def load_scrapers():
+        return []
+
+    scheduler = Scheduler(load_scrapers, ingest, Fetcher(delay=delay, **fetcher_options))
+    await scheduler.fetcher.open()
+    try:
+        yield scheduler, ingested
+    finally:
+        await scheduler.fetcher.close()
+
+def scrapes(result: str) -> float:
+    return SCHEDULED_SCRAPES.labels(result).value
+
+@pytest.mark.anyio
+async def test_host_limiter_caps_requests_in_flight():
+    limiter = HostLimiter(concurrency=2, delay=0)
+    in_flight = peak = 0
+
+    async def request():
+        nonlocal in_flight, peak
+        async with limiter:
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.02)
+            in_flight -= 1
+
+    await asyncio.gather(*(request() for _ in range(6)))
+    assert peak == 2
+
+@pytest.mark.anyio
+async def test_requests_to_one_host_are_spaced_out(serve, monkeypatch):
+    url, site = serve()
+    delay = 0.2
+    started = {}
+    async with scheduler_with(delay=delay) as (scheduler, ingested):
+        stream = scheduler.fetcher.client.stream
+
+        def timed_stream(method, url, **kwargs):
+            started.setdefault(str(url).split("/")[2], []).append(time.monotonic())
+            return stream(method, url, **kwargs)
+
+        monkeypatch.setattr(scheduler.fetcher.client, "stream", timed_stream)
+        scrapers = [make_scraper(f"{url}/products", f"s{i}") for i in range(3)]
+        # The same site under another host name is not held back by the first
+        other = url.replace("127.0.0.1", "localhost")
+        scrapers.append(make_scraper(f"{other}/products", "other"))
+        await asyncio.gather(*(scheduler.scrape(scraper) for scraper in scrapers))
+
+    assert site.stats["full"] == len(ingested) == 4
+    starts = started[url.split("/")[2]]
+    assert all(later - earlier >= delay * 0.9 for earlier, later in zip(starts, starts[1:]))
+    assert started[other.split("/")[2]][0] < starts[1]
+
+@pytest.mark.anyio
+async def test_unmodified_pages_cost_a_304_and_are_not_ingested(serve):
+    url, site = serve()
+    scraper = make_scraper(f"{url}/products")
+    not_modified = scrapes("not_modified")
+    async with scheduler_with() as (scheduler, ingested):
+        await scheduler.scrape(scraper)
+        await scheduler.scrape(scraper)
+        assert site.stats == {"requests": 2, "full": 1, "not_modified": 1}
+        assert scrapes("not_modified") == not_modified + 1
+        assert [p["status"] for p in ingested] == ["SUCCESS"]
+        assert ingested[0]["extracted_data_sample"][0] == {"name": "Cool Widget", "price": "$19.99"}
+
+        # The site changes: the new page is downloaded, extracted and ingested
+        site.set_version("/products", 2, time.time())
+        await scheduler.scrape(scraper)
+        assert site.stats["full"] == 2
+        assert [p["status"] for p in ingested] == ["SUCCESS", "SUCCESS"]
+        assert ingested[1]["extracted_data_sample"][0] == {"name": "Cool Widget", "price": None}
+
+@pytest.mark.anyio
+async def test_last_modified_alone_revalidates(serve):
+    url, site = serve()
+    async with scheduler_with() as (scheduler, _):
+        first = await scheduler.fetcher.fetch(f"{url}/products")
+        assert first.status_code == 200 and first.last_modified
+        again = await scheduler.fetcher.fetch(f"{url}/products", last_modified=first.last_modified)
+        assert again.not_modified and again.html is None
+        # Last-Modified has whole seconds: change the page a second later
+        site.set_version("/products", 2, time.time() + 1)
+        changed = await scheduler.fetcher.fetch(f"{url}/products", last_modified=first.last_modified)
+        assert changed.status_code == 200 and "price-v2" in changed.html
+
+@pytest.mark.anyio
+async def test_same_content_is_not_ingested_again(serve):
+    # Without validators every fetch is a full download; the content hash
+    # still spares extraction and ingest
+    url, site = serve(StubSite(validators=False))
+    scraper = make_scraper(f"{url}/products")
+    unchanged = scrapes("unchanged")
+    async with scheduler_with() as (scheduler, ingested):
+        await scheduler.scrape(scraper)
+        await scheduler.scrape(scraper)
+        assert site.stats == {"requests": 2, "full": 2, "not_modified": 0}
+        assert scrapes("unchanged") == unchanged + 1
+        assert len(ingested) == 1
+
+        site.set_version("/products", 2, time.time())
+        await scheduler.scrape(scraper)
+        assert len(ingested) == 2
+
+@pytest.mark.anyio
+async def test_oversized_pages_are_recorded_as_failed_runs(serve):
+    url, site = serve()
+    scraper = make_scraper(f"{url}/products")
+    async with scheduler_with(max_page_bytes=100) as (scheduler, ingested):
+        await scheduler.scrape(scraper)
+        await scheduler.scrape(scraper)
+    # Nothing was remembered from the failed fetch, so it isn't revalidated
+    assert site.stats["not_modified"] == 0
+    assert [(p["status"], p["items_extracted"]) for p in ingested] == [("FAILURE", 0)] * 2
+    assert ingested[0]["error_message"] == "Page larger than 100 bytes"
+    assert scraper.id not in scheduler.validators
@@ -0,0 +1,67 @@
+import uuid
+from datetime import datetime
+
+from backend.app.models import FieldSummary, RunStatus, ScraperRun
+from backend.app.stats import MIN_RUNS_FOR_SCORING, RollingStats, coerce_number, summarize_sample
+
+def make_run(sample, field_stats=None, items=10):
+    return ScraperRun(
+        id=str(uuid.uuid4()),
+        scraper_id="s1",
+        timestamp=datetime.utcnow(),
+        status=RunStatus.SUCCESS,
+        duration_ms=100.0,
+        items_extracted=items,
+        extracted_data_sample=sample,
+        field_stats=field_stats
+    )
+
+def test_coerce_number():
+    assert coerce_number("$1,299.00") == 1299.0
+    assert coerce_number("4.5 stars") == 4.5
+    assert coerce_number(3) == 3.0
+    assert coerce_number(True) is None
+    assert coerce_number("n/a") is None
+    assert coerce_number(float("nan")) is None
+
+def test_summary_uses_client_totals():
+    totals = {"price": FieldSummary(count=100, nulls=5, numeric_count=95, numeric_sum=950.0)}
+    summary = summarize_sample([{"price": "$10"}], totals)
+    assert summary["price"]["count"] == 100
+    assert summary["price"]["number_count"] == 95
+    # The sample still feeds the sketches
+    assert summary["price"]["numbers"] == [10.0]
+
+def test_mean_shift_alert():
+    stats = RollingStats("s1")
+    for price in [10, 11, 10, 9, 10, 11, 10, 9]:
+        stats.update(make_run([{"price": f"${price}"}]))
+    alerts = stats.score(make_run([{"price": "$500"}]))
+    assert len(alerts) == 1
+    assert "historical p50=" in alerts[0].message
+
+def test_no_scoring_before_enough_runs():
+    stats = RollingStats("s1")
+    for _ in range(MIN_RUNS_FOR_SCORING - 1):
+        stats.update(make_run([{"price": "$10"}]))
+    assert stats.score(make_run([{"price": "$500"}])) == []
+
+def test_mean_shift_without_sampled_numbers():
+    # Numeric totals from the client, but no number in any sample: the
+    # quantile sketches stay empty and the alert goes without them
+    stats = RollingStats("s1")
+    for _ in range(MIN_RUNS_FOR_SCORING + 1):
+        totals = {"price": FieldSummary(count=10, numeric_count=10, numeric_sum=100.0)}
+        stats.update(make_run([{"price": "n/a"}], totals))
+    totals = {"price": FieldSummary(count=10, numeric_count=10, numeric_sum=5000.0)}
+    alerts = stats.score(make_run([{"price": "n/a"}], totals))
+    assert len(alerts) == 1
+    assert "shifted" in alerts[0].message
+    assert "historical" not in alerts[0].message
+
+def test_state_round_trips():
+    stats = RollingStats("s1")
+    for price in [10, 12, 11]:
+        stats.update(make_run([{"price": f"${price}", "name": "Widget"}]))
+    restored = RollingStats("s1", stats.to_doc())
+    assert restored.to_doc() == stats.to_doc()
@@ -0,0 +1,176 @@
+import asyncio
+
+import pytest
+
+from backend.app import analysis_queue
+from backend.app.analysis_queue import Job, SQLiteJobQueue
+from backend.app.rollups import accumulate
+from backend.app.sqlite_store import SQLiteBackend
+from backend.app.storage import create_storage
+
+# The storage contract, run against every backend that needs no server
+
+@pytest.fixture(params=["mock://", "sqlite:///"])
+async def storage(request, tmp_path):
+    url = request.param + (str(tmp_path / "data.db") if request.param == "sqlite:///" else "")
+    backend = create_storage(url, "test")
+    await backend.open()
+    yield backend
+    await backend.close()
+
+def run(run_id: str, timestamp: str, scraper_id: str = "s", status: str = "SUCCESS", snapshot_hash=None, **fields):
+    return {
+        "id": run_id, "scraper_id": scraper_id, "timestamp": f"2026-01-01T{timestamp}", "status": status,
+        "duration_ms": 100.0, "items_extracted": 2, "error_message": None, "snapshot_hash": snapshot_hash,
+        "extracted_data_sample": [{"price": "$1"}], **fields
+    }
+
+def ids(docs):
+    return [doc["id"] for doc in docs]
+
+@pytest.mark.anyio
+async def test_scrapers(storage):
+    await storage.add_scraper({"id": "a", "config": {"name": "a"}})
+    await storage.add_scraper({"id": "b", "config": {"name": "b"}})
+    assert await storage.count_scrapers() == 2
+    assert (await storage.get_scraper("a"))["config"] == {"name": "a"}
+    assert await storage.get_scraper("missing") is None
+    assert sorted(ids(await storage.all_scrapers())) == ["a", "b"]
+
+@pytest.mark.anyio
+async def test_run_pages_are_keyset_ordered(storage):
+    # r2 and r3 share a timestamp: the id breaks the tie
+    await storage.add_runs([
+        run("r1", "10:00:00"), run("r3", "11:00:00"), run("r2", "11:00:00", status="FAILURE"), run("r4", "12:00:00")
+    ])
+    await storage.add_runs([run("other", "11:30:00", scraper_id="t")])
+    assert ids(await storage.page_runs("s", 10)) == ["r4", "r3", "r2", "r1"]
+    assert ids(await storage.page_runs("s", 2)) == ["r4", "r3"]
+    assert ids(await storage.page_runs("s", 2, before=("2026-01-01T11:00:00", "r3"))) == ["r2", "r1"]
+    assert ids(await storage.page_runs("s", 10, since="2026-01-01T11:00:00", until="2026-01-01T12:00:00")) == ["r3", "r2"]
+    assert ids(await storage.page_runs("s", 10, status="FAILURE")) == ["r2"]
+    assert ids(await storage.latest_runs("s", 2)) == ["r4", "r3"]
+
+    assert ids(await storage.get_runs(["r2", "missing", "r1"])) == ["r2", "r1"]
+    assert (await storage.get_run("r1"))["extracted_data_sample"] == [{"price": "$1"}]
+    assert (await storage.last_successful_run("s"))["id"] == "r4"
+    assert (await storage.last_successful_run("s", before=("2026-01-01T11:00:00", "r3")))["id"] == "r1"
+
+@pytest.mark.anyio
+async def test_expiry_keeps_baselines_and_shared_snapshots(storage):
+    await storage.add_runs([
+        run("r1", "10:00:00", snapshot_hash="h1"),
+        run("r2", "11:00:00", snapshot_hash="h2"),
+        run("r3", "12:00:00", status="FAILURE", snapshot_hash="h2"),
+        run("r4", "13:00:00", snapshot_hash="h3"),
+    ])
+    assert await storage.runs_expired_before() is None
+    deleted, released = await storage.expire_runs("2026-01-01T12:00:00")
+    # h2 is still referenced by r3
+    assert (deleted, released) == (2, {"h1"})
+    assert await storage.runs_expired_before() == "2026-01-01T12:00:00"
+
+    # r4 is the baseline: kept, however old
+    deleted, released = await storage.expire_runs("2026-01-02T00:00:00")
+    assert (deleted, released) == (1, {"h2"})
+    assert ids(await storage.page_runs("s", 10)) == ["r4"]
+    assert (await storage.last_successful_run("s"))["id"] == "r4"
+
+    # Deleting nothing leaves the marker alone
+    assert await storage.expire_runs("2026-01-03T00:00:00") == (0, set())
+    assert await storage.runs_expired_before() == "2026-01-02T00:00:00"
+
+@pytest.mark.anyio
+async def test_alerts_incidents_and_repairs(storage):
+    for i, severity in enumerate(["HIGH", "LOW", "HIGH"]):
+        await storage.add_alert({"id": f"a{i}", "scraper_id": "s", "timestamp": f"2026-01-01T1{i}:00:00", "severity": severity})
+    assert ids(await storage.page_alerts("s", 10)) == ["a2", "a1", "a0"]
+    assert ids(await storage.page_alerts("s", 10, severity="HIGH")) == ["a2", "a0"]
+    assert ids(await storage.page_alerts("s", 1, before=("2026-01-01T12:00:00", "a2"))) == ["a1"]
+
+    incident = {"id": "i1", "scraper_id": "s", "status": "OPEN", "last_seen": "2026-01-01T10:00:00", "count": 1}
+    await storage.save_incidents([incident, {**incident, "id": "i2", "last_seen": "2026-01-01T11:00:00"}])
+    await storage.save_incidents([{**incident, "status": "RESOLVED", "count": 2}])
+    assert ids(await storage.scraper_incidents("s")) == ["i2", "i1"]
+    assert ids(await storage.scraper_incidents("s", status="OPEN")) == ["i2"]
+    assert (await storage.scraper_incidents("s", status="RESOLVED"))[0]["count"] == 2
+    assert ids(await storage.scraper_incidents("s", limit=1)) == ["i2"]
+
+    repair = {
+        "id": "p1", "scraper_id": "s", "timestamp": "2026-01-01T10:00:00",
+        "old_selector": ".price", "old_snapshot_hash": "h1", "new_snapshot_hash": "h2"
+    }
+    await storage.add_repairs([repair, {**repair, "id": "p2", "timestamp": "2026-01-01T11:00:00", "old_selector": "h1"}])
+    assert ids(await storage.find_repairs((".price", "h1", "h2"))) == ["p1"]
+    assert await storage.find_repairs((".price", "h1", "h3")) == []
+    assert ids(await storage.page_repairs("s", 10)) == ["p2", "p1"]
+    assert ids(await storage.page_repairs("s", 10, until="2026-01-01T11:00:00")) == ["p1"]
+
+@pytest.mark.anyio
+async def test_rollups_accumulate_and_expire(storage):
+    await storage.add_rollups(accumulate([run("r1", "10:05:00"), run("r2", "10:59:00", duration_ms=300.0)]))
+    await storage.add_rollups(accumulate([run("r3", "11:00:00", status="FAILURE", duration_ms=50.0, items_extracted=0)]))
+    hours = await storage.page_rollups("s", "hour", 10)
+    assert [(h["bucket"], h["runs"], h["failures"]) for h in hours] == [
+        ("2026-01-01T10:00:00", 2, 0), ("2026-01-01T11:00:00", 1, 1)
+    ]
+    assert (hours[0]["duration_ms_min"], hours[0]["duration_ms_max"], hours[0]["duration_ms_sum"]) == (100.0, 300.0, 400.0)
+    day = (await storage.page_rollups("s", "day", 10))[0]
+    assert (day["runs"], day["successes"], day["items_sum"], day["duration_ms_min"]) == (3, 2, 4, 50.0)
+    assert [h["bucket"] for h in await storage.page_rollups("s", "hour", 1)] == ["2026-01-01T11:00:00"]
+
+    assert await storage.expire_rollups("hour", "2026-01-01T11:00:00") == 1
+    assert [h["bucket"] for h in await storage.page_rollups("s", "hour", 10)] == ["2026-01-01T11:00:00"]
+    assert len(await storage.page_rollups("s", "day", 10)) == 1
+
+@pytest.mark.anyio
+async def test_health_and_stats(storage):
+    assert await storage.get_health("s") is None
+    health = {"scraper_id": "s", "name": "s", "target_url": "u", "created_at": "2026-01-01T00:00:00", "version": 1}
+    await storage.save_health(health)
+    await storage.save_health({**health, "version": 2})
+    assert (await storage.get_health("s"))["version"] == 2
+    assert [h["version"] for h in await storage.all_health()] == [2]
+    await storage.save_stats({"scraper_id": "s", "count": 3})
+    assert (await storage.get_stats("s"))["count"] == 3
+
+@pytest.mark.anyio
+async def test_sqlite_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / "data.db")
+    first, second = SQLiteBackend(path), SQLiteBackend(path)
+    await first.open()
+    await second.open()
+    try:
+        await first.add_runs([run("r1", "10:00:00", snapshot_hash="h1"), run("r2", "11:00:00")])
+        assert ids(await second.page_runs("s", 10)) == ["r2", "r1"]
+        assert await second.expire_runs("2026-01-01T11:00:00") == (1, {"h1"})
+        assert await first.runs_expired_before() == "2026-01-01T11:00:00"
+    finally:
+        await first.close()
+        await second.close()
+
+@pytest.mark.anyio
+async def test_sqlite_queue_leases_jobs_across_connections(tmp_path, monkeypatch):
+    monkeypatch.setattr(analysis_queue, "ANALYSIS_JOB_LEASE", 0.2)
+    path = str(tmp_path / "queue.db")
+    first, second = SQLiteJobQueue(path, 1), SQLiteJobQueue(path, 1)
+    await first.open()
+    await first.put([Job("a", ["a1"]), Job("a", ["a2"]), Job("b", ["b1"])])
+    await second.open()
+    try:
+        assert second.pending == 3
+        claimed = await first._claim(0)
+        assert claimed.run_ids == ["a1"]
+        # Scraper a has a leased job: the other connection skips to b, keeping a in order
+        assert (await second._claim(0)).run_ids == ["b1"]
+        assert await second._claim(0) is None
+
+        # The first holder died: once its lease expires the job is delivered again
+        await asyncio.sleep(0.3)
+        redelivered = await second._claim(0)
+        assert (redelivered.id, redelivered.run_ids) == (claimed.id, ["a1"])
+        await second.ack(redelivered)
+        assert (await first._claim(0)).run_ids == ["a2"]
+    finally:
+        await first.close()
+        await second.close()
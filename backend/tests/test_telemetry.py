@@ -0,0 +1,38 @@
+import pytest
+
+from backend.app import analysis_queue
+from backend.app.repair import get_dom_context
+from backend.app.telemetry import OPERATION_DURATION, REGISTRY, timed
+
+from .conftest import OLD_PAGE
+
+def operation_count(operation: str) -> int:
+    return sum(OPERATION_DURATION.labels(operation).counts)
+
+def test_timed_records_calls_and_errors():
+    @timed("test_operation")
+    def operation(fail: bool):
+        if fail:
+            raise ValueError("boom")
+
+    operation(False)
+    with pytest.raises(ValueError):
+        operation(True)
+    assert operation_count("test_operation") == 2
+    text = REGISTRY.render()
+    assert 'scraper_sre_operation_errors_total{operation="test_operation"} 1' in text
+    assert 'scraper_sre_operation_duration_seconds_count{operation="test_operation"} 2' in text
+
+@pytest.mark.anyio
+async def test_timings_from_pool_processes_reach_the_parent(monkeypatch):
+    monkeypatch.setattr(analysis_queue, "REPAIR_PROCESSES", 1)
+    before = operation_count("get_dom_context")
+    try:
+        context = await analysis_queue.run_cpu_bound(get_dom_context, OLD_PAGE, ".price")
+        with pytest.raises(Exception):
+            await analysis_queue.run_cpu_bound(get_dom_context, None, ".price")
+    finally:
+        analysis_queue.shutdown_repair_pool()
+    assert 'class="price"' in context
+    assert operation_count("get_dom_context") == before + 2
+    assert 'scraper_sre_operation_errors_total{operation="get_dom_context"} 1' in REGISTRY.render()
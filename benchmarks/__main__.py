@@ -0,0 +1,162 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+# Offline benchmark suite. Run from the repository root:
+#
+#   python -m benchmarks --output results.json
+#   python -m benchmarks.compare baseline.json results.json
+#
+# The app runs in-process. --store picks the storage engine: the in-memory
+# mock store, SQLite in a temporary directory, mongomock_motor as a Mongo
+# stand-in (if installed), or a real Mongo at STORAGE_URL / MONGODB_URL (its
+# scraper_sre_benchmark database is dropped first).
+
+SCENARIOS = ("ingest", "get_runs", "analyze", "repair", "cold_start")
+BENCHMARK_DB = "scraper_sre_benchmark"
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Scraper SRE benchmarks")
+    parser.add_argument("--scenario", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--store", choices=("mock", "sqlite", "mongomock", "mongo"), default="mock")
+    parser.add_argument("--output", help="write results here instead of stdout")
+    parser.add_argument("--seed", type=int, default=42)
+    fleet = parser.add_argument_group("synthetic fleet")
+    fleet.add_argument("--scrapers", type=int, default=20)
+    fleet.add_argument("--snapshot-kb", type=float, default=20, help="approximate HTML snapshot size")
+    fleet.add_argument("--drift-rate", type=float, default=0.05, help="per-run probability of a layout change")
+    fleet.add_argument("--failure-rate", type=float, default=0.02)
+    ingest = parser.add_argument_group("ingest")
+    ingest.add_argument("--runs", type=int, default=2000)
+    ingest.add_argument("--concurrency", type=int, default=16)
+    ingest.add_argument("--batch-size", type=int, default=100)
+    history = parser.add_argument_group("get_runs / analyze")
+    history.add_argument("--depths", type=int, nargs="+", default=[10, 100, 1000, 10000], help="runs of history")
+    history.add_argument("--samples", type=int, default=50, help="analyze_run calls per depth")
+    history.add_argument("--repeat", type=int, default=50, help="reads per depth")
+    repair = parser.add_argument_group("repair")
+    repair.add_argument("--pairs", type=int, default=20, help="(old, new) snapshot pairs to repair")
+    cold = parser.add_argument_group("cold_start")
+    cold.add_argument("--cold-starts", type=int, default=5, help="fresh processes to time")
+    return parser.parse_args(argv)
+
+def configure_environment(args: argparse.Namespace):
+    # Must happen before the app is imported: it reads its settings at import time
+    if args.store == "mock":
+        os.environ["STORAGE_URL"] = "mock://"
+    elif args.store == "sqlite":
+        os.environ["STORAGE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='scraper-sre-bench-')}/bench.db"
+    elif args.store == "mongomock":
+        os.environ["STORAGE_URL"] = "mongodb://mongomock"
+        # GridFS needs a real server; keep snapshots on local disk instead
+        os.environ.setdefault("SNAPSHOT_STORE_PATH", tempfile.mkdtemp(prefix="scraper-sre-bench-"))
+    else:
+        url = os.environ.get("STORAGE_URL", os.environ.get("MONGODB_URL", ""))
+        if not url.startswith("mongodb"):
+            sys.exit("--store mongo needs STORAGE_URL or MONGODB_URL pointing at a MongoDB server")
+        os.environ["STORAGE_URL"] = url
+    os.environ.setdefault("RUN_RETENTION_DAYS", "0")
+
+async def prepare_store(args: argparse.Namespace):
+    from backend.app import database
+    from backend.app.storage import MongoBackend
+
+    if args.store == "mongomock":
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("--store mongomock needs the mongomock-motor package")
+        # MongoBackend creates its client on open, on lifespan startup
+        import motor.motor_asyncio
+        motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+    elif args.store == "mongo":
+        from motor.motor_asyncio import AsyncIOMotorClient
+        await AsyncIOMotorClient(database.STORAGE_URL).drop_database(BENCHMARK_DB)
+    if args.store in ("mongomock", "mongo"):
+        database.storage = MongoBackend(database.STORAGE_URL, BENCHMARK_DB)
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+async def run(args: argparse.Namespace, environment: Dict[str, Any]) -> Dict[str, Any]:
+    await prepare_store(args)
+    from . import scenarios
+    from .coldstart import cold_start_scenario
+
+    harness = scenarios.Harness({
+        "snapshot_bytes": int(args.snapshot_kb * 1024),
+        "drift_rate": args.drift_rate,
+        "failure_rate": args.failure_rate,
+        "seed": args.seed
+    })
+    results: Dict[str, Any] = {}
+    async with harness:
+        environment["storage"] = type(scenarios.database.storage).__name__
+        environment["analysis_queue"] = type(scenarios.analysis_workers.queue).__name__
+        for name in args.scenario:
+            start = time.perf_counter()
+            if name == "ingest":
+                results[name] = await scenarios.ingest_scenario(harness, args.runs, args.concurrency, args.batch_size, args.scrapers)
+            elif name == "get_runs":
+                results[name] = await scenarios.get_runs_scenario(harness, args.depths, args.repeat)
+            elif name == "analyze":
+                results[name] = await scenarios.analyze_scenario(harness, args.depths, args.samples)
+            elif name == "repair":
+                results[name] = scenarios.repair_scenario(harness, args.pairs)
+            elif name == "cold_start":
+                if args.store == "mongomock":
+                    # The mock client is patched into this process only
+                    results[name] = {"skipped": "not supported with --store mongomock"}
+                else:
+                    results[name] = cold_start_scenario(args.cold_starts)
+            print(f"{name}: done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return results
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args)
+    # Per-run analysis logging would dominate the measurements
+    logging.disable(logging.WARNING)
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    environment = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "repair_processes": os.getenv("REPAIR_PROCESSES", "2")
+    }
+    # Keep stdout for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        results = asyncio.run(run(args, environment))
+    report = {
+        "format": 1,
+        "started_at": started_at,
+        "git_commit": git_commit(),
+        "environment": environment,
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "scenario")},
+        "results": results
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
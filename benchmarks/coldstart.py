@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+from .scenarios import summarize
+
+# A cold start as a serverless platform sees it: a fresh interpreter imports
+# the ASGI app, runs its lifespan startup and answers its first requests.
+# Each sample runs in its own process, so nothing is cached between them.
+
+# Modules that should only load once the feature needing them is used
+LAZY_MODULES = ("bs4", "lxml", "soupsieve", "motor", "pymongo")
+
+PROBE = """
+import asyncio, json, sys, time
+import httpx  # the client isn't part of the app; keep it out of the timings
+
+start = time.perf_counter()
+from backend.app.main import app
+imported = time.perf_counter()
+
+async def main():
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://cold") as client:
+            (await client.get("/")).raise_for_status()
+            responded = time.perf_counter()
+            (await client.get("/api/v1/scrapers")).raise_for_status()
+            read = time.perf_counter()
+    return started, responded, read
+
+started, responded, read = asyncio.run(main())
+print(json.dumps({
+    "import": imported - start,
+    "startup": started - imported,
+    "first_response": responded - started,
+    "first_read": read - responded,
+    "time_to_first_response": responded - start,
+    "modules": len(sys.modules),
+    "lazy_modules_loaded": sorted({m.split(".")[0] for m in sys.modules} & set(LAZY_MODULES)),
+}))
+"""
+
+def probe(env: Dict[str, str]) -> Dict[str, Any]:
+    code = f"LAZY_MODULES = {LAZY_MODULES!r}\n{PROBE}"
+    completed = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def cold_start_scenario(samples: int) -> Dict[str, Any]:
+    """Import, startup and first-response times of the app in fresh processes."""
+    env = dict(os.environ)
+    # The first process may compile bytecode; a deployed function ships it precompiled
+    probe(env)
+    runs: List[Dict[str, Any]] = [probe(env) for _ in range(samples)]
+    phases = ("import", "startup", "first_response", "first_read", "time_to_first_response")
+    return {
+        **{phase: summarize([run[phase] for run in runs]) for phase in phases},
+        "modules": runs[-1]["modules"],
+        "lazy_modules_loaded": runs[-1]["lazy_modules_loaded"]
+    }
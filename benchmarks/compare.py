@@ -0,0 +1,66 @@
+import argparse
+import json
+import sys
+from typing import Any, Dict, Iterator, Tuple
+
+# Compares two benchmark reports and exits non-zero when a tracked metric
+# regressed by more than the threshold:
+#
+#   python -m benchmarks.compare baseline.json results.json --threshold 0.2
+
+# Metrics where lower is better; rates (`*_per_s`) and accuracy are higher-is-better
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "mean_ms", "total_ms")
+HIGHER_IS_BETTER = ("_per_s", "top1_accuracy")
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, float]]:
+    for key, value in results.items():
+        # Per-operation breakdowns are for diagnosis, not for gating
+        if key == "operations":
+            continue
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from flatten(value, path)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, float(value)
+
+def direction(path: str) -> int:
+    """+1 if higher is better, -1 if lower is better, 0 if the metric isn't tracked."""
+    name = path.rsplit(".", 1)[-1]
+    if name in LOWER_IS_BETTER:
+        return -1
+    if name.endswith(HIGHER_IS_BETTER):
+        return 1
+    return 0
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> int:
+    old = dict(flatten(baseline["results"]))
+    regressions = 0
+    for path, value in flatten(current["results"]):
+        sign = direction(path)
+        if not sign or path not in old or not old[path]:
+            continue
+        change = (value - old[path]) / old[path]
+        regressed = sign * change < -threshold
+        regressions += regressed
+        marker = "REGRESSED" if regressed else ""
+        print(f"{path:70} {old[path]:>12.3f} {value:>12.3f} {change:>+8.1%} {marker}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative slowdown (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    if baseline.get("config") != current.get("config"):
+        print("warning: reports were produced with different settings", file=sys.stderr)
+    regressions = compare(baseline, current, args.threshold)
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import random
+from typing import Any, Dict, Iterator, List, Optional
+
+# Synthetic scraper fleet: product-listing pages of a configurable size, and
+# the runs a scraper watching them would report. A drift renames the class of
+# one field for a few runs, which the backend sees as nulls / schema changes
+# and tries to repair, then the page reverts.
+
+FIELDS = ("title", "price", "rating", "sku")
+SELECTORS = {field: f".{field}" for field in FIELDS}
+
+PAGE_HEAD = """<html>
+<head><title>Catalog</title><style>.grid {{ display: grid; }}</style></head>
+<body>
+<header class="site-header"><nav><a href="/">Home</a> <a href="/deals">Deals</a> <a href="/help">Help</a></nav></header>
+<main id="catalog"><div class="grid">
+"""
+PAGE_TAIL = """</div></main>
+<footer class="site-footer" data-shop="{shop}"><p>Prices include VAT.</p><p>Page {page}</p></footer>
+</body>
+</html>
+"""
+ITEM = """<div class="product-card" data-sku="{sku}">
+<h2 class="{title}">Widget {n}</h2>
+<span class="{price}">${price_value}</span>
+<div class="{rating}">{rating_value}</div>
+<span class="{sku_class}">{sku}</span>
+</div>
+"""
+
+class SyntheticScraper:
+    def __init__(self, index: int, rng: random.Random):
+        self.index = index
+        self.name = f"bench-scraper-{index}"
+        self.target_url = f"https://shop-{index}.example.com/catalog"
+        # Set once registered with the backend
+        self.id: Optional[str] = None
+        self.rng = rng
+        self.runs = 0
+        # field -> (renamed class, runs left until the page reverts)
+        self.drifted: Dict[str, List[Any]] = {}
+        self.layout = 0
+
+    def classes(self) -> Dict[str, str]:
+        return {field: self.drifted[field][0] if field in self.drifted else field for field in FIELDS}
+
+class SyntheticFleet:
+    """
+    Deterministic (for a given seed) fleet of scrapers.
+    `snapshot_bytes` is the approximate size of each HTML snapshot; `drift_rate`
+    is the per-run probability that a page changes layout, breaking one field
+    for `drift_length` runs; `failure_rate` is the per-run probability of a failed run.
+    """
+
+    def __init__(
+        self,
+        scrapers: int = 10,
+        snapshot_bytes: int = 20_000,
+        drift_rate: float = 0.05,
+        drift_length: int = 5,
+        failure_rate: float = 0.02,
+        sample_size: int = 20,
+        seed: int = 42
+    ):
+        self.rng = random.Random(seed)
+        self.snapshot_bytes = snapshot_bytes
+        self.drift_rate = drift_rate
+        self.drift_length = drift_length
+        self.failure_rate = failure_rate
+        self.sample_size = sample_size
+        self.items_per_page = max(1, (snapshot_bytes - len(PAGE_HEAD) - len(PAGE_TAIL)) // self.item_size())
+        self.scrapers = [SyntheticScraper(i, random.Random(self.rng.random())) for i in range(scrapers)]
+
+    def item_size(self) -> int:
+        return len(ITEM.format(
+            sku="SKU-00000", n=0, price_value="00.00", rating_value="0.0",
+            title="title", price="price", rating="rating", sku_class="sku"
+        ))
+
+    def register_request(self, scraper: SyntheticScraper) -> Dict[str, Any]:
+        return {"name": scraper.name, "target_url": scraper.target_url, "selectors": dict(SELECTORS)}
+
+    def page(self, scraper: SyntheticScraper, classes: Optional[Dict[str, str]] = None) -> str:
+        """A snapshot of the scraper's page. Prices move on every call, so snapshots are distinct."""
+        classes = classes or scraper.classes()
+        rng = scraper.rng
+        parts = [PAGE_HEAD]
+        for n in range(self.items_per_page):
+            parts.append(ITEM.format(
+                sku=f"SKU-{scraper.index:02d}{n:03d}",
+                n=n,
+                price_value=f"{rng.uniform(5, 95):.2f}",
+                rating_value=f"{rng.uniform(1, 5):.1f}",
+                title=classes["title"],
+                price=classes["price"],
+                rating=classes["rating"],
+                sku_class=classes["sku"]
+            ))
+        parts.append(PAGE_TAIL.format(shop=scraper.id, page=scraper.runs))
+        return "".join(parts)
+
+    def drifted_page(self, scraper: SyntheticScraper, field: str) -> str:
+        """The scraper's page with `field` renamed, as a layout change would."""
+        classes = scraper.classes()
+        classes[field] = f"{field}-v{scraper.layout + 1}"
+        return self.page(scraper, classes)
+
+    def advance(self, scraper: SyntheticScraper):
+        for field in list(scraper.drifted):
+            scraper.drifted[field][1] -= 1
+            if scraper.drifted[field][1] <= 0:
+                del scraper.drifted[field]
+        if scraper.rng.random() < self.drift_rate:
+            field = scraper.rng.choice([f for f in FIELDS if f not in scraper.drifted] or list(FIELDS))
+            scraper.layout += 1
+            scraper.drifted[field] = [f"{field}-v{scraper.layout}", self.drift_length]
+
+    def sample(self, scraper: SyntheticScraper) -> List[Dict[str, Any]]:
+        """What the scraper extracts: drifted fields come back empty."""
+        rng = scraper.rng
+        sample = []
+        for n in range(min(self.sample_size, self.items_per_page)):
+            item = {
+                "title": f"Widget {n}",
+                "price": f"${rng.uniform(5, 95):.2f}",
+                "rating": round(rng.uniform(1, 5), 1),
+                "sku": f"SKU-{scraper.index:02d}{n:03d}"
+            }
+            for field in scraper.drifted:
+                item[field] = None
+            sample.append(item)
+        return sample
+
+    def next_run(self, scraper: SyntheticScraper, with_snapshot: bool = True) -> Dict[str, Any]:
+        """The ingest payload for the scraper's next run."""
+        self.advance(scraper)
+        scraper.runs += 1
+        rng = scraper.rng
+        run = {
+            "scraper_id": scraper.id,
+            "status": "SUCCESS",
+            "duration_ms": round(rng.lognormvariate(7.0, 0.3), 1),
+            "items_extracted": self.items_per_page,
+            "extracted_data_sample": self.sample(scraper),
+            "html_snapshot": self.page(scraper) if with_snapshot else None
+        }
+        if rng.random() < self.failure_rate:
+            run.update(
+                status="FAILURE",
+                items_extracted=0,
+                error_message="TimeoutError: page did not load",
+                extracted_data_sample=None
+            )
+        return run
+
+    def runs(self, count: int, with_snapshot: bool = True) -> Iterator[Dict[str, Any]]:
+        """`count` runs, round-robin across the fleet."""
+        for i in range(count):
+            yield self.next_run(self.scrapers[i % len(self.scrapers)], with_snapshot)
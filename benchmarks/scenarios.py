@@ -0,0 +1,242 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from backend.app import database
+from backend.app.health import percentile
+from backend.app.main import (
+    MAX_INGEST_BATCH_SIZE,
+    IngestRunRequest,
+    analysis_workers,
+    analyze_run,
+    app,
+    build_run,
+    resolve_snapshot,
+    run_key
+)
+from backend.app.pagination import MAX_PAGE_SIZE
+from backend.app.repair import suggest_repairs
+from backend.app.snapshots import snapshot_hash
+from backend.app.telemetry import DB_DURATION, OPERATION_DURATION
+
+from .fleet import FIELDS, SELECTORS, SyntheticFleet
+
+# Scenarios drive the app in-process (through the ASGI app where HTTP matters)
+# and return flat dicts of metrics. Durations are in milliseconds.
+
+def summarize(seconds: List[float]) -> Dict[str, float]:
+    if not seconds:
+        return {"count": 0}
+    ms = sorted(s * 1000 for s in seconds)
+    return {
+        "count": len(ms),
+        "mean_ms": round(sum(ms) / len(ms), 3),
+        "p50_ms": round(percentile(ms, 0.5), 3),
+        "p95_ms": round(percentile(ms, 0.95), 3),
+        "p99_ms": round(percentile(ms, 0.99), 3),
+        "max_ms": round(ms[-1], 3)
+    }
+
+def operation_totals() -> Dict[str, Tuple[int, float]]:
+    """(count, total seconds) per instrumented operation, from the app's own histograms."""
+    totals = {}
+    for histogram, prefix in ((OPERATION_DURATION, ""), (DB_DURATION, "db.")):
+        for (operation,), child in list(histogram.children.items()):
+            totals[prefix + operation] = (sum(child.counts), child.sum)
+    return totals
+
+def breakdown(before: Dict[str, Tuple[int, float]]) -> Dict[str, Dict[str, float]]:
+    """Calls and mean time per operation since `before`, to show where a scenario spent its time."""
+    result = {}
+    for operation, (count, total) in sorted(operation_totals().items()):
+        count -= before.get(operation, (0, 0.0))[0]
+        total -= before.get(operation, (0, 0.0))[1]
+        if count:
+            result[operation] = {"calls": count, "mean_ms": round(total * 1000 / count, 3)}
+    return result
+
+async def timed_call(fn: Callable, *args, **kwargs) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    result = await fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+async def drain(timeout: float = 600.0) -> float:
+    """Waits for the analysis queue to empty; returns the seconds waited."""
+    start = time.perf_counter()
+    while analysis_workers.queue is not None and analysis_workers.queue.pending:
+        if time.perf_counter() - start > timeout:
+            raise TimeoutError(f"{analysis_workers.queue.pending} analysis jobs still pending")
+        await asyncio.sleep(0.01)
+    return time.perf_counter() - start
+
+class Harness:
+    """The app (with its lifespan running) plus an in-process HTTP client."""
+
+    def __init__(self, fleet_options: Dict[str, Any]):
+        self.fleet_options = fleet_options
+        self.client: Optional[httpx.AsyncClient] = None
+        # depth -> scraper preloaded with that many runs, shared between scenarios
+        self.histories: Dict[int, str] = {}
+
+    async def __aenter__(self) -> "Harness":
+        self.lifespan = app.router.lifespan_context(app)
+        await self.lifespan.__aenter__()
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+        await self.lifespan.__aexit__(*exc)
+
+    def fleet(self, **overrides) -> SyntheticFleet:
+        return SyntheticFleet(**{**self.fleet_options, **overrides})
+
+    async def register(self, fleet: SyntheticFleet):
+        for scraper in fleet.scrapers:
+            response = await self.client.post("/api/v1/register", json=fleet.register_request(scraper))
+            response.raise_for_status()
+            scraper.id = response.json()["id"]
+
+    async def history(self, depth: int) -> str:
+        """A scraper with `depth` analyzed runs behind it."""
+        if depth not in self.histories:
+            fleet = self.fleet(scrapers=1)
+            await self.register(fleet)
+            payloads = list(fleet.runs(depth))
+            for i in range(0, depth, MAX_INGEST_BATCH_SIZE):
+                batch = payloads[i:i + MAX_INGEST_BATCH_SIZE]
+                response = await self.client.post("/api/v1/ingest/batch", json={"runs": batch})
+                response.raise_for_status()
+            await drain()
+            self.histories[depth] = fleet.scrapers[0].id
+        return self.histories[depth]
+
+async def ingest_scenario(harness: Harness, runs: int, concurrency: int, batch_size: int, scrapers: int) -> Dict[str, Any]:
+    """
+    Single-run and batch ingest over HTTP. `accepted_per_s` is the rate at which
+    ingest returns; `analyzed_per_s` includes waiting for the analysis queue to drain.
+    """
+    results = {}
+    for mode in ("single", "batch"):
+        fleet = harness.fleet(scrapers=scrapers)
+        await harness.register(fleet)
+        payloads = list(fleet.runs(runs))
+        if mode == "single":
+            requests = [("/api/v1/ingest", p) for p in payloads]
+        else:
+            requests = [("/api/v1/ingest/batch", {"runs": payloads[i:i + batch_size]}) for i in range(0, runs, batch_size)]
+
+        latencies: List[float] = []
+        statuses: Dict[str, int] = {}
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def send(path: str, body: Dict[str, Any]):
+            async with semaphore:
+                response, elapsed = await timed_call(harness.client.post, path, json=body)
+                latencies.append(elapsed)
+                statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+        before = operation_totals()
+        start = time.perf_counter()
+        await asyncio.gather(*(send(path, body) for path, body in requests))
+        accepted = time.perf_counter() - start
+        await drain()
+        total = time.perf_counter() - start
+
+        results[mode] = {
+            "requests": len(requests),
+            "runs": runs,
+            "statuses": statuses,
+            "accepted_s": round(accepted, 3),
+            "accepted_per_s": round(runs / accepted, 1),
+            "analyzed_s": round(total, 3),
+            "analyzed_per_s": round(runs / total, 1),
+            "request_latency": summarize(latencies),
+            "operations": breakdown(before)
+        }
+    return results
+
+async def analyze_scenario(harness: Harness, depths: List[int], samples: int) -> Dict[str, Any]:
+    """analyze_run latency for scrapers with increasingly long histories."""
+    results = {}
+    for depth in depths:
+        scraper_id = await harness.history(depth)
+        fleet = harness.fleet(scrapers=1, seed=depth)
+        fleet.scrapers[0].id = scraper_id
+        latencies = []
+        before = operation_totals()
+        for payload in fleet.runs(samples):
+            req = IngestRunRequest(**payload)
+            run = build_run(req, await resolve_snapshot(req))
+            await database.save_run(run)
+            _, elapsed = await timed_call(analyze_run, run)
+            latencies.append(elapsed)
+        results[str(depth)] = {**summarize(latencies), "operations": breakdown(before)}
+    return results
+
+async def get_runs_scenario(harness: Harness, depths: List[int], repeat: int) -> Dict[str, Any]:
+    """Cost of the run listing reads, against histories of each depth."""
+    results = {}
+    for depth in depths:
+        scraper_id = await harness.history(depth)
+        latest, first_page, http_page = [], [], []
+        for _ in range(repeat):
+            _, elapsed = await timed_call(database.get_runs, scraper_id, 20)
+            latest.append(elapsed)
+            _, elapsed = await timed_call(database.get_run_summaries, scraper_id, 50)
+            first_page.append(elapsed)
+            response, elapsed = await timed_call(harness.client.get, f"/api/v1/scrapers/{scraper_id}/runs", params={"limit": 50})
+            response.raise_for_status()
+            http_page.append(elapsed)
+
+        # Walk the whole history with keyset pagination
+        pages, before = [], None
+        while True:
+            page, elapsed = await timed_call(database.get_run_summaries, scraper_id, MAX_PAGE_SIZE, before)
+            pages.append(elapsed)
+            if len(page) < MAX_PAGE_SIZE:
+                break
+            before = run_key(page[-1])
+
+        results[str(depth)] = {
+            "get_runs_20": summarize(latest),
+            "get_run_summaries_50": summarize(first_page),
+            "http_list_runs_50": summarize(http_page),
+            "full_scan": {"pages": len(pages), "page_size": MAX_PAGE_SIZE, "total_ms": round(sum(pages) * 1000, 3), **summarize(pages)}
+        }
+    return results
+
+def repair_scenario(harness: Harness, pairs: int) -> Dict[str, Any]:
+    """
+    suggest_repairs on (old, new) page pairs where one field's class was renamed.
+    Cold calls parse and index both pages; warm calls repeat the repair and
+    are served from the ranking cache. `top1_accuracy` is the share of repairs
+    whose best suggestion selects the renamed class.
+    """
+    fleet = harness.fleet(scrapers=pairs, drift_rate=0.0)
+    cold, warm = [], []
+    correct = attempted = 0
+    for scraper in fleet.scrapers:
+        broken = scraper.rng.choice(FIELDS)
+        old_html = fleet.page(scraper)
+        new_html = fleet.drifted_page(scraper, broken)
+        old_hash, new_hash = snapshot_hash(old_html), snapshot_hash(new_html)
+        for timings in (cold, warm):
+            start = time.perf_counter()
+            suggestions = suggest_repairs(
+                old_html, new_html, SELECTORS[broken], broken, str(uuid.uuid4()), old_hash, new_hash
+            )
+            timings.append(time.perf_counter() - start)
+        attempted += 1
+        if suggestions and f"{broken}-v" in suggestions[0].suggested_selector:
+            correct += 1
+    return {
+        "snapshot_bytes": len(old_html),
+        "cold": summarize(cold),
+        "warm": summarize(warm),
+        "selectors_per_s_cold": round(len(cold) / sum(cold), 1),
+        "top1_accuracy": round(correct / attempted, 3)
+    }
@@ -0,0 +1,150 @@
+import argparse
+import hashlib
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# A local target site for the built-in scheduler: serves versioned HTML
+# fixtures with ETag and Last-Modified, and answers conditional requests
+# with 304. Switch a page's version to simulate the site changing:
+#
+#   python demo/stub_server.py --port 8081
+#   curl -X POST "http://localhost:8081/_version?path=/products&version=2"
+#   curl http://localhost:8081/_stats
+
+PRODUCT = """        <div class="product">
+            <h1>{name}</h1>
+            <span class="{price_class}">{price}</span>
+        </div>
+"""
+
+def product_page(price_class: str) -> str:
+    products = [("Cool Widget", "$19.99"), ("Gadget Pro", "$49.00"), ("Tiny Sprocket", "$4.25")]
+    body = "".join(PRODUCT.format(name=name, price=price, price_class=price_class) for name, price in products)
+    return f"<html>\n    <body>\n{body}    </body>\n</html>\n"
+
+# path -> versions; version 1 is served first
+FIXTURES: Dict[str, List[str]] = {
+    "/products": [
+        product_page("price"),
+        # The site renames the price class: the registered selector stops matching
+        product_page("price-v2"),
+    ],
+}
+
+class StubSite:
+    def __init__(self, fixtures: Dict[str, List[str]] = FIXTURES, validators: bool = True):
+        self.fixtures = fixtures
+        # False serves every page in full without ETag or Last-Modified, like
+        # sites that don't support conditional requests
+        self.validators = validators
+        self.lock = threading.Lock()
+        # path -> (version, Last-Modified time)
+        self.current: Dict[str, Tuple[int, float]] = {path: (1, 0.0) for path in fixtures}
+        self.stats = {"requests": 0, "full": 0, "not_modified": 0}
+
+    def set_version(self, path: str, version: int, now: float):
+        if not 1 <= version <= len(self.fixtures[path]):
+            raise ValueError(f"{path} has versions 1-{len(self.fixtures[path])}")
+        with self.lock:
+            # Whole seconds, as in the header, so If-Modified-Since compares exactly
+            self.current[path] = (version, float(int(now)))
+
+def make_handler(site: StubSite):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def send_body(self, status: int, body: bytes, content_type: str = "text/plain; charset=utf-8"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path != "/_version" or query.get("path") not in site.fixtures:
+                self.send_body(404, b"Unknown fixture\n")
+                return
+            try:
+                site.set_version(query["path"], int(query.get("version", "1")), time.time())
+            except ValueError as e:
+                self.send_body(400, f"{e}\n".encode())
+                return
+            self.send_body(204, b"")
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path == "/_stats":
+                with site.lock:
+                    body = repr(site.stats).encode()
+                self.send_body(200, body + b"\n")
+                return
+            if url.path not in site.fixtures:
+                self.send_body(404, b"Not found\n")
+                return
+            with site.lock:
+                site.stats["requests"] += 1
+                version, modified = site.current[url.path]
+            html = site.fixtures[url.path][version - 1].encode("utf-8")
+            etag = '"' + hashlib.sha1(html).hexdigest()[:16] + '"'
+            last_modified = formatdate(modified, usegmt=True)
+
+            if site.validators and self.is_fresh(etag, modified):
+                with site.lock:
+                    site.stats["not_modified"] += 1
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", last_modified)
+                self.end_headers()
+                return
+            with site.lock:
+                site.stats["full"] += 1
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(html)))
+            if site.validators:
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", last_modified)
+            self.end_headers()
+            self.wfile.write(html)
+
+        def is_fresh(self, etag: str, modified: float) -> bool:
+            # If-None-Match wins over If-Modified-Since (RFC 9110, 13.2.2)
+            if_none_match = self.headers.get("If-None-Match")
+            if if_none_match:
+                return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+            if_modified_since = self.headers.get("If-Modified-Since")
+            if if_modified_since:
+                try:
+                    return modified <= parsedate_to_datetime(if_modified_since).timestamp()
+                except (TypeError, ValueError):
+                    return False
+            return False
+
+    return Handler
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0, site: Optional[StubSite] = None) -> Tuple[ThreadingHTTPServer, StubSite]:
+    """Serves the fixtures from a background thread; port 0 picks a free port (see server.server_port)."""
+    site = site or StubSite()
+    server = ThreadingHTTPServer((host, port), make_handler(site))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, site
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local target site with versioned HTML fixtures")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--no-validators", action="store_true", help="Send no ETag or Last-Modified")
+    args = parser.parse_args()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(StubSite(validators=not args.no_validators)))
+    print(f"Serving {', '.join(FIXTURES)} on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
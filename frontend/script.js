@@ -2,6 +2,7 @@
 const API_BASE = document.getElementById("api-url").value;
 let currentView = "scrapers";
 let activeScraperId = null;
+let liveStream = null;
 
 // DOM Elements
 const mainContent = document.getElementById("main-content");
@@ -43,15 +44,36 @@ function updateStatus(connected) {
     }
 }
 
+// Live updates: the backend pushes new runs and alerts as server-sent events
+function watchScraper(id, scraper, runs, alerts) {
+    const baseUrl = apiUrlInput.value.replace(/\/$/, "");
+    liveStream = new EventSource(`${baseUrl}/api/v1/stream?scraper_id=${encodeURIComponent(id)}`);
+    liveStream.addEventListener("run", (e) => {
+        runs.unshift(JSON.parse(e.data));
+        renderScraperDetails(scraper, runs, alerts);
+    });
+    liveStream.addEventListener("alert", (e) => {
+        alerts.unshift(JSON.parse(e.data));
+        renderScraperDetails(scraper, runs, alerts);
+    });
+    // Some events were dropped; start over from the REST endpoints
+    liveStream.addEventListener("overflow", () => loadView("scraper_details", id));
+}
+
 // Views
 async function loadView(view, id = null) {
     currentView = view;
+    if (liveStream) {
+        liveStream.close();
+        liveStream = null;
+    }
     mainContent.innerHTML = '<div class="text-center text-gray-500 mt-20">Loading...</div>';
 
     if (view === "scrapers") {
         pageTitle.textContent = "Scrapers";
-        const scrapers = await fetchApi("/scrapers");
-        renderScrapersTable(scrapers);
+        // One request for the whole fleet, served from materialized health summaries
+        const fleet = await fetchApi("/fleet");
+        renderScrapersTable(fleet);
     } else if (view === "scraper_details") {
         activeScraperId = id;
         pageTitle.textContent = "Scraper Details";
@@ -59,11 +81,16 @@ async function loadView(view, id = null) {
         const runs = await fetchApi(`/scrapers/${id}/runs`);
         const alerts = await fetchApi(`/scrapers/${id}/alerts`);
         renderScraperDetails(scraper, runs, alerts);
+        if (scraper) watchScraper(id, scraper, runs || [], alerts || []);
     }
 }
 
-function renderScrapersTable(scrapers) {
-    if (!scrapers || scrapers.length === 0) {
+function formatRate(rate) {
+    return rate === undefined ? '-' : `${(rate * 100).toFixed(0)}%`;
+}
+
+function renderScrapersTable(fleet) {
+    if (!fleet || fleet.length === 0) {
         mainContent.innerHTML = '<div class="text-center text-gray-500 mt-20">No scrapers found. Run the demo script first!</div>';
         return;
     }
@@ -75,21 +102,31 @@ function renderScrapersTable(scrapers) {
                     <tr>
                         <th class="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Name</th>
                         <th class="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Target URL</th>
-                        <th class="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Created At</th>
+                        <th class="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Last Run</th>
+                        <th class="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Success (10 / 100)</th>
+                        <th class="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Duration p50 / p95</th>
+                        <th class="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Open Incidents</th>
                         <th class="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Actions</th>
                     </tr>
                 </thead>
                 <tbody class="bg-white divide-y divide-gray-200">
     `;
 
-    scrapers.forEach(scraper => {
+    fleet.forEach(health => {
+        const statusClass = health.last_status === 'SUCCESS' ? 'bg-green-100 text-green-800' : 'bg-red-100 text-red-800';
         html += `
             <tr>
-                <td class="px-6 py-4 whitespace-nowrap text-sm font-medium text-gray-900">${scraper.config.name}</td>
-                <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500">${scraper.config.target_url}</td>
-                <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500">${new Date(scraper.created_at).toLocaleString()}</td>
+                <td class="px-6 py-4 whitespace-nowrap text-sm font-medium text-gray-900">${health.name}</td>
+                <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500">${health.target_url}</td>
+                <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
+                    ${health.last_status ? `<span class="px-2 inline-flex text-xs leading-5 font-semibold rounded-full ${statusClass}">${health.last_status}</span>
+                    ${new Date(health.last_run_at).toLocaleString()}` : 'No runs yet'}
+                </td>
+                <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500">${formatRate(health.success_rate.last_10)} / ${formatRate(health.success_rate.last_100)}</td>
+                <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500">${health.p50_duration_ms === null ? '-' : `${health.p50_duration_ms.toFixed(0)}ms / ${health.p95_duration_ms.toFixed(0)}ms`}</td>
+                <td class="px-6 py-4 whitespace-nowrap text-sm ${health.open_incidents ? 'text-red-600 font-semibold' : 'text-gray-500'}">${health.open_incidents}</td>
                 <td class="px-6 py-4 whitespace-nowrap text-sm font-medium">
-                    <button onclick="loadView('scraper_details', '${scraper.id}')" class="text-indigo-600 hover:text-indigo-900">View Details</button>
+                    <button onclick="loadView('scraper_details', '${health.scraper_id}')" class="text-indigo-600 hover:text-indigo-900">View Details</button>
                 </td>
             </tr>
         `;
@@ -1 +1,3 @@
 from .client import ScraperObserver
+from .transport import BackgroundTransport, AsyncBackgroundTransport
+from .sampling import RunSampler
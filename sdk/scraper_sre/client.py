@@ -2,21 +2,56 @@ import time
 import requests
 import traceback
 import json
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Iterable
 from contextlib import contextmanager
 from datetime import datetime
 
+from .transport import get_default_session
+from .snapshots import snapshot_hash, known_snapshots_for
+from .sampling import RunSampler
+from .compression import encode_body
+
 class ScraperObserver:
-    def __init__(self, scraper_id: str, api_url: str = "http://localhost:8000/api/v1"):
+    def __init__(
+        self,
+        scraper_id: str,
+        api_url: str = "http://localhost:8000/api/v1",
+        transport=None,
+        timeout: float = 10.0,
+        dedupe_snapshots: bool = True,
+        sample_size: int = 100,
+        compression: Optional[str] = "gzip"
+    ):
+        """
+        `transport` is optional. Without one, each run is posted synchronously
+        (over a pooled session, with `timeout`). Pass a BackgroundTransport or
+        AsyncBackgroundTransport to hand runs off without waiting on the backend.
+        With `dedupe_snapshots`, snapshots the backend already has are sent as a hash only.
+        Extracted items are counted exactly but only `sample_size` of them are sent,
+        with per-field summaries of all of them. `compression` is "gzip", "zstd" or None.
+        """
         self.scraper_id = scraper_id
         self.api_url = api_url.rstrip("/")
-        self.current_run_data = {
-            "scraper_id": scraper_id,
+        self.transport = transport
+        self.timeout = timeout
+        self.dedupe_snapshots = dedupe_snapshots
+        self.sample_size = sample_size
+        self.compression = compression
+        self.sampler = RunSampler(sample_size)
+        self.current_run_data = self._new_run_data()
+        # Snapshots known to the backend the runs actually go to
+        sender = getattr(transport, "sender", None)
+        self.known_snapshots = sender.known_snapshots if sender is not None else known_snapshots_for(self.api_url)
+
+    def _new_run_data(self) -> Dict[str, Any]:
+        return {
+            "scraper_id": self.scraper_id,
             "status": "SUCCESS",
             "duration_ms": 0,
             "items_extracted": 0,
             "error_message": None,
             "extracted_data_sample": [],
+            "field_stats": None,
             "html_snapshot": None
         }
 
@@ -24,23 +59,70 @@ class ScraperObserver:
         """Capture the HTML snapshot for debugging/repair."""
         self.current_run_data["html_snapshot"] = html
 
-    def capture_data(self, data: List[Dict[str, Any]]):
-        """Capture the extracted data sample."""
-        self.current_run_data["extracted_data_sample"] = data
-        self.current_run_data["items_extracted"] = len(data)
+    def capture_data(self, data: Iterable[Dict[str, Any]]):
+        """Capture the extracted data, replacing anything captured so far in this run."""
+        self.sampler = RunSampler(self.sample_size)
+        self.capture_items(data)
+
+    def capture_items(self, items: Iterable[Dict[str, Any]]):
+        """Add extracted items to the run; works with generators, so items needn't be held in memory."""
+        self.sampler.extend(items)
+        self.current_run_data["extracted_data_sample"] = self.sampler.sample
+        self.current_run_data["items_extracted"] = self.sampler.count
 
     def log_error(self, error: Exception):
         """Log an error explicitly."""
         self.current_run_data["status"] = "FAILURE"
         self.current_run_data["error_message"] = str(error)
 
+    def check_snapshot(self, html: str) -> bool:
+        """Ask the backend whether it already stores this snapshot."""
+        h = snapshot_hash(html)
+        if h in self.known_snapshots:
+            return True
+        try:
+            response = get_default_session().head(f"{self.api_url}/snapshots/{h}", timeout=self.timeout)
+        except requests.RequestException:
+            return False
+        if response.status_code == 200:
+            self.known_snapshots.add(h)
+            return True
+        return False
+
     def submit_run(self):
-        """Submit the run data to the backend."""
+        """Submit the run data to the backend, then reset for the next run."""
+        payload = self.current_run_data
+        if self.sampler.count:
+            payload["field_stats"] = self.sampler.field_stats()
+        self.current_run_data = self._new_run_data()
+        self.sampler = RunSampler(self.sample_size)
+
+        html = payload.get("html_snapshot")
+        if html and self.dedupe_snapshots:
+            h = snapshot_hash(html)
+            payload["snapshot_hash"] = h
+            if h in self.known_snapshots:
+                payload["html_snapshot"] = None
+
+        if self.transport is not None:
+            self.transport.send(payload)
+            return
+
         try:
             url = f"{self.api_url}/ingest"
-            # print(f"Submitting run to {url} with data: {json.dumps(self.current_run_data, default=str)}")
-            response = requests.post(url, json=self.current_run_data)
+            # print(f"Submitting run to {url} with data: {json.dumps(payload, default=str)}")
+            session = get_default_session()
+            body, headers = encode_body(payload, self.compression)
+            response = session.post(url, data=body, headers=headers, timeout=self.timeout)
+            if response.status_code == 409 and html and not payload["html_snapshot"]:
+                # The backend no longer has this snapshot; upload it after all.
+                self.known_snapshots.discard(payload["snapshot_hash"])
+                payload["html_snapshot"] = html
+                body, headers = encode_body(payload, self.compression)
+                response = session.post(url, data=body, headers=headers, timeout=self.timeout)
             response.raise_for_status()
+            if payload.get("snapshot_hash") and payload["html_snapshot"]:
+                self.known_snapshots.add(payload["snapshot_hash"])
             # print(f"Run submitted successfully: {response.json()}")
         except Exception as e:
             print(f"Failed to submit run metrics: {e}")
@@ -0,0 +1,96 @@
+import math
+import random
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+# Distinct values tracked per field; fields with more report this many
+MAX_DISTINCT = 10000
+
+# Same rules as the backend's stats.coerce_number, so client-side summaries
+# agree with what the backend would compute from the full data. _NUMBER_RE and
+# coerce_number must be kept identical to backend/app/stats.py;
+# sdk/tests/test_sampling.py checks that both agree.
+_NUMBER_RE = re.compile(r"^(?:[^\w\s+\-]{1,2}|[A-Z]{3}\s)?\s?([-+]?\d[\d,]*(?:\.\d+)?|[-+]?\.\d+)\s?[^\d]{0,8}$")
+
+def coerce_number(value: Any) -> Optional[float]:
+    """Numbers and number-like strings ("$1,299.00", "4.5 stars") become floats."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) if math.isfinite(value) else None
+    if isinstance(value, str):
+        match = _NUMBER_RE.match(value.strip())
+        if match:
+            try:
+                return float(match.group(1).replace(",", ""))
+            except ValueError:
+                return None
+    return None
+
+class FieldSummary:
+    """Exact per-field totals: item count, nulls, numeric sum and distinct values."""
+
+    def __init__(self):
+        self.count = 0
+        self.nulls = 0
+        self.numeric_count = 0
+        self.numeric_sum = 0.0
+        self.values: Set[Any] = set()
+
+    def add(self, value: Any):
+        self.count += 1
+        if value is None or value == "":
+            self.nulls += 1
+            return
+        number = coerce_number(value)
+        if number is not None:
+            self.numeric_count += 1
+            self.numeric_sum += number
+        elif isinstance(value, (str, int, float, bool)) and len(self.values) < MAX_DISTINCT:
+            self.values.add(value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "nulls": self.nulls,
+            "numeric_count": self.numeric_count,
+            "numeric_sum": self.numeric_sum,
+            "distinct": len(self.values)
+        }
+
+class RunSampler:
+    """
+    Counts every extracted item exactly and keeps a uniform random sample of
+    `sample_size` of them (reservoir sampling, Algorithm R), plus exact
+    per-field summaries. Memory stays bounded however many items a run extracts.
+    """
+
+    def __init__(self, sample_size: int = 100, rng: Optional[random.Random] = None):
+        self.sample_size = sample_size
+        self.rng = rng or random.Random()
+        self.count = 0
+        self.sample: List[Dict[str, Any]] = []
+        self.fields: Dict[str, FieldSummary] = {}
+
+    def add(self, item: Dict[str, Any]):
+        self.count += 1
+        if len(self.sample) < self.sample_size:
+            self.sample.append(item)
+        else:
+            j = self.rng.randrange(self.count)
+            if j < self.sample_size:
+                self.sample[j] = item
+        for key in item:
+            if key not in self.fields:
+                # Items seen before this key appeared count as nulls
+                summary = self.fields[key] = FieldSummary()
+                summary.count = summary.nulls = self.count - 1
+        for key, summary in self.fields.items():
+            summary.add(item.get(key))
+
+    def extend(self, items: Iterable[Dict[str, Any]]):
+        for item in items:
+            self.add(item)
+
+    def field_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {key: summary.to_dict() for key, summary in self.fields.items()}
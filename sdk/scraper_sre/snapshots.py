@@ -0,0 +1,50 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict
+
+def snapshot_hash(html: str) -> str:
+    """SHA-256 content address, identical to the backend's snapshot store key."""
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+class KnownSnapshots:
+    """
+    Bounded, thread-safe LRU of snapshot hashes the backend is known to have.
+    Runs whose snapshot is in here are submitted with the hash only.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._hashes: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, h: str) -> bool:
+        with self._lock:
+            if h in self._hashes:
+                self._hashes.move_to_end(h)
+                return True
+            return False
+
+    def add(self, h: str):
+        with self._lock:
+            self._hashes[h] = None
+            self._hashes.move_to_end(h)
+            while len(self._hashes) > self.max_size:
+                self._hashes.popitem(last=False)
+
+    def discard(self, h: str):
+        with self._lock:
+            self._hashes.pop(h, None)
+
+# One set per backend, shared by the observers and transports reporting to it:
+# a hash one backend has says nothing about another
+_known_by_backend: Dict[str, KnownSnapshots] = {}
+_known_by_backend_lock = threading.Lock()
+
+def known_snapshots_for(api_url: str) -> KnownSnapshots:
+    key = api_url.rstrip("/")
+    with _known_by_backend_lock:
+        known = _known_by_backend.get(key)
+        if known is None:
+            known = _known_by_backend[key] = KnownSnapshots()
+        return known
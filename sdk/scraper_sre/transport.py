@@ -0,0 +1,244 @@
+import asyncio
+import atexit
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from .compression import encode_body
+from .snapshots import known_snapshots_for
+
+RunPayload = Dict[str, Any]
+
+_default_session: Optional[requests.Session] = None
+_default_session_lock = threading.Lock()
+
+def get_default_session() -> requests.Session:
+    """Process-wide pooled session so repeated submissions reuse connections."""
+    global _default_session
+    if _default_session is None:
+        with _default_session_lock:
+            if _default_session is None:
+                _default_session = requests.Session()
+    return _default_session
+
+class BatchSender:
+    """
+    Posts batches of runs to the backend's batch ingest endpoint,
+    retrying connection errors, 429s and 5xx responses with exponential backoff.
+    Bodies are compressed with `compression` ("gzip", "zstd" or None).
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        session: Optional[requests.Session] = None,
+        timeout: float = 10.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        compression: Optional[str] = "gzip"
+    ):
+        self.url = f"{api_url.rstrip('/')}/ingest/batch"
+        self.known_snapshots = known_snapshots_for(api_url)
+        self.compression = compression
+        self.session = session or get_default_session()
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.sent = 0
+        self.dropped = 0
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _update_known_snapshots(self, batch: List[RunPayload], response: requests.Response):
+        for payload in batch:
+            if payload.get("html_snapshot") and payload.get("snapshot_hash"):
+                self.known_snapshots.add(payload["snapshot_hash"])
+        try:
+            missing = response.json().get("missing_snapshots", [])
+        except ValueError:
+            missing = []
+        for h in missing:
+            self.known_snapshots.discard(h)
+
+    def send_batch(self, batch: List[RunPayload], stop: Optional[threading.Event] = None) -> bool:
+        # Compressed once; retries resend the same bytes
+        body, headers = encode_body({"runs": batch}, self.compression)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(self.url, data=body, headers=headers, timeout=self.timeout)
+                if response.status_code < 400:
+                    self.sent += len(batch)
+                    self._update_known_snapshots(batch, response)
+                    return True
+                if response.status_code != 429 and response.status_code < 500:
+                    # The backend rejected the payload; retrying won't help.
+                    print(f"Failed to submit run batch: HTTP {response.status_code}")
+                    break
+            except requests.RequestException as e:
+                print(f"Failed to submit run batch (attempt {attempt + 1}): {e}")
+
+            if attempt < self.max_retries:
+                delay = self.backoff(attempt)
+                if stop is not None:
+                    # Don't keep retrying at full backoff while shutting down.
+                    if stop.wait(delay):
+                        delay = 0
+                else:
+                    time.sleep(delay)
+        self.dropped += len(batch)
+        return False
+
+class BackgroundTransport:
+    """
+    Non-blocking transport for ScraperObserver.
+    Runs are put on a bounded queue and drained by a daemon thread, which
+    flushes them in batches once `batch_size` runs are pending or
+    `flush_interval` seconds have passed. If the queue is full the run is
+    dropped rather than stalling the scraper. Pending runs are flushed at
+    interpreter exit.
+    """
+
+    def __init__(
+        self,
+        api_url: str = "http://localhost:8000/api/v1",
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_queue_size: int = 10000,
+        shutdown_timeout: float = 5.0,
+        **sender_options
+    ):
+        self.sender = BatchSender(api_url, **sender_options)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.shutdown_timeout = shutdown_timeout
+        self.queue: "queue.Queue[RunPayload]" = queue.Queue(maxsize=max_queue_size)
+        self.overflowed = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._worker, name="scraper-sre-transport", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def send(self, payload: RunPayload):
+        try:
+            self.queue.put_nowait(payload)
+        except queue.Full:
+            self.overflowed += 1
+
+    def _drain(self, first: RunPayload) -> List[RunPayload]:
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0 or self._stop.is_set():
+                    batch.append(self.queue.get_nowait())
+                else:
+                    batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        while True:
+            try:
+                first = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            batch = self._drain(first)
+            self.sender.send_batch(batch, stop=self._stop)
+            for _ in batch:
+                self.queue.task_done()
+
+    def flush(self, timeout: Optional[float] = None):
+        """Block until every queued run has been sent (or dropped)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            time.sleep(0.01)
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(self.shutdown_timeout)
+        atexit.unregister(self.close)
+
+class AsyncBackgroundTransport:
+    """
+    asyncio flavour of BackgroundTransport for async scrapers.
+    Must be started from a running event loop; the blocking HTTP call runs in
+    the loop's default executor so the loop itself never waits on the backend.
+    """
+
+    def __init__(
+        self,
+        api_url: str = "http://localhost:8000/api/v1",
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_queue_size: int = 10000,
+        **sender_options
+    ):
+        self.sender = BatchSender(api_url, **sender_options)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: "asyncio.Queue[RunPayload]" = asyncio.Queue(maxsize=max_queue_size)
+        self.overflowed = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._worker())
+
+    def send(self, payload: RunPayload):
+        self.start()
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            self.overflowed += 1
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await loop.run_in_executor(None, self.sender.send_batch, batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def flush(self):
+        await self.queue.join()
+
+    async def aclose(self):
+        if self._task is None:
+            return
+        await self.flush()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+from backend.app import stats
+from sdk.scraper_sre import sampling
+from sdk.scraper_sre.sampling import RunSampler
+
+NUMBER_INPUTS = [
+    "$1,299.00", "4.5 stars", "EUR 12", "€9.99", "-3", "+.5", ".75", "1,000,000", "12 kg", "50%",
+    "n/a", "", "  42  ", "1.2.3", "abc", "$", "12 345", "USD 1.5", "3 for $10", "0x1f", "1e5",
+    0, 7, -2.5, 3.0, float("nan"), float("inf"), True, False, None, [], {},
+]
+
+@pytest.mark.parametrize("value", NUMBER_INPUTS, ids=repr)
+def test_number_coercion_matches_the_backend(value):
+    # The SDK's field_stats and the backend's sample statistics must agree
+    assert sampling.coerce_number(value) == stats.coerce_number(value)
+
+def test_number_pattern_matches_the_backend():
+    assert sampling._NUMBER_RE.pattern == stats._NUMBER_RE.pattern
+
+def test_sample_is_bounded_and_counts_are_exact():
+    sampler = RunSampler(sample_size=10, rng=random.Random(1))
+    sampler.extend({"price": f"${i}", "name": f"Item {i}"} for i in range(1000))
+    assert sampler.count == 1000
+    assert len(sampler.sample) == 10
+    totals = sampler.field_stats()
+    assert totals["price"] == {
+        "count": 1000, "nulls": 0, "numeric_count": 1000, "numeric_sum": float(sum(range(1000))), "distinct": 0
+    }
+    assert totals["name"]["distinct"] == 1000
+
+def test_fields_appearing_late_count_earlier_items_as_nulls():
+    sampler = RunSampler(sample_size=5)
+    sampler.extend([{"name": "a"}, {"name": "b"}, {"name": "c", "price": "$3"}, {"name": "d", "price": ""}])
+    assert sampler.field_stats()["price"] == {
+        "count": 4, "nulls": 3, "numeric_count": 1, "numeric_sum": 3.0, "distinct": 0
+    }
+
+def test_sampling_is_uniform():
+    hits = [0] * 20
+    rng = random.Random(7)
+    for _ in range(2000):
+        sampler = RunSampler(sample_size=5, rng=rng)
+        sampler.extend({"i": i} for i in range(20))
+        for item in sampler.sample:
+            hits[item["i"]] += 1
+    # Each item is kept with probability 5/20: 500 of 2000 trials
+    assert all(400 < h < 600 for h in hits)
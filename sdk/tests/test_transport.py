@@ -0,0 +1,135 @@
+import gzip
+import json
+
+import pytest
+import requests
+
+from sdk.scraper_sre.client import ScraperObserver
+from sdk.scraper_sre.compression import MIN_COMPRESS_BYTES, encode_body
+from sdk.scraper_sre.snapshots import KnownSnapshots, known_snapshots_for, snapshot_hash
+from sdk.scraper_sre.transport import BackgroundTransport, BatchSender
+
+class FakeResponse:
+    def __init__(self, status_code: int, body=None):
+        self.status_code = status_code
+        self.body = body or {}
+
+    def json(self):
+        return self.body
+
+class FakeSession:
+    """Answers posts from a script of responses (or exceptions to raise)."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.bodies = []
+
+    def post(self, url, data, headers, timeout):
+        self.bodies.append((data, headers))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+class ListTransport:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, payload):
+        self.sent.append(payload)
+
+def decode(body: bytes, headers) -> dict:
+    if headers.get("Content-Encoding") == "gzip":
+        body = gzip.decompress(body)
+    return json.loads(body)
+
+def test_small_bodies_are_not_compressed():
+    body, headers = encode_body({"a": 1})
+    assert "Content-Encoding" not in headers
+    assert json.loads(body) == {"a": 1}
+
+def test_large_bodies_are_gzipped():
+    payload = {"html": "<p>x</p>" * MIN_COMPRESS_BYTES}
+    body, headers = encode_body(payload)
+    assert headers["Content-Encoding"] == "gzip"
+    assert len(body) < MIN_COMPRESS_BYTES
+    assert decode(body, headers) == payload
+    body, headers = encode_body(payload, None)
+    assert "Content-Encoding" not in headers
+    with pytest.raises(ValueError):
+        encode_body(payload, "br")
+
+def test_known_snapshots_are_bounded_lru():
+    known = KnownSnapshots(max_size=2)
+    known.add("a")
+    known.add("b")
+    assert "a" in known  # now the most recently used
+    known.add("c")
+    assert "b" not in known and "a" in known and "c" in known
+
+def test_batches_are_retried_on_server_errors():
+    session = FakeSession(FakeResponse(503), requests.ConnectionError("refused"), FakeResponse(200))
+    sender = BatchSender("http://backend/api/v1", session=session, backoff_base=0)
+    assert sender.send_batch([{"scraper_id": "s"}])
+    assert (sender.sent, sender.dropped) == (1, 0)
+    # The body is encoded once and resent as is
+    assert len({body for body, _ in session.bodies}) == 1
+
+def test_rejected_batches_are_dropped_without_retrying():
+    session = FakeSession(FakeResponse(422))
+    sender = BatchSender("http://backend/api/v1", session=session, backoff_base=0)
+    assert not sender.send_batch([{"scraper_id": "s"}, {"scraper_id": "s"}])
+    assert (sender.sent, sender.dropped, len(session.bodies)) == (0, 2, 1)
+
+def test_batch_responses_update_known_snapshots():
+    html = "<html>batch</html>"
+    h = snapshot_hash(html)
+    session = FakeSession(FakeResponse(200), FakeResponse(200, {"missing_snapshots": [h]}))
+    sender = BatchSender("http://backend/api/v1", session=session)
+    sender.send_batch([{"scraper_id": "s", "html_snapshot": html, "snapshot_hash": h}])
+    assert h in sender.known_snapshots
+    sender.send_batch([{"scraper_id": "s", "html_snapshot": None, "snapshot_hash": h}])
+    assert h not in sender.known_snapshots
+
+def test_observer_sends_known_snapshots_by_hash():
+    html = "<html>observed</html>"
+    transport = ListTransport()
+    observer = ScraperObserver("s", transport=transport)
+    for _ in range(2):
+        with observer.monitor():
+            observer.capture_snapshot(html)
+            observer.capture_items({"price": f"${i}"} for i in range(3))
+    first, second = transport.sent
+    assert first["items_extracted"] == 3 and first["field_stats"]["price"]["numeric_sum"] == 3.0
+    assert first["html_snapshot"] == html and first["snapshot_hash"] == snapshot_hash(html)
+    # Unknown until the backend has acknowledged it
+    assert second["html_snapshot"] == html
+
+    observer.known_snapshots.add(snapshot_hash(html))
+    with observer.monitor():
+        observer.capture_snapshot(html)
+    third = transport.sent[-1]
+    assert third["html_snapshot"] is None and third["snapshot_hash"] == snapshot_hash(html)
+
+def test_known_snapshots_are_kept_per_backend():
+    h = snapshot_hash("<html>per backend</html>")
+    known_snapshots_for("http://one/api/v1/").add(h)
+    assert h in ScraperObserver("s", api_url="http://one/api/v1").known_snapshots
+    assert h not in ScraperObserver("s", api_url="http://two/api/v1").known_snapshots
+    # Observers handing runs to a transport follow the transport's backend
+    transport = BackgroundTransport("http://one/api/v1")
+    try:
+        observer = ScraperObserver("s", api_url="http://two/api/v1", transport=transport)
+        assert observer.known_snapshots is transport.sender.known_snapshots
+        assert h in observer.known_snapshots
+    finally:
+        transport.close()
+
+def test_observer_records_failures():
+    transport = ListTransport()
+    observer = ScraperObserver("s", transport=transport)
+    with pytest.raises(RuntimeError):
+        with observer.monitor():
+            raise RuntimeError("page did not load")
+    assert (transport.sent[0]["status"], transport.sent[0]["error_message"]) == ("FAILURE", "page did not load")
+    assert observer.current_run_data["status"] == "SUCCESS"